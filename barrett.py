@@ -0,0 +1,125 @@
+# Barrett reduction for repeated modulo by the same number.
+#
+# A BarrettContext is built once per modulus n with k limbs and stores
+# mu = floor(b ** (2 * k) / n), where b = 2 ** (8 * LIMB_BYTES). Any value
+# below b ** (2 * k), so in particular any product of two residues, is
+# then reduced with two multiplies, a subtract and at most two
+# corrections instead of a long division (HAC, algorithm 14.42).
+#
+# reduce and reduce_many take bytearrays and return exactly what
+# intarithmetic.modulo(a, n) returns, including its sign conventions.
+# The context also has the encode/decode/multiply/square/one interface of
+# montgomery.MontgomeryContext, so moduloExp uses it for even moduli.
+
+
+import big
+import intarithmetic
+
+
+class BarrettContext(object):
+    def __init__(self, modulus):
+        # modulus is a nonzero bytearray of either sign.
+        self.nbytes = len(modulus)
+        self.negative = big.is_negative(modulus)
+        limbs = big.strip_limbs(big.to_limbs(big.negate(modulus) if self.negative else modulus))
+        if not limbs:
+            raise ZeroDivisionError("division by zero")
+        self.modulus = limbs
+        self.size = len(limbs)
+        self.mu = big.strip_limbs(intarithmetic.divideLimbs([0] * (2 * self.size) + [1], limbs)[0])
+        self.one = self.reduce_limbs([1])
+
+    def reduce_limbs(self, x):
+        # x mod n for a magnitude limb list. Values of 2 * size limbs or
+        # more fall back to long division.
+        x = big.strip_limbs(x)
+        size = self.size
+        if len(x) < size or (len(x) == size and big.compare_limbs(x, self.modulus) < 0):
+            return x or [0]
+        if len(x) > 2 * size:
+            return big.strip_limbs(intarithmetic.divideLimbs(x, self.modulus)[1]) or [0]
+
+        # q estimates x // n from below by at most 3. Only the top and
+        # bottom size + 1 limbs of the two products are computed.
+        q = multiply_high(x[size - 1:], self.mu, size + 1)
+        # r = (x - q * n) mod b ** (size + 1)
+        r = x[:size + 1]
+        qn = big.strip_limbs(multiply_low(q, self.modulus, size + 1))
+        if big.compare_limbs(r, qn) < 0:
+            r = r + [0] * (size + 1 - len(r)) + [1]
+        r = big.subtract_limbs(r, qn)
+        while big.compare_limbs(r, self.modulus) >= 0:
+            r = big.subtract_limbs(r, self.modulus)
+        return big.strip_limbs(r) or [0]
+
+    def reduce(self, a):
+        # Same result as intarithmetic.modulo(a, n).
+        aNegative = big.is_negative(a)
+        remainder = self.reduce_limbs(big.to_limbs(big.negate(a) if aNegative else a))
+        if aNegative != self.negative and any(remainder):
+            remainder = big.subtract_limbs(self.modulus, remainder)
+        return big.fit_result(big.from_magnitude(remainder, max(len(a), self.nbytes), self.negative))
+
+    def reduce_many(self, values):
+        return [self.reduce(a) for a in values]
+
+    def encode(self, x):
+        return self.reduce_limbs(x)
+
+    def decode(self, x):
+        return x
+
+    def multiply(self, x, y):
+        return self.reduce_limbs(big.multiply_limbs(x, y))
+
+    def square(self, x):
+        return self.reduce_limbs(big.square_limbs(x))
+
+
+def multiply_high(a, b, start):
+    # (a * b) >> (bits * start), possibly too low by one: partial
+    # products below limb start - 2 are skipped and their carries lost.
+    bits = 8 * big.LIMB_BYTES
+    mask = (1 << bits) - 1
+    low = max(start - 2, 0)
+    output = [0] * (len(a) + len(b) + 1)
+    for i in range(len(a)):
+        x = a[i]
+        if x == 0:
+            continue
+        carry = 0
+        k = max(low - i, 0)
+        for j in range(k, len(b)):
+            total = output[i + j] + x * b[j] + carry
+            output[i + j] = total & mask
+            carry = total >> bits
+        k = i + len(b)
+        while carry:
+            total = output[k] + carry
+            output[k] = total & mask
+            carry = total >> bits
+            k += 1
+    return big.strip_limbs(output[start:])
+
+
+def multiply_low(a, b, count):
+    # (a * b) mod b ** count, as count limbs.
+    bits = 8 * big.LIMB_BYTES
+    mask = (1 << bits) - 1
+    output = [0] * count
+    for i in range(min(len(a), count)):
+        x = a[i]
+        if x == 0:
+            continue
+        carry = 0
+        for j in range(min(len(b), count - i)):
+            total = output[i + j] + x * b[j] + carry
+            output[i + j] = total & mask
+            carry = total >> bits
+        k = i + len(b)
+        while carry and k < count:
+            total = output[k] + carry
+            output[k] = total & mask
+            carry = total >> bits
+            k += 1
+    return output
@@ -0,0 +1,319 @@
+# Batched arithmetic over many fixed-width integers at once, using NumPy.
+#
+# A batch is a 2-D NumPy matrix with one integer per row, in the same
+# two's-complement big-endian layout big.py uses:
+#
+#   - dtype uint8, shape (N, nbytes): row i is the bytearray of integer i;
+#   - dtype uint32, shape (N, nwords): row i is the same number as
+#     big-endian 32-bit words.
+#
+# Every function returns a matrix of the same kind as its inputs. Row i of
+# a result has the value the scalar function in big.py or intarithmetic.py
+# returns for row i of the operands. Results have one width for all rows,
+# wide enough for any row: add, subtract and negate grow by one byte (or
+# word), multiply doubles the width, and divmod's quotient grows by one.
+#
+# Internally the numbers are little-endian columns of 32-bit limbs held in
+# uint64, so each carry step is one vectorized operation over all rows.
+# Limb matrices are Fortran-ordered to keep each column contiguous.
+
+
+# NumPy, imported on first use.
+numpy = None
+
+WORD_BITS = 32
+WORD_MASK = (1 << WORD_BITS) - 1
+
+
+def require_numpy():
+    global numpy
+    if numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('batch arithmetic needs NumPy')
+    return numpy
+
+
+def have_numpy():
+    try:
+        require_numpy()
+    except ImportError:
+        return False
+    return True
+
+
+####################################################################
+# Converting between bytearrays, byte or word matrices and limb columns.
+
+def from_bytearrays(arrays):
+    # Pack equal-width bytearrays into an (N, nbytes) uint8 matrix.
+    require_numpy()
+    arrays = list(arrays)
+    nbytes = len(arrays[0]) if arrays else 0
+    buffer = bytearray().join(arrays)
+    if len(buffer) != nbytes * len(arrays):
+        raise ValueError('all bytearrays in a batch must have the same width')
+    return numpy.frombuffer(bytes(buffer), dtype=numpy.uint8).reshape(len(arrays), nbytes).copy()
+
+
+def to_bytearrays(matrix):
+    require_numpy()
+    if matrix.dtype == numpy.uint32:
+        matrix = numpy.ascontiguousarray(matrix, dtype='>u4').view(numpy.uint8)
+    return [bytearray(row.tobytes()) for row in matrix]
+
+
+def unpack(matrix):
+    # Returns (limbs, kind, nbytes): little-endian uint64 limb columns
+    # holding 32-bit words, the input dtype and the input width in bytes.
+    require_numpy()
+    matrix = numpy.asarray(matrix)
+    if matrix.ndim != 2:
+        raise ValueError('a batch must be a 2-D matrix')
+    kind = matrix.dtype
+    if kind == numpy.uint32:
+        words = matrix.astype(numpy.uint64)
+        return numpy.asfortranarray(words[:, ::-1]), kind, 4 * matrix.shape[1]
+    if kind != numpy.uint8:
+        raise TypeError('a batch must be a uint8 or uint32 matrix')
+
+    nbytes = matrix.shape[1]
+    pad = -nbytes % 4
+    if pad:
+        fill = numpy.where(matrix[:, :1] & 0x80, 0xff, 0).astype(numpy.uint8)
+        matrix = numpy.hstack([numpy.repeat(fill, pad, axis=1), matrix])
+    words = numpy.ascontiguousarray(matrix).view('>u4').astype(numpy.uint64)
+    return numpy.asfortranarray(words[:, ::-1]), kind, nbytes
+
+
+def pack(limbs, kind, nbytes):
+    # Inverse of unpack; nbytes is rounded up to whole words for uint32.
+    words = limbs[:, ::-1]
+    if kind == numpy.uint32:
+        count = (nbytes + 3) // 4
+        return words[:, words.shape[1] - count:].astype(numpy.uint32)
+    matrix = numpy.ascontiguousarray(words, dtype='>u4').view(numpy.uint8)
+    return matrix[:, matrix.shape[1] - nbytes:].copy()
+
+
+def negative_rows(limbs):
+    return (limbs[:, -1] >> (WORD_BITS - 1)).astype(bool)
+
+
+def extend(limbs, count):
+    # Sign-extend by count limbs.
+    if count <= 0:
+        return limbs
+    output = numpy.empty((limbs.shape[0], limbs.shape[1] + count), dtype=numpy.uint64, order='F')
+    output[:, :limbs.shape[1]] = limbs
+    output[:, limbs.shape[1]:] = numpy.where(negative_rows(limbs), WORD_MASK, 0)[:, None]
+    return output
+
+
+def unpack_pair(a, b):
+    a_limbs, kind, a_bytes = unpack(a)
+    b_limbs, b_kind, b_bytes = unpack(b)
+    if kind != b_kind or a_limbs.shape[0] != b_limbs.shape[0]:
+        raise ValueError('batch operands must have the same kind and number of rows')
+    count = max(a_limbs.shape[1], b_limbs.shape[1])
+    a_limbs = extend(a_limbs, count - a_limbs.shape[1])
+    b_limbs = extend(b_limbs, count - b_limbs.shape[1])
+    return a_limbs, b_limbs, kind, max(a_bytes, b_bytes)
+
+
+####################################################################
+# Kernels on limb columns. All of them work modulo 2**(32 * columns).
+
+def add_columns(a, b, carry=None):
+    output = numpy.empty_like(a)
+    if carry is None:
+        carry = numpy.zeros(a.shape[0], dtype=numpy.uint64)
+    for j in range(a.shape[1]):
+        total = a[:, j] + b[:, j] + carry
+        output[:, j] = total & WORD_MASK
+        carry = total >> WORD_BITS
+    return output
+
+
+def negate_columns(a):
+    ones = numpy.ones(a.shape[0], dtype=numpy.uint64)
+    return add_columns(~a & WORD_MASK, numpy.zeros_like(a), ones)
+
+
+def subtract_columns(a, b):
+    ones = numpy.ones(a.shape[0], dtype=numpy.uint64)
+    return add_columns(a, ~b & WORD_MASK, ones)
+
+
+def compare_unsigned_columns(a, b):
+    # -1, 0 or 1 per row, comparing the columns as unsigned numbers.
+    result = numpy.zeros(a.shape[0], dtype=numpy.int8)
+    for j in range(a.shape[1] - 1, -1, -1):
+        undecided = result == 0
+        result[undecided & (a[:, j] > b[:, j])] = 1
+        result[undecided & (a[:, j] < b[:, j])] = -1
+    return result
+
+
+def multiply_unsigned_columns(a, b):
+    # Schoolbook product; output[i + j] + a * b + carry always fits in
+    # 64 bits because each operand limb is below 2**32.
+    rows, count = a.shape
+    output = numpy.zeros((rows, 2 * count), dtype=numpy.uint64, order='F')
+    for i in range(count):
+        carry = numpy.zeros(rows, dtype=numpy.uint64)
+        x = a[:, i]
+        for j in range(count):
+            total = output[:, i + j] + x * b[:, j] + carry
+            output[:, i + j] = total & WORD_MASK
+            carry = total >> WORD_BITS
+        output[:, i + count] = carry
+    return output
+
+
+def shift_left_columns(a, shift):
+    # Shift left by shift bits, dropping bits shifted out of the top.
+    words, bits = divmod(shift, WORD_BITS)
+    output = numpy.zeros_like(a)
+    if words < a.shape[1]:
+        output[:, words:] = a[:, :a.shape[1] - words]
+    if bits:
+        low = numpy.zeros_like(output)
+        low[:, 1:] = output[:, :-1] >> (WORD_BITS - bits)
+        output = ((output << bits) & WORD_MASK) | low
+    return output
+
+
+def shift_right_columns(a, shift):
+    # Arithmetic shift right by shift bits.
+    count = a.shape[1]
+    a = extend(a, shift // WORD_BITS + 1)
+    words, bits = divmod(shift, WORD_BITS)
+    output = a[:, words:words + count + 1]
+    if bits:
+        high = (output[:, 1:] << (WORD_BITS - bits)) & WORD_MASK
+        output = (output[:, :-1] >> bits) | high
+    else:
+        output = output[:, :-1]
+    return output.copy()
+
+
+def absolute_columns(a):
+    negative = negative_rows(a)
+    magnitude = a.copy()
+    magnitude[negative] = negate_columns(a[negative])
+    return magnitude, negative
+
+
+####################################################################
+# Batch operations
+
+def add(a, b):
+    a, b, kind, nbytes = unpack_pair(a, b)
+    return pack(add_columns(extend(a, 1), extend(b, 1)), kind, nbytes + 1)
+
+
+def subtract(a, b):
+    a, b, kind, nbytes = unpack_pair(a, b)
+    return pack(subtract_columns(extend(a, 1), extend(b, 1)), kind, nbytes + 1)
+
+
+def negate(a):
+    a, kind, nbytes = unpack(a)
+    return pack(negate_columns(extend(a, 1)), kind, nbytes + 1)
+
+
+def compare(a, b):
+    # -1, 0 or 1 per row, like comparing greater_than/equal row by row.
+    a, b, kind, nbytes = unpack_pair(a, b)
+    flip = numpy.uint64(1 << (WORD_BITS - 1))
+    a = a.copy()
+    b = b.copy()
+    a[:, -1] ^= flip
+    b[:, -1] ^= flip
+    return compare_unsigned_columns(a, b)
+
+
+def equal(a, b):
+    return compare(a, b) == 0
+
+
+def greater_than(a, b):
+    return compare(a, b) > 0
+
+
+def less_than(a, b):
+    return compare(a, b) < 0
+
+
+def shift_left(a, shift):
+    # a * 2**shift, the same value as applying big.twice shift times.
+    a, kind, nbytes = unpack(a)
+    grow = (shift + 7) // 8
+    count = (nbytes + grow + 3) // 4
+    return pack(shift_left_columns(extend(a, count - a.shape[1]), shift), kind, nbytes + grow)
+
+
+def shift_right(a, shift):
+    # floor(a / 2**shift), the same value as applying big.half shift times.
+    a, kind, nbytes = unpack(a)
+    return pack(shift_right_columns(a, shift), kind, nbytes)
+
+
+def multiply(a, b):
+    a, b, kind, nbytes = unpack_pair(a, b)
+    a_magnitude, a_negative = absolute_columns(a)
+    b_magnitude, b_negative = absolute_columns(b)
+    product = multiply_unsigned_columns(a_magnitude, b_magnitude)
+    negative = a_negative != b_negative
+    product[negative] = negate_columns(product[negative])
+    return pack(product, kind, 2 * nbytes)
+
+
+def divmod_unsigned_columns(a, b):
+    # Restoring division, one dividend bit per step for every row at once.
+    rows, count = a.shape
+    quotient = numpy.zeros_like(a)
+    remainder = numpy.zeros((rows, count + 1), dtype=numpy.uint64, order='F')
+    divisor = numpy.zeros((rows, count + 1), dtype=numpy.uint64, order='F')
+    divisor[:, :count] = b
+    for bit in range(WORD_BITS * count - 1, -1, -1):
+        word, offset = divmod(bit, WORD_BITS)
+        remainder = shift_left_columns(remainder, 1)
+        remainder[:, 0] |= (a[:, word] >> offset) & 1
+        fits = compare_unsigned_columns(remainder, divisor) >= 0
+        if fits.any():
+            remainder[fits] = subtract_columns(remainder[fits], divisor[fits])
+            quotient[fits, word] |= numpy.uint64(1 << offset)
+    return quotient, remainder[:, :count]
+
+
+def divmod_(a, b):
+    # Floor division with intarithmetic.divideWithRemainder's signs.
+    a, b, kind, nbytes = unpack_pair(a, b)
+    if not b.any(axis=1).all():
+        raise ZeroDivisionError('division by zero in batch')
+    a = extend(a, 1)
+    b = extend(b, 1)
+    a_magnitude, a_negative = absolute_columns(a)
+    b_magnitude, b_negative = absolute_columns(b)
+    quotient, remainder = divmod_unsigned_columns(a_magnitude, b_magnitude)
+
+    differ = a_negative != b_negative
+    adjust = differ & remainder.any(axis=1)
+    ones = numpy.zeros_like(quotient)
+    ones[:, 0] = 1
+    quotient[adjust] = add_columns(quotient[adjust], ones[adjust])
+    remainder[adjust] = subtract_columns(b_magnitude[adjust], remainder[adjust])
+    quotient[differ] = negate_columns(quotient[differ])
+    remainder[b_negative] = negate_columns(remainder[b_negative])
+    return pack(quotient, kind, nbytes + 1), pack(remainder, kind, nbytes)
+
+
+def divide(a, b):
+    return divmod_(a, b)[0]
+
+
+def modulo(a, b):
+    return divmod_(a, b)[1]
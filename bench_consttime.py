@@ -0,0 +1,106 @@
+# Benchmark and timing-variance harness for consttime.py.
+#
+# By default, compares the throughput of intarithmetic.moduloExp with the
+# constant-time Montgomery ladder on odd moduli of 256 to 2048 bits, with
+# full-width random exponents.
+#
+# With --variance, runs a fixed-versus-random test in the style of dudect
+# (Reparaz, Balasch and Verbauwhede, "Dude, is my code constant time?",
+# 2017): calls with one fixed exponent of low Hamming weight and calls with
+# random exponents are interleaved in random order, and Welch's t statistic
+# compares the two timing distributions. |t| above about 4.5 means the
+# running time depends on the exponent; timings in a shared process are
+# noisy, so use a quiet machine and enough samples. Run with:
+#
+#     python bench_consttime.py [--repeat N]
+#     python bench_consttime.py --variance [--bits N] [--samples N]
+
+import argparse
+import math
+import random
+import timeit
+
+import big
+import consttime
+import intarithmetic
+
+
+def operands(bits, rng):
+    nbytes = bits // 8 + 1
+    n = rng.getrandbits(bits) | (1 << (bits - 1)) | 1
+    a = rng.getrandbits(bits - 1)
+    b = rng.getrandbits(bits)
+    return [big.int2bytearray(x, nbytes) for x in (a, b, n)]
+
+
+def best_time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def timing_samples(function, a, classes, n, count, rng):
+    # Times function(a, b, n) count times for each exponent class, in
+    # random order; classes is a list of functions returning an exponent.
+    order = [k for k in range(len(classes)) for i in range(count)]
+    rng.shuffle(order)
+    samples = [[] for k in classes]
+    timer = timeit.default_timer
+    for k in order:
+        b = classes[k]()
+        start = timer()
+        function(a, b, n)
+        samples[k].append(timer() - start)
+    return samples
+
+
+def mean_variance(xs):
+    mean = sum(xs) / len(xs)
+    return mean, sum((x - mean) ** 2 for x in xs) / (len(xs) - 1)
+
+
+def welch_t(xs, ys):
+    mx, vx = mean_variance(xs)
+    my, vy = mean_variance(ys)
+    return (mx - my) / math.sqrt(vx / len(xs) + vy / len(ys))
+
+
+def throughput(args):
+    rng = random.Random(24)
+    print('%6s %14s %14s %10s' % ('bits', 'moduloExp (s)', 'ladder (s)', 'cost'))
+    for bits in (256, 512, 1024, 2048):
+        a, b, n = operands(bits, rng)
+        engine = best_time(lambda: intarithmetic.moduloExp(a, b, n), args.repeat)
+        ladder = best_time(lambda: consttime.modulo_exp(a, b, n), args.repeat)
+        print('%6d %14.6f %14.6f %9.1fx' % (bits, engine, ladder, ladder / engine))
+
+
+def variance(args):
+    rng = random.Random(24)
+    a, b, n = operands(args.bits, rng)
+    nbytes = len(n)
+    fixed = big.int2bytearray(1 << (args.bits - 1), nbytes)
+    classes = [lambda: fixed, lambda: big.int2bytearray(rng.getrandbits(args.bits), nbytes)]
+    print('%-10s %14s %14s %14s %14s %8s' % ('function', 'fixed mean', 'fixed stdev',
+                                             'random mean', 'random stdev', 't'))
+    for name, function in (('moduloExp', intarithmetic.moduloExp), ('ladder', consttime.modulo_exp)):
+        samples = timing_samples(function, a, classes, n, args.samples, rng)
+        (fm, fv), (rm, rv) = [mean_variance(s) for s in samples]
+        print('%-10s %14.6f %14.6f %14.6f %14.6f %8.1f' % (name, fm, math.sqrt(fv), rm, math.sqrt(rv),
+                                                           welch_t(*samples)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark constant-time moduloExp')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--variance', action='store_true',
+                        help='run the fixed-versus-random timing test instead')
+    parser.add_argument('--bits', type=int, default=256, help='modulus width for --variance')
+    parser.add_argument('--samples', type=int, default=200, help='calls per exponent class for --variance')
+    args = parser.parse_args(argv)
+    if args.variance:
+        variance(args)
+    else:
+        throughput(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Benchmark for the limb-based division engine in intarithmetic.py.
+#
+# Compares divide() against the original bit-serial recursive algorithm
+# on positive operands of 256 to 8192 bits. The divisor is half the width
+# of the dividend. Run with:
+#
+#     python bench_divide.py [--max-reference-bits N] [--repeat N]
+
+import argparse
+import random
+import sys
+import timeit
+
+import big
+import intarithmetic
+
+
+#The original recursive, one-bit-per-level division, kept as a reference
+def dividePositiveRecursive(a, b):
+    zero = bytearray(len(a))
+    if big.equal(a, zero):
+        return (zero, zero)
+    quotient, remainder = dividePositiveRecursive(big.half(a), b)
+    quotient = big.twice(quotient)
+    remainder = big.twice(remainder)
+    if not big.is_even(a):
+        remainder = incrementByOne(remainder)
+    if big.greater_than(remainder, b) or big.equal(remainder, b):
+        remainder = big.add(remainder, big.negate(b))
+        quotient = incrementByOne(quotient)
+    return (quotient, remainder)
+
+
+def incrementByOne(number):
+    return big.add(number, big.int2bytearray(1, len(number)))
+
+
+def operands(bits, rng):
+    nbytes = bits // 8
+    x = rng.getrandbits(bits - 1)
+    y = rng.getrandbits(bits // 2 - 1) | 1
+    return big.int2bytearray(x, nbytes), big.int2bytearray(y, nbytes)
+
+
+def best_time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark intarithmetic.divide')
+    parser.add_argument('--max-reference-bits', type=int, default=2048,
+                        help='skip the recursive reference above this width')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+    rng = random.Random(42)
+    print('%6s %14s %14s %10s' % ('bits', 'engine (s)', 'recursive (s)', 'speedup'))
+    for bits in (256, 512, 1024, 2048, 4096, 8192):
+        a, b = operands(bits, rng)
+        engine = best_time(lambda: intarithmetic.divideWithRemainder(a, b), args.repeat)
+        if bits <= args.max_reference_bits:
+            reference = best_time(lambda: dividePositiveRecursive(a, b), args.repeat)
+            print('%6d %14.6f %14.6f %9.1fx' % (bits, engine, reference, reference / engine))
+        else:
+            print('%6d %14.6f %14s %10s' % (bits, engine, '-', '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+# Benchmark harness for big.py and intarithmetic.py.
+#
+# Times add, multiply, half, twice, negate, divide, modulo and moduloExp
+# over operand widths from 1 to 1024 bytes and every combination of
+# operand signs. For each case it reports calls per second and, where
+# tracemalloc is available (Python 3), the peak memory one call
+# allocates. Results can be saved as JSON and compared with a saved
+# baseline; the script exits with status 1 if any case got slower than
+# the baseline by more than the threshold.
+#
+#     python benchmark.py --output baseline.json
+#     python benchmark.py --baseline baseline.json --threshold 0.10
+#
+# Case names are "operation/width/signs", e.g. "divide/64/+-". moduloExp
+# cases are "moduloExp/width/signs of base and modulus" and use a
+# positive exponent of the same width.
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+
+import big
+import intarithmetic
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+WIDTHS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+QUICK_WIDTHS = [1, 8, 64, 256]
+
+# Functions by module and name, looked up when a case is run so that
+# cache, instrument and consttime modes are timed as enabled.
+UNARY = {
+    'half': (big, 'half'),
+    'twice': (big, 'twice'),
+    'negate': (big, 'negate'),
+}
+BINARY = {
+    'add': (big, 'add'),
+    'multiply': (big, 'multiply'),
+    'divide': (intarithmetic, 'divide'),
+    'modulo': (intarithmetic, 'modulo'),
+}
+OPERATIONS = sorted(UNARY) + sorted(BINARY) + ['moduloExp']
+
+
+def operand(rng, nbytes, sign):
+    # A random value that uses the whole width, with the given sign.
+    bits = 8 * nbytes - 1
+    magnitude = rng.getrandbits(bits) | (1 << (bits - 1))
+    return big.int2bytearray(-magnitude if sign == '-' else magnitude, nbytes)
+
+
+def cases(operations, widths, max_exp_bytes):
+    # Yields (name, function, arguments). Operands are seeded by the case
+    # name, so a case gets the same operands whatever subset is run.
+    for operation in operations:
+        for nbytes in widths:
+            if operation in UNARY:
+                for sign in '+-':
+                    name = '%s/%d/%s' % (operation, nbytes, sign)
+                    rng = random.Random(name)
+                    yield name, getattr(*UNARY[operation]), (operand(rng, nbytes, sign),)
+            elif operation in BINARY:
+                for signs in ('++', '+-', '-+', '--'):
+                    name = '%s/%d/%s' % (operation, nbytes, signs)
+                    rng = random.Random(name)
+                    yield name, getattr(*BINARY[operation]), (operand(rng, nbytes, signs[0]),
+                                                              operand(rng, nbytes, signs[1]))
+            elif nbytes <= max_exp_bytes:
+                for signs in ('++', '+-', '-+', '--'):
+                    name = '%s/%d/%s' % (operation, nbytes, signs)
+                    rng = random.Random(name)
+                    yield name, intarithmetic.moduloExp, (operand(rng, nbytes, signs[0]),
+                                                          operand(rng, nbytes, '+'),
+                                                          operand(rng, nbytes, signs[1]))
+
+
+def measure(function, arguments, min_time):
+    # Calls per second, doubling the batch size until one batch takes
+    # at least min_time, then the best of three batches.
+    number = 1
+    while True:
+        elapsed = timeit.timeit(lambda: function(*arguments), number=number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    best = min([elapsed] + timeit.repeat(lambda: function(*arguments), number=number, repeat=2))
+    return number / best
+
+
+def peak_bytes(function, arguments):
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        function(*arguments)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(operations, widths, max_exp_bytes, min_time, report=None):
+    results = {}
+    for name, function, arguments in cases(operations, widths, max_exp_bytes):
+        results[name] = {
+            'ops_per_sec': measure(function, arguments, min_time),
+            'peak_bytes': peak_bytes(function, arguments),
+        }
+        if report:
+            report(name, results[name])
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'min_time': min_time,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    # Returns (name, baseline ops/sec, current ops/sec, ratio) for every
+    # case in both runs, and the names of the cases that regressed.
+    rows = []
+    regressions = []
+    for name in sorted(current['results']):
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['ops_per_sec']
+        after = current['results'][name]['ops_per_sec']
+        ratio = after / before
+        rows.append((name, before, after, ratio))
+        if ratio < 1 - threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_result(name, result):
+    peak = result['peak_bytes']
+    print('%-24s %14.1f ops/s %12s bytes peak' % (name, result['ops_per_sec'], '-' if peak is None else peak))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark big.py and intarithmetic.py')
+    parser.add_argument('--operations', default=','.join(OPERATIONS),
+                        help='comma-separated subset of: %s' % ', '.join(OPERATIONS))
+    parser.add_argument('--widths', help='comma-separated operand widths in bytes')
+    parser.add_argument('--quick', action='store_true', help='only widths %s' % QUICK_WIDTHS)
+    parser.add_argument('--max-exp-bytes', type=int, default=128,
+                        help='widest moduloExp operands to time')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per timing batch')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='slowdown that counts as a regression (0.10 = 10%%)')
+    args = parser.parse_args(argv)
+
+    operations = args.operations.split(',')
+    for operation in operations:
+        if operation not in OPERATIONS:
+            parser.error('unknown operation %r' % operation)
+    if args.widths:
+        widths = [int(width) for width in args.widths.split(',')]
+    else:
+        widths = QUICK_WIDTHS if args.quick else WIDTHS
+
+    current = run(operations, widths, args.max_exp_bytes, args.min_time, print_result)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(current, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as stream:
+            baseline = json.load(stream)
+        rows, regressions = compare(current, baseline, args.threshold)
+        print('')
+        print('%-24s %14s %14s %8s' % ('case', 'baseline', 'current', 'ratio'))
+        for name, before, after, ratio in rows:
+            flag = '  REGRESSION' if name in regressions else ''
+            print('%-24s %14.1f %14.1f %7.2fx%s' % (name, before, after, ratio, flag))
+        if regressions:
+            print('%d of %d cases regressed by more than %d%%' % (
+                len(regressions), len(rows), round(100 * args.threshold)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,54 +1,537 @@
 #! /usr/bin/python
 
 # Professor Dimitri Lisin
-import unittest
-import math
+import struct
+import sys
 
 
 ####################################################################
 # Functions for converting between python integers and integers
-# stored in bytearrays.
+# stored in bytearrays. Values that do not fit in nbytes wrap around
+# modulo 2**(8 * nbytes); nbytes=-1 picks the smallest width that holds
+# the value and its sign.
+SIGNED_FORMATS = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+
+
 def int2bytearray(val, nbytes=-1):
-    if val < 0:
-        val = -val
-        sign = -1
+    if nbytes == -1:
+        nbytes = (val if val >= 0 else ~val).bit_length() // 8 + 1
+    return bytearray(unsigned2bytes(val % (1 << (8 * nbytes)), nbytes))
+
+
+def bytearray2int(input_array):
+    # input_array may be any bytes-like object, including a memoryview.
+    return bytes2signed(input_array)
+
+
+def ints2bytearray(values, nbytes):
+    # Encode many values into one contiguous bytearray of nbytes records.
+    values = list(values)
+    if nbytes in SIGNED_FORMATS:
+        mask = 1 << (8 * nbytes)
+        half = mask >> 1
+        values = [(val + half) % mask - half for val in values]
+        return bytearray(struct.pack('>%d%s' % (len(values), SIGNED_FORMATS[nbytes]), *values))
+    mask = 1 << (8 * nbytes)
+    return bytearray(b''.join([unsigned2bytes(val % mask, nbytes) for val in values]))
+
+
+def bytearray2ints(buffer, nbytes):
+    # Decode every nbytes record of a contiguous buffer (a bytearray,
+    # bytes, mmap or memoryview). Records are read through a memoryview,
+    # so the buffer is not copied.
+    view = memoryview(buffer)
+    count = len(view) // nbytes
+    if nbytes in SIGNED_FORMATS:
+        return list(struct.unpack_from('>%d%s' % (count, SIGNED_FORMATS[nbytes]), view))
+    return [bytes2signed(view[i:i + nbytes]) for i in range(0, count * nbytes, nbytes)]
+
+
+if hasattr(int, 'from_bytes'):
+    def unsigned2bytes(val, nbytes):
+        return val.to_bytes(nbytes, 'big')
+
+    def bytes2signed(data):
+        return int.from_bytes(data, 'big', signed=True)
+else:
+    # Python 2 has no int.to_bytes/from_bytes; hex strings convert in
+    # linear time as well.
+    import binascii
+
+    def unsigned2bytes(val, nbytes):
+        return binascii.unhexlify('%0*x' % (2 * nbytes, val))
+
+    def bytes2signed(data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        if not data:
+            return 0
+        val = int(binascii.hexlify(data), 16)
+        if val >> (8 * len(data) - 1):
+            val -= 1 << (8 * len(data))
+        return val
+
+
+####################################################################
+# Functions for converting between bytearrays and lists of limbs.
+# A limb is an unsigned word of LIMB_BYTES bytes. Limb lists are
+# little-endian (least significant limb first) and hold the
+# magnitude of the number, i.e. the bytearray is read as unsigned.
+LIMB_BYTES = 8
+LIMB_FORMATS = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+# array.array typecodes by item size, for limbs kept in arrays. The
+# array module is imported on first use: on Python 3 it pulls in
+# collections.abc, which costs several times as much as this module.
+array = None
+LIMB_TYPECODES = {}
+
+
+def load_array():
+    global array
+    import array as module
+    for code in 'QLIHB':
+        try:
+            LIMB_TYPECODES[module.array(code).itemsize] = code
+        except ValueError:
+            # Python 2 has no 'Q'; 'L' is 8 bytes on 64-bit Unix.
+            pass
+    array = module
+    return module
+
+
+def to_limbs(array):
+    pad = -len(array) % LIMB_BYTES
+    if pad:
+        array = bytearray(pad) + array
+    count = len(array) // LIMB_BYTES
+    limbs = list(struct.unpack('>%d%s' % (count, LIMB_FORMATS[LIMB_BYTES]), bytes(array)))
+    limbs.reverse()
+    return limbs
+
+
+def from_limbs(limbs, nbytes):
+    # The caller guarantees that the magnitude fits in nbytes bytes.
+    count = len(limbs)
+    output = bytearray(count * LIMB_BYTES)
+    struct.pack_into('>%d%s' % (count, LIMB_FORMATS[LIMB_BYTES]), output, 0, *reversed(limbs))
+    if len(output) >= nbytes:
+        return output[len(output) - nbytes:]
+    return bytearray(nbytes - len(output)) + output
+
+
+def limb_array(values=()):
+    return (array or load_array()).array(LIMB_TYPECODES[LIMB_BYTES], values)
+
+
+def array_tobytes(limbs):
+    if bytes is str:
+        # Python 2 arrays only have tostring.
+        return limbs.tostring()
+    return limbs.tobytes()
+
+
+def to_limb_array(data):
+    # Like to_limbs, but into an array.array and converted in C: the
+    # reversed bytes are the limbs in little-endian byte order.
+    pad = -len(data) % LIMB_BYTES
+    if pad:
+        data = bytearray(pad) + data
+    limbs = limb_array(bytes(data)[::-1])
+    if sys.byteorder == 'big':
+        limbs.byteswap()
+    return limbs
+
+
+def from_limb_array(limbs, nbytes):
+    # The low nbytes bytes of the limbs, big-endian. Higher bytes are
+    # dropped, so the value wraps modulo 2**(8 * nbytes).
+    if sys.byteorder == 'big':
+        limbs = limb_array(limbs)
+        limbs.byteswap()
+    data = array_tobytes(limbs)[nbytes - 1::-1]
+    if len(data) < nbytes:
+        return bytearray(nbytes - len(data)) + data
+    return bytearray(data)
+
+
+def from_magnitude(limbs, nbytes, negative):
+    # Build a signed bytearray of at least nbytes bytes holding
+    # +/- the magnitude, growing it just enough for the sign bit.
+    magnitude = strip_limbs(limbs)
+    bits = limbs_bit_length(magnitude)
+    if negative and bits and is_power_of_two(magnitude):
+        # -2**k fits in the same width as 2**k - 1.
+        bits -= 1
+    output = from_limbs(magnitude, max(nbytes, bits // 8 + 1))
+    if negative:
+        negate_in_place(output)
+    return output
+
+
+###############################################################
+# Arithmetic functions for magnitudes stored as limb lists.
+
+def strip_limbs(limbs):
+    end = len(limbs)
+    while end and limbs[end - 1] == 0:
+        end -= 1
+    return limbs[:end]
+
+
+def limbs_bit_length(limbs):
+    # limbs must be stripped.
+    if not limbs:
+        return 0
+    return (len(limbs) - 1) * 8 * LIMB_BYTES + limbs[-1].bit_length()
+
+
+def is_power_of_two(limbs):
+    # limbs must be stripped and non-empty.
+    top = limbs[-1]
+    if top & (top - 1):
+        return False
+    for i in range(len(limbs) - 1):
+        if limbs[i]:
+            return False
+    return True
+
+
+def shift_limbs_left(limbs, shift):
+    # limbs << shift for any shift >= 0.
+    output = [0] * (len(limbs) + shift // (8 * LIMB_BYTES) + 1)
+    shift_limbs_left_into(output, limbs, shift)
+    if not output[-1]:
+        output.pop()
+    return output
+
+
+def shift_limbs_left_into(output, limbs, shift):
+    # Writes limbs << shift into output, which needs shift // bits + 1
+    # limbs more than limbs. A whole-limb move plus one pass of sub-limb
+    # shifts.
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    words, offset = divmod(shift, bits)
+    for i in range(words):
+        output[i] = 0
+    carry = 0
+    k = words
+    for limb in limbs:
+        output[k] = ((limb << offset) | carry) & mask
+        carry = limb >> (bits - offset) if offset else 0
+        k += 1
+    output[k] = carry
+
+
+def shift_limbs_right(limbs, shift):
+    # floor(limbs / 2**shift), as len(limbs) - shift // bits limbs.
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    words, offset = divmod(shift, bits)
+    output = list(limbs[words:])
+    if offset and output:
+        for i in range(len(output) - 1):
+            output[i] = (output[i] >> offset) | ((output[i + 1] << (bits - offset)) & mask)
+        output[-1] >>= offset
+    return output
+
+
+def limb_bits(limbs, start, count):
+    # Bits start .. start + count - 1 of the limbs as an int. Bits past
+    # the last limb are zero.
+    bits = 8 * LIMB_BYTES
+    i, offset = divmod(start, bits)
+    value = 0
+    shift = -offset
+    while shift < count and i < len(limbs):
+        value |= limbs[i] << shift if shift >= 0 else limbs[i] >> -shift
+        shift += bits
+        i += 1
+    return value & ((1 << count) - 1)
+
+
+def limbs_trailing_zeros(limbs):
+    # Number of low zero bits; the limbs must not all be zero.
+    i = 0
+    while not limbs[i]:
+        i += 1
+    limb = limbs[i]
+    return i * 8 * LIMB_BYTES + (limb & -limb).bit_length() - 1
+
+
+def add_limbs(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    output = list(a)
+    carry = 0
+    for i in range(len(b)):
+        total = output[i] + b[i] + carry
+        output[i] = total & mask
+        carry = total >> bits
+    i = len(b)
+    while carry and i < len(output):
+        total = output[i] + carry
+        output[i] = total & mask
+        carry = total >> bits
+        i += 1
+    if carry:
+        output.append(carry)
+    return output
+
+
+def subtract_limbs(a, b):
+    # Requires a >= b.
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    output = list(a)
+    borrow = 0
+    for i in range(len(b)):
+        diff = output[i] - b[i] - borrow
+        output[i] = diff & mask
+        borrow = diff < 0
+    i = len(b)
+    while borrow:
+        diff = output[i] - 1
+        output[i] = diff & mask
+        borrow = diff < 0
+        i += 1
+    return output
+
+
+def accumulate_limbs(output, limbs, offset):
+    # output += limbs << (offset limbs), in place. output must be
+    # long enough to hold the sum.
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    carry = 0
+    i = offset
+    for limb in limbs:
+        total = output[i] + limb + carry
+        output[i] = total & mask
+        carry = total >> bits
+        i += 1
+    while carry:
+        total = output[i] + carry
+        output[i] = total & mask
+        carry = total >> bits
+        i += 1
+
+
+def compare_limbs(a, b):
+    # Returns -1, 0 or 1. Leading zero limbs are allowed.
+    a = strip_limbs(a)
+    b = strip_limbs(b)
+    if len(a) != len(b):
+        return -1 if len(a) < len(b) else 1
+    for i in range(len(a) - 1, -1, -1):
+        if a[i] != b[i]:
+            return -1 if a[i] < b[i] else 1
+    return 0
+
+
+# Operand size, in limbs, from which multiply_limbs switches from the
+# schoolbook kernel to Karatsuba. Both operands must reach it.
+KARATSUBA_THRESHOLD = 32
+
+
+def multiply_limbs(a, b):
+    a = strip_limbs(a)
+    b = strip_limbs(b)
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return []
+    if len(b) < KARATSUBA_THRESHOLD:
+        return multiply_schoolbook(a, b)
+    return multiply_karatsuba(a, b)
+
+
+def multiply_limbs_into(output, a, b):
+    # output += a * b. output must be long enough for the product; when
+    # it starts zeroed it receives the product without any allocation
+    # below the Karatsuba threshold.
+    if min(len(a), len(b)) < KARATSUBA_THRESHOLD:
+        multiply_schoolbook_into(output, a, b)
     else:
-        sign = 1
+        accumulate_limbs(output, strip_limbs(multiply_limbs(a, b)), 0)
 
-    if nbytes == -1:
-        nbytes = int(math.ceil(math.log(val, 2)) / 8) + 1
 
-    array = bytearray(nbytes)
-    for i in range(nbytes - 1, -1, -1):
-        remainder = val % 256
-        val = val / 256
-        array[i] = remainder
+def multiply_schoolbook(a, b):
+    output = [0] * (len(a) + len(b))
+    multiply_schoolbook_into(output, a, b)
+    return output
 
-    if sign == -1:
-        negate_in_place(array)
 
-    return array
+def multiply_schoolbook_into(output, a, b):
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    for i in range(len(a)):
+        x = a[i]
+        if x == 0:
+            continue
+        carry = 0
+        k = i
+        for y in b:
+            total = output[k] + x * y + carry
+            output[k] = total & mask
+            carry = total >> bits
+            k += 1
+        while carry:
+            total = output[k] + carry
+            output[k] = total & mask
+            carry = total >> bits
+            k += 1
+
+
+def square_limbs(a):
+    a = strip_limbs(a)
+    output = [0] * (2 * len(a))
+    square_limbs_into(output, a)
+    return output
 
 
-def bytearray2int(input_array):
-    temp_array = bytearray(len(input_array))
-    temp_array[:] = input_array
-    sign = 1
-    if is_negative(temp_array):
-        negate_in_place(temp_array)
-        sign = -1
+def square_limbs_into(output, a):
+    # output = a * a; output must be zeroed and at least 2 * len(a) long.
+    # Schoolbook squaring computes each cross product once and doubles.
+    if len(a) >= KARATSUBA_THRESHOLD:
+        product = multiply_karatsuba(a, a)
+        output[:len(product)] = product
+        return
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    n = len(a)
+    for i in range(n):
+        x = a[i]
+        if x == 0:
+            continue
+        carry = 0
+        k = 2 * i + 1
+        for j in range(i + 1, n):
+            total = output[k] + x * a[j] + carry
+            output[k] = total & mask
+            carry = total >> bits
+            k += 1
+        output[i + n] = carry
 
-    val = 0
-    factor = 1
-    for i in range(len(temp_array) - 1, -1, -1):
-        val += temp_array[i] * factor
-        factor *= 256
-    return sign * val
+    carry = 0
+    for i in range(n):
+        square = a[i] * a[i]
+        total = (output[2 * i] << 1) + (square & mask) + carry
+        output[2 * i] = total & mask
+        carry = total >> bits
+        total = (output[2 * i + 1] << 1) + (square >> bits) + carry
+        output[2 * i + 1] = total & mask
+        carry = total >> bits
+
+
+def multiply_karatsuba(a, b):
+    # len(a) >= len(b) >= KARATSUBA_THRESHOLD.
+    half = (len(a) + 1) // 2
+    output = [0] * (len(a) + len(b) + 1)
+    a0, a1 = a[:half], a[half:]
+    if len(b) <= half:
+        # Unbalanced operands: split only the longer one.
+        accumulate_limbs(output, multiply_limbs(a0, b), 0)
+        accumulate_limbs(output, multiply_limbs(a1, b), half)
+        return output
+
+    b0, b1 = b[:half], b[half:]
+    z0 = multiply_limbs(a0, b0)
+    z2 = multiply_limbs(a1, b1)
+    z1 = multiply_limbs(add_limbs(a0, a1), add_limbs(b0, b1))
+    z1 = subtract_limbs(subtract_limbs(z1, z0), z2)
+    accumulate_limbs(output, z0, 0)
+    accumulate_limbs(output, strip_limbs(z1), half)
+    accumulate_limbs(output, z2, 2 * half)
+    return output
+
+
+class ScratchPool(object):
+    # Free lists of zero-filled limb lists, keyed by length, so that hot
+    # loops can reuse their temporaries instead of allocating new ones.
+    def __init__(self):
+        self.free = {}
+        self.zeros = {}
+
+    def take(self, size):
+        buffers = self.free.get(size)
+        if buffers:
+            return buffers.pop()
+        return [0] * size
+
+    def give(self, buffer):
+        # The buffer is zeroed on return, with a C-level slice copy.
+        size = len(buffer)
+        zeros = self.zeros.get(size)
+        if zeros is None:
+            zeros = self.zeros[size] = [0] * size
+        buffer[:] = zeros
+        self.free.setdefault(size, []).append(buffer)
 
 
 ###############################################################
 # Arithmetic functions for integers represented as bytearrays.
 
+# Width of the results of add, half, twice, multiply and the arithmetic
+# shifts, and of intarithmetic's divide, modulo and moduloExp:
+#   None       as wide as the widest operand, grown when the result
+#              needs more bytes (the default);
+#   'minimal'  trimmed to the fewest bytes that hold the value, so widths
+#              do not creep up over long chains of operations;
+#   an int     exactly that many bytes; results that do not fit raise
+#              OverflowError.
+RESULT_WIDTH = None
+
+
+def trim(array):
+    # The same value in the fewest bytes, dropping redundant sign bytes.
+    return bytearray(array[len(array) - (signed_bit_length(array) // 8 + 1):])
+
+
+def normalize(array, nbytes=None):
+    # The same value trimmed to its minimal width, or sign-extended or
+    # trimmed to exactly nbytes; OverflowError if it does not fit.
+    minimal = signed_bit_length(array) // 8 + 1
+    if nbytes is None:
+        nbytes = minimal
+    elif nbytes < minimal:
+        raise OverflowError('value does not fit in %d bytes' % nbytes)
+    if nbytes > len(array):
+        return sign_extend(array, nbytes - len(array))
+    return bytearray(array[len(array) - nbytes:])
+
+
+def fit_result(array):
+    # Applies RESULT_WIDTH to a result.
+    if RESULT_WIDTH is None:
+        return array
+    if RESULT_WIDTH == 'minimal':
+        return normalize(array)
+    return normalize(array, RESULT_WIDTH)
+
+
+class result_width(object):
+    # Sets RESULT_WIDTH for a block of code:
+    #     with big.result_width('minimal'):
+    #         ...
+    def __init__(self, width):
+        self.width = width
+
+    def __enter__(self):
+        global RESULT_WIDTH
+        self.saved = RESULT_WIDTH
+        RESULT_WIDTH = self.width
+        return self
+
+    def __exit__(self, *exc_info):
+        global RESULT_WIDTH
+        RESULT_WIDTH = self.saved
+        return False
+
+
 def is_negative(array):
     return get_highest_bit(array[0]) != 0
 
@@ -72,19 +555,14 @@ def sign_extend(array, nbytes=1):
 
 
 def make_same_size(a, b):
+    # Operands that are already wide enough are returned as they are,
+    # not copied; callers only read them.
     if len(a) < len(b):
-        a_pad = sign_extend(a, len(b) - len(a))
-    else:
-        a_pad = bytearray(len(a))
-        a_pad[:] = a
-
-    if len(b) < len(a):
-        b_pad = sign_extend(b, len(a) - len(b))
-    else:
-        b_pad = bytearray(len(b))
-        b_pad[:] = b
+        a = sign_extend(a, len(b) - len(a))
+    elif len(b) < len(a):
+        b = sign_extend(b, len(a) - len(b))
 
-    return [a_pad, b_pad]
+    return [a, b]
 
 
 def add(a, b):
@@ -96,15 +574,12 @@ def add(a, b):
         b_pad = sign_extend(b_pad)
         c = add_aux(a_pad, b_pad)
 
-    return c
+    return fit_result(c)
 
 
 def equal(a, b):
     [a_pad, b_pad] = make_same_size(a, b)
-    for i in range(len(a_pad)):
-        if a_pad[i] != b_pad[i]:
-            return False
-    return True
+    return bytearray(a_pad) == bytearray(b_pad)
 
 
 def greater_than(a, b):
@@ -128,64 +603,281 @@ def is_even(array):
 
 
 def half(array):
+    # Rounds toward minus infinity, like shift_right(array, 1).
     if is_negative(array):
-        output = negate(array)
-        if is_even(output):
-            return negate(half_positive(output))
-        else:
-            return add(negate(half_positive(output)), int2bytearray(-1, len(output)))
+        return shift_right(array, 1)
     else:
-        return half_positive(array)
+        return fit_result(half_positive(array))
 
 
 def twice(array):
     if is_negative(array):
-        return negate(twice_positive(negate(array)))
+        return shift_left(array, 1)
     else:
-        return twice_positive(array)
+        return fit_result(twice_positive(array))
 
 
 def multiply(a, b):
-    if len(a) < len(b):
-        a_pad = sign_extend(a, len(b) - len(a))
-    else:
-        a_pad = a
+    # The product is as wide as the wider operand, or wider if needed.
+    negative = is_negative(a) != is_negative(b)
+    if is_negative(a):
+        a = negate(a)
+    if is_negative(b):
+        b = negate(b)
+    product = multiply_limbs(to_limbs(a), to_limbs(b))
+    return fit_result(from_magnitude(product, max(len(a), len(b)), negative))
+
+
+# Shifts by any number of bits, done as one limb move and one sub-limb
+# pass rather than repeated half/twice. The arithmetic shifts work on the
+# signed value: shift_left grows the width as needed, like twice, and
+# shift_right rounds toward minus infinity, like half. The logical shifts
+# treat the bytearray as unsigned and keep its width; shift_left_logical
+# drops the bits shifted out.
+
+def shift_left(array, shift):
+    check_shift(shift)
+    out = bytearray(max(len(array), (signed_bit_length(array) + shift) // 8 + 1))
+    shift_into(out, array, shift)
+    return fit_result(out)
+
+
+def shift_right(array, shift):
+    check_shift(shift)
+    out = bytearray(len(array))
+    shift_into(out, array, -shift)
+    return fit_result(out)
+
 
-    if len(b) < len(a):
-        b_pad = sign_extend(b, len(a) - len(b))
+def shift_left_logical(array, shift):
+    check_shift(shift)
+    out = bytearray(len(array))
+    shift_into(out, array, shift)
+    return out
+
+
+def shift_right_logical(array, shift):
+    check_shift(shift)
+    out = bytearray(len(array))
+    shift_into(out, bytearray(1) + array, -shift)
+    return out
+
+
+def check_shift(shift):
+    if shift < 0:
+        raise ValueError('negative shift count')
+
+
+def bit_length(array):
+    # Bits in the magnitude, like int.bit_length().
+    magnitude = bytearray(negate(array) if is_negative(array) else array).lstrip(b'\0')
+    if not magnitude:
+        return 0
+    return 8 * (len(magnitude) - 1) + magnitude[0].bit_length()
+
+
+def signed_bit_length(array):
+    # Bits needed besides the sign bit: x.bit_length() for x >= 0 and
+    # (~x).bit_length() for x < 0.
+    if not is_negative(array):
+        return bit_length(array)
+    rest = bytearray(array).lstrip(b'\xff')
+    if not rest:
+        return 0
+    return 8 * (len(rest) - 1) + (~rest[0] & 0xff).bit_length()
+
+
+def test_bit(array, i):
+    # Bit i of the two's-complement value; bits above the width repeat
+    # the sign bit.
+    if i >= 8 * len(array):
+        return 1 if is_negative(array) else 0
+    return (array[len(array) - 1 - i // 8] >> (i % 8)) & 1
+
+
+def count_trailing_zeros(array):
+    # Number of low zero bits, or 8 * len(array) for zero.
+    rest = bytearray(array).rstrip(b'\0')
+    if not rest:
+        return 8 * len(array)
+    last = rest[-1]
+    return 8 * (len(array) - len(rest)) + (last & -last).bit_length() - 1
+
+
+#############################################################
+# In-place variants. Each one writes its result into a caller-supplied
+# bytearray or writable memoryview `out` and allocates no bytearrays.
+# Operands of any width are read sign-extended, and the result wraps
+# modulo 2**(8 * len(out)). Each returns True if the true result did
+# not fit in out, i.e. on signed overflow.
+
+def read_limbs(array, count):
+    # Little-endian limbs of the two's-complement array, sign-extended or
+    # truncated to count limbs.
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    head = len(array) % LIMB_BYTES
+    words = struct.unpack_from('>%dB%d%s' % (head, len(array) // LIMB_BYTES, LIMB_FORMATS[LIMB_BYTES]), array)
+    fill = mask if words and words[0] >> ((8 if head else bits) - 1) else 0
+    limbs = list(words[head:])
+    limbs.reverse()
+    if head:
+        top = 0
+        for byte in words[:head]:
+            top = (top << 8) | byte
+        limbs.append(top | (fill & ~((1 << (8 * head)) - 1) & mask))
+    if len(limbs) < count:
+        limbs.extend([fill] * (count - len(limbs)))
+    return limbs[:count]
+
+
+def write_limbs(out, limbs):
+    # Store the low len(out) bytes of the little-endian limbs into out.
+    head = len(out) % LIMB_BYTES
+    count = len(out) // LIMB_BYTES
+    values = []
+    if head:
+        top = limbs[count] if count < len(limbs) else 0
+        for shift in range(8 * (head - 1), -1, -8):
+            values.append((top >> shift) & 0xff)
+    for i in range(count - 1, -1, -1):
+        values.append(limbs[i] if i < len(limbs) else 0)
+    struct.pack_into('>%dB%d%s' % (head, count, LIMB_FORMATS[LIMB_BYTES]), out, 0, *values)
+
+
+def fits_signed(limbs, nbytes):
+    # True if the two's-complement limbs hold a value that fits in nbytes.
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    index, offset = divmod(8 * nbytes - 1, bits)
+    if index >= len(limbs):
+        return True
+    high = limbs[index] >> offset
+    if high == 0:
+        fill = 0
+    elif high == (1 << (bits - offset)) - 1:
+        fill = mask
     else:
-        b_pad = b
+        return False
+    for i in range(index + 1, len(limbs)):
+        if limbs[i] != fill:
+            return False
+    return True
 
-    if is_negative(a_pad) and is_negative(b_pad):
-        return multiply_positive(negate(a_pad), negate(b_pad))
-    elif is_negative(a_pad):
-        return negate(multiply_positive(negate(a_pad), b_pad))
-    elif is_negative(b_pad):
-        return negate(multiply_positive(a_pad, negate(b_pad)))
+
+def work_limbs(out, *operands):
+    # Limbs needed to hold an exact result that is at most one limb wider
+    # than both out and the operands.
+    nbytes = max([len(out)] + [len(operand) for operand in operands])
+    return (nbytes + LIMB_BYTES - 1) // LIMB_BYTES + 1
+
+
+def sign_extend_into(out, array):
+    x = read_limbs(array, work_limbs(out, array))
+    write_limbs(out, x)
+    return not fits_signed(x, len(out))
+
+
+def add_into(out, a, b):
+    count = work_limbs(out, a, b)
+    x = read_limbs(a, count)
+    y = read_limbs(b, count)
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    carry = 0
+    for i in range(count):
+        total = x[i] + y[i] + carry
+        x[i] = total & mask
+        carry = total >> bits
+    write_limbs(out, x)
+    return not fits_signed(x, len(out))
+
+
+def negate_into(out, array):
+    count = work_limbs(out, array)
+    x = read_limbs(array, count)
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    carry = 1
+    for i in range(count):
+        total = (~x[i] & mask) + carry
+        x[i] = total & mask
+        carry = total >> bits
+    write_limbs(out, x)
+    return not fits_signed(x, len(out))
+
+
+def shift_into(out, array, shift):
+    # Multiply by 2**shift for shift > 0, floor-divide by 2**-shift for
+    # shift < 0.
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    words, offset = divmod(abs(shift), bits)
+    count = work_limbs(out, array)
+    if shift >= 0:
+        count += words + 1
+        x = read_limbs(array, count)
+        result = [0] * count
+        carry = 0
+        for i in range(count - words):
+            limb = x[i]
+            result[i + words] = ((limb << offset) | carry) & mask
+            carry = limb >> (bits - offset) if offset else 0
     else:
-        return multiply_positive(a_pad, b_pad)
+        x = read_limbs(array, count + words + 1)
+        result = [0] * count
+        for i in range(count):
+            high = (x[i + words + 1] << (bits - offset)) & mask if offset else 0
+            result[i] = (x[i + words] >> offset) | high
+    write_limbs(out, result)
+    return not fits_signed(result, len(out))
+
+
+def half_into(out, array):
+    return shift_into(out, array, -1)
+
+
+def twice_into(out, array):
+    return shift_into(out, array, 1)
+
+
+def multiply_into(out, a, b):
+    # Two's-complement products wrap the same way unsigned ones do, so
+    # the sign-extended operands are multiplied as unsigned limbs.
+    count = work_limbs(out, a) + work_limbs(out, b)
+    product = [0] * (2 * count)
+    multiply_limbs_into(product, read_limbs(a, count), read_limbs(b, count))
+    del product[count:]
+    write_limbs(out, product)
+    return not fits_signed(product, len(out))
 
 
 #############################################################
 # Helper functions
 
+# The kernels below work a limb at a time on array.array limbs, with
+# to_limb_array/from_limb_array converting at the edges. Operands that
+# fit in a single limb skip the conversion and are handled as one int.
+
 def add_aux(a, b):
-    c = bytearray(len(a))
+    if len(a) <= LIMB_BYTES:
+        return int2bytearray(bytearray2int(a) + bytearray2int(b), len(a))
+    x = to_limb_array(a)
+    y = to_limb_array(b)
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
     carry = 0
-    for i in range(len(a) - 1, -1, -1):
-        val = a[i] + b[i] + carry
-        c[i] = val & 0xff
-        carry = val >> 8
+    for i in range(len(x)):
+        val = x[i] + y[i] + carry
+        x[i] = val & mask
+        carry = val >> bits
 
-    return c
+    return from_limb_array(x, len(a))
 
 
 def greater_positive(a, b):
-    for i in range(len(a)):
-        if a[i] > b[i]:
-            return True
-        elif a[i] < b[i]:
-            return False
+    # Big-endian magnitudes of the same width compare like strings.
+    return bytearray(a) > bytearray(b)
 
 
 def greater_negative(a, b):
@@ -203,15 +895,16 @@ def get_highest_bit(byte):
 
 
 def half_positive(array):
-    output = bytearray(len(array))
-    carry = 0
-
-    for i in range(0, len(array)):
-        val = array[i]
-        output[i] = (val >> 1) + carry
-        carry = (get_lowest_bit(val) << 7) & 0xff
+    if len(array) <= LIMB_BYTES:
+        return int2bytearray((bytearray2int(array) % (1 << (8 * len(array)))) >> 1, len(array))
+    limbs = to_limb_array(array)
+    top = 8 * LIMB_BYTES - 1
+    for i in range(len(limbs) - 1):
+        limbs[i] = (limbs[i] >> 1) | ((limbs[i + 1] & 1) << top)
+    if limbs:
+        limbs[-1] >>= 1
 
-    return output
+    return from_limb_array(limbs, len(array))
 
 
 def twice_positive(array):
@@ -225,432 +918,36 @@ def twice_positive(array):
 
 
 def twice_positive_impl(array):
-    output = bytearray(len(array))
+    if len(array) <= LIMB_BYTES:
+        return int2bytearray(bytearray2int(array) << 1, len(array))
+    limbs = to_limb_array(array)
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
     carry = 0
-    for i in range(len(array) - 1, -1, -1):
-        val = ((array[i] << 1) + carry)
-        carry = val >> 8
-        output[i] = val & 0xff
+    for i in range(len(limbs)):
+        val = (limbs[i] << 1) | carry
+        carry = val >> bits
+        limbs[i] = val & mask
 
-    return output
+    return from_limb_array(limbs, len(array))
 
 
 def multiply_positive(x, y):
-    zero = bytearray(len(x))
-    if equal(y, zero):
-        return zero
-
-    z = multiply_positive(x, half(y))
-    if is_even(y):
-        return twice(z)
-    else:
-        return add(x, twice(z))
+    product = multiply_limbs(to_limbs(x), to_limbs(y))
+    return from_magnitude(product, max(len(x), len(y)), False)
 
 
 def negate_in_place(array):
-    for i in range(len(array)):
-        array[i] = ~array[i] & 0xff
-
-    val = array[-1] + 1
-    array[-1] = val & 0xff
-    carry = val >> 8
-
-    for i in range(len(array) - 2, -1, -1):
-        val = array[i] + carry
-        array[i] = val & 0xff
-        carry = val >> 8
-
-
-##############################################
-# Tests
-
-class TestIntToBytearray(unittest.TestCase):
-    def test0(self):
-        nbytes = 4
-        b = int2bytearray(0, nbytes)
-        for i in range(len(b)):
-            self.assertEqual(b[i], 0)
-
-    def test5(self):
-        nbytes = 4
-        b = int2bytearray(5, nbytes)
-        self.assertEqual(b[nbytes - 1], 5)
-
-    def test256(self):
-        nbytes = 4
-        b = int2bytearray(256, nbytes)
-        self.assertEqual(b[nbytes - 1], 0)
-        self.assertEqual(b[nbytes - 2], 1)
-
-    def testAutosize5(self):
-        b = int2bytearray(5)
-        self.assertEqual(len(b), 1)
-        self.assertEqual(bytearray2int(b), 5)
-
-    def testAutosize729(self):
-        b = int2bytearray(729)
-        self.assertEqual(len(b), 2)
-        self.assertEqual(bytearray2int(b), 729)
-
-
-##############################################
-class TestBytearrayToInt(unittest.TestCase):
-    def test0(self):
-        nbytes = 4
-        array = bytearray(nbytes)
-        val = bytearray2int(array)
-        self.assertEqual(val, 0)
-
-    def test5(self):
-        nbytes = 4
-        array = bytearray(nbytes)
-        array[nbytes - 1] = 5;
-        val = bytearray2int(array)
-        self.assertEqual(val, 5)
-
-    def test256(self):
-        nbytes = 4
-        array = bytearray(nbytes)
-        array[nbytes - 2] = 1;
-        val = bytearray2int(array)
-        self.assertEqual(val, 256)
-
-
-##############################################
-class TestNegation(unittest.TestCase):
-    def test0(self):
-        array = bytearray(4)
-        negate_in_place(array)
-        self.assertEqual(bytearray2int(array), 0)
-
-    def testNeg5(self):
-        nbytes = 4
-        array = int2bytearray(5, nbytes)
-        negate_in_place(array)
-        self.assertEqual(bytearray2int(array), -5)
-
-    def testNeg50000(self):
-        nbytes = 4
-        array = int2bytearray(50000, nbytes)
-        negate_in_place(array)
-        self.assertEqual(bytearray2int(array), -50000)
-
-    def testCreateNegativeArray(self):
-        nbytes = 4
-        array = int2bytearray(-50000, nbytes)
-        self.assertTrue(is_negative(array))
-        self.assertEqual(bytearray2int(array), -50000)
-
-
-##############################################
-class TestAddition(unittest.TestCase):
-    def test0and0(self):
-        a = bytearray(4)
-        b = bytearray(4)
-        c = add(a, b)
-        self.assertEqual(bytearray2int(c), 0)
-
-    def test10and5(self):
-        nbytes = 4
-        a = int2bytearray(10, nbytes)
-        b = int2bytearray(5, nbytes)
-        c = add(a, b)
-        self.assertEqual(bytearray2int(c), 15)
-
-    def testBigNumbers(self):
-        nbytes = 4
-        x = 50000
-        y = 60729
-        a = int2bytearray(x, nbytes)
-        b = int2bytearray(y, nbytes)
-        c = add(a, b)
-        self.assertEqual(bytearray2int(c), x + y)
-
-    def testAddNegative(self):
-        nbytes = 4
-        x = 50000
-        y = -60729
-        a = int2bytearray(x, nbytes)
-        b = int2bytearray(y, nbytes)
-        c = add(a, b)
-        self.assertEqual(bytearray2int(c), x + y)
-
-    def testPositiveOverflow(self):
-        nbytes = 4
-        a = bytearray(nbytes)
-        b = bytearray(nbytes)
-        a[0] = 0x7f
-        b[0] = 0x7f
-        for i in range(1, len(a)):
-            a[i] = 0xff
-            b[i] = 0xff
-        c = add(a, b)
-        self.assertFalse(is_negative(c))
-        self.assertEqual(len(c), len(a) + 1)
-
-    def testSignExtension(self):
-        nbytes = 4
-        a = int2bytearray(-5, nbytes)
-        b = sign_extend(a)
-        self.assertEqual(bytearray2int(a), bytearray2int(b))
-        self.assertEqual(len(b), len(a) + 1)
-
-    def testNegativeOverflow(self):
-        nbytes = 2
-        val = -32768
-        a = int2bytearray(val, nbytes)
-        b = int2bytearray(val, nbytes)
-
-        self.assertTrue(is_negative(a))
-        self.assertTrue(is_negative(b))
-
-        c = add(a, b)
-        self.assertTrue(is_negative(c))
-        self.assertEqual(len(c), len(a) + 1)
-
-    def testAddDifferentSizes(self):
-        val = 32767
-        a = int2bytearray(val, 2)
-        b = int2bytearray(2 * val, 4)
-        c = add(a, b)
-        self.assertEqual(len(c), len(b))
-        self.assertEqual(bytearray2int(c), 3 * val)
-
-        c = add(b, a)
-        self.assertEqual(bytearray2int(c), 3 * val)
-
-
-##############################################
-class TestEqual(unittest.TestCase):
-    def test10and5(self):
-        nbytes = 4
-        a = int2bytearray(10, nbytes)
-        b = int2bytearray(5, nbytes)
-        self.assertFalse(equal(a, b))
-        self.assertTrue(equal(a, a))
-
-    def testDifferenceSizes(self):
-        a = int2bytearray(5, 2)
-        b = int2bytearray(5, 8)
-        self.assertTrue(equal(a, b))
-
-
-##############################################
-class TestGreaterPositive(unittest.TestCase):
-    def test10and5(self):
-        nbytes = 4
-        a = int2bytearray(10, nbytes)
-        b = int2bytearray(5, nbytes)
-        self.assertTrue(greater_positive(a, b))
-        self.assertFalse(greater_positive(b, a))
-        self.assertFalse(greater_positive(a, a))
-
-
-##############################################
-class TestGreaterNegative(unittest.TestCase):
-    def testNeg10and5(self):
-        nbytes = 4
-        a = int2bytearray(-10, nbytes)
-        b = int2bytearray(-5, nbytes)
-        self.assertTrue(greater_negative(b, a))
-        self.assertFalse(greater_negative(a, b))
-        self.assertFalse(greater_negative(b, b))
-
-
-##############################################
-class TestGreaterThan(unittest.TestCase):
-    def testPositives(self):
-        nbytes = 4
-        a = int2bytearray(10, nbytes)
-        b = int2bytearray(5, nbytes)
-        self.assertTrue(greater_than(a, b))
-        self.assertFalse(greater_than(b, a))
-        self.assertFalse(greater_than(a, a))
-
-    def testNegatives(self):
-        nbytes = 4
-        a = int2bytearray(-10, nbytes)
-        b = int2bytearray(-5, nbytes)
-        self.assertTrue(greater_than(b, a))
-        self.assertFalse(greater_than(a, b))
-        self.assertFalse(greater_than(b, b))
-
-    def testMixedSigns(self):
-        nbytes = 4
-        a = int2bytearray(-10, nbytes)
-        b = int2bytearray(5, nbytes)
-        self.assertTrue(greater_than(b, a))
-        self.assertFalse(greater_than(a, b))
-        self.assertFalse(greater_than(b, b))
-
-    def testDifferentSizes(self):
-        a = int2bytearray(100)
-        b = int2bytearray(48957655)
-        self.assertFalse(greater_than(a, b))
-
-
-##############################################
-class TestLessThan(unittest.TestCase):
-    def testPositives(self):
-        nbytes = 4
-        a = int2bytearray(10, nbytes)
-        b = int2bytearray(5, nbytes)
-        self.assertFalse(less_than(a, b))
-        self.assertTrue(less_than(b, a))
-        self.assertFalse(less_than(a, a))
-
-    def testNegatives(self):
-        nbytes = 4
-        a = int2bytearray(-10, nbytes)
-        b = int2bytearray(-5, nbytes)
-        self.assertFalse(less_than(b, a))
-        self.assertTrue(less_than(a, b))
-        self.assertFalse(less_than(b, b))
-
-    def testMixedSigns(self):
-        nbytes = 4
-        a = int2bytearray(-10, nbytes)
-        b = int2bytearray(5, nbytes)
-        self.assertFalse(less_than(b, a))
-        self.assertTrue(less_than(a, b))
-        self.assertFalse(less_than(b, b))
-
-
-##############################################
-class TestIsEven(unittest.TestCase):
-    def test4(self):
-        nbytes = 8
-        a = int2bytearray(4, nbytes)
-        self.assertTrue(is_even(a))
-
-    def test3(self):
-        nbytes = 8
-        a = int2bytearray(3, nbytes)
-        self.assertFalse(is_even(a))
-
-
-##############################################
-class TestHalf(unittest.TestCase):
-    def test4(self):
-        nbytes = 1
-        a = int2bytearray(4, nbytes)
-        self.assertFalse(is_negative(a))
-        b = half(a)
-        self.assertEqual(bytearray2int(b), 2)
-
-    def test500(self):
-        nbytes = 16
-        a = int2bytearray(500, nbytes)
-        b = half(a)
-        self.assertEqual(bytearray2int(b), 250)
-
-    def test501(self):
-        nbytes = 16
-        a = int2bytearray(501, nbytes)
-        b = half(a)
-        self.assertEqual(bytearray2int(b), 250)
-
-    def testNeg4(self):
-        nbytes = 16
-        a = int2bytearray(-4, nbytes)
-        b = half(a)
-        self.assertEqual(bytearray2int(b), -2)
-
-    def testNeg5(self):
-        nbytes = 16
-        a = int2bytearray(-5, nbytes)
-        b = half(a)
-        self.assertEqual(bytearray2int(b), -3)
-
-
-##############################################
-class TestTwice(unittest.TestCase):
-    def test4(self):
-        nbytes = 1
-        a = int2bytearray(4, nbytes)
-        b = twice(a)
-        self.assertEqual(bytearray2int(b), 8)
-
-    def test250(self):
-        nbytes = 16
-        a = int2bytearray(250, nbytes)
-        b = twice(a)
-        self.assertEqual(bytearray2int(b), 500)
-
-    def testNeg250(self):
-        nbytes = 16
-        a = int2bytearray(-250, nbytes)
-        b = twice(a)
-        self.assertEqual(bytearray2int(b), -500)
-
-    def testOverflow(self):
-        nbytes = 2
-        val = 32767
-        a = int2bytearray(val, nbytes)
-        b = twice(a)
-        self.assertEqual(len(b), 3)
-        self.assertEqual(bytearray2int(b), 2 * val)
-
-
-##############################################
-class TestMultiply(unittest.TestCase):
-    def testZero(self):
-        nbytes = 4
-        x = int2bytearray(729, nbytes)
-        y = int2bytearray(0, nbytes)
-        z = multiply(x, y)
-        self.assertEqual(bytearray2int(z), 0)
-
-    def testBigNumbers(self):
-        nbytes = 4
-        x = int2bytearray(729, nbytes)
-        y = int2bytearray(927, nbytes)
-        z = multiply(x, y)
-        self.assertEqual(bytearray2int(z), 729 * 927)
-
-    def testBigNegativeNumbers(self):
-        nbytes = 4
-        x = int2bytearray(-729, nbytes)
-        y = int2bytearray(-927, nbytes)
-        z = multiply(x, y)
-        self.assertEqual(bytearray2int(z), -729 * -927)
-
-    def testBigMixedNumbers1(self):
-        nbytes = 4
-        x = int2bytearray(-729, nbytes)
-        y = int2bytearray(927, nbytes)
-        z = multiply(x, y)
-        self.assertEqual(bytearray2int(z), -729 * 927)
-
-    def testBigMixedNumbers2(self):
-        nbytes = 4
-        x = int2bytearray(729, nbytes)
-        y = int2bytearray(-927, nbytes)
-        z = multiply(x, y)
-        self.assertEqual(bytearray2int(z), -729 * 927)
-
-    def testInfinitePrecision(self):
-        nbytes = 2
-        val = 32767
-        x = int2bytearray(val, nbytes)
-        y = int2bytearray(val, nbytes)
-        z = multiply(x, y)
-        self.assertEqual(bytearray2int(z), val * val)
-        self.assertEqual(len(z), 4)
-
-    def testDifferentSizes(self):
-        a = 729
-        b = 123456789
-        x = int2bytearray(a)
-        y = int2bytearray(b)
-        c = multiply(x, y)
-        self.assertEqual(bytearray2int(c), a * b)
-
-        c = multiply(y, x)
-        self.assertEqual(bytearray2int(c), b * a)
-
-
-##############################################
-if __name__ == '__main__':
-    # run the unit tests
-    unittest.main()
+    if len(array) <= LIMB_BYTES:
+        array[:] = int2bytearray(-bytearray2int(array), len(array))
+        return
+    limbs = to_limb_array(array)
+    bits = 8 * LIMB_BYTES
+    mask = (1 << bits) - 1
+    carry = 1
+    for i in range(len(limbs)):
+        val = (~limbs[i] & mask) + carry
+        limbs[i] = val & mask
+        carry = val >> bits
+
+    array[:] = from_limb_array(limbs, len(array))
@@ -0,0 +1,223 @@
+# BigInt: an immutable integer value type over a limb array.
+#
+# A BigInt stores its sign separately from its magnitude, which is kept
+# as little-endian LIMB_BYTES-wide limbs in an array.array, so operations
+# never re-derive the sign or sign-extend and pad their operands. The bit
+# length is computed once per value. Arithmetic goes straight to the limb
+# kernels in big.py and intarithmetic.py.
+#
+# width is the bytearray width the value converts back to: the width it
+# was created from, or for results the wider operand's width. Converting
+# to a bytearray grows it only if the value needs more bytes, so
+# from_bytearray(a).to_bytearray() == a.
+
+import functools
+import numbers
+
+import big
+import intarithmetic
+
+
+def integral(method):
+    # Binary operators take BigInts and integers, coerced to BigInt; for
+    # anything else they return NotImplemented, so that Python tries the
+    # other operand and then raises TypeError.
+    @functools.wraps(method)
+    def wrapper(self, other):
+        if not isinstance(other, (BigInt, numbers.Integral)):
+            return NotImplemented
+        return method(self, coerce(other))
+    return wrapper
+
+
+class BigInt(object):
+    __slots__ = ('negative', 'limbs', 'nbits', 'width')
+
+    def __init__(self, negative, limbs, width):
+        # limbs is any sequence of limbs; use the from_* constructors
+        # unless the limbs are already at hand.
+        limbs = big.strip_limbs(limbs)
+        self.negative = negative and bool(limbs)
+        self.limbs = big.limb_array(limbs)
+        self.nbits = big.limbs_bit_length(limbs)
+        self.width = width
+
+    @classmethod
+    def from_bytearray(cls, value):
+        negative = big.is_negative(value)
+        magnitude = big.negate(value) if negative else value
+        return cls(negative, big.to_limbs(magnitude), len(value))
+
+    @classmethod
+    def from_int(cls, value, nbytes=-1):
+        return cls.from_bytearray(big.int2bytearray(value, nbytes))
+
+    def to_bytearray(self, nbytes=None):
+        # nbytes, if given, replaces the stored width.
+        if nbytes is None:
+            nbytes = self.width
+        return big.from_magnitude(list(self.limbs), nbytes, self.negative)
+
+    def bit_length(self):
+        return self.nbits
+
+    ##############################################
+    # Conversions
+
+    def __int__(self):
+        return big.bytearray2int(self.to_bytearray())
+
+    __index__ = __int__
+    __long__ = __int__
+
+    def __repr__(self):
+        return 'BigInt(%d)' % int(self)
+
+    def __hash__(self):
+        return hash(int(self))
+
+    def __bool__(self):
+        return self.nbits != 0
+
+    __nonzero__ = __bool__
+
+    ##############################################
+    # Comparisons
+
+    def compare(self, other):
+        other = coerce(other)
+        if self.negative != other.negative:
+            return -1 if self.negative else 1
+        result = big.compare_limbs(self.limbs, other.limbs)
+        return -result if self.negative else result
+
+    @integral
+    def __eq__(self, other):
+        return self.compare(other) == 0
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    @integral
+    def __lt__(self, other):
+        return self.compare(other) < 0
+
+    @integral
+    def __le__(self, other):
+        return self.compare(other) <= 0
+
+    @integral
+    def __gt__(self, other):
+        return self.compare(other) > 0
+
+    @integral
+    def __ge__(self, other):
+        return self.compare(other) >= 0
+
+    ##############################################
+    # Arithmetic
+
+    def __neg__(self):
+        return BigInt(not self.negative, self.limbs, self.width)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return BigInt(False, self.limbs, self.width)
+
+    @integral
+    def __add__(self, other):
+        return add_signed(self.negative, self.limbs, other.negative, other.limbs,
+                          max(self.width, other.width))
+
+    @integral
+    def __sub__(self, other):
+        return add_signed(self.negative, self.limbs, not other.negative, other.limbs,
+                          max(self.width, other.width))
+
+    @integral
+    def __mul__(self, other):
+        return BigInt(self.negative != other.negative, big.multiply_limbs(self.limbs, other.limbs),
+                      max(self.width, other.width))
+
+    @integral
+    def __divmod__(self, other):
+        quotient, remainder = intarithmetic.divideLimbs(list(self.limbs), list(other.limbs))
+        if self.negative != other.negative and any(remainder):
+            quotient = big.add_limbs(quotient, [1])
+            remainder = big.subtract_limbs(list(other.limbs), remainder)
+        width = max(self.width, other.width)
+        return (BigInt(self.negative != other.negative, quotient, width),
+                BigInt(other.negative, remainder, width))
+
+    @integral
+    def __floordiv__(self, other):
+        return self.__divmod__(other)[0]
+
+    @integral
+    def __mod__(self, other):
+        return self.__divmod__(other)[1]
+
+    def __pow__(self, exponent, modulus=None):
+        if not isinstance(exponent, (BigInt, numbers.Integral)):
+            return NotImplemented
+        if modulus is not None and not isinstance(modulus, (BigInt, numbers.Integral)):
+            return NotImplemented
+        exponent = coerce(exponent)
+        if exponent.negative:
+            raise ValueError('negative exponent')
+        if modulus is not None:
+            modulus = coerce(modulus)
+            result = intarithmetic.moduloExp(self.to_bytearray(), exponent.to_bytearray(),
+                                             modulus.to_bytearray())
+            return BigInt.from_bytearray(result)
+
+        result = [1]
+        for i in range(exponent.nbits - 1, -1, -1):
+            result = big.square_limbs(result)
+            if intarithmetic.limbBit(exponent.limbs, i):
+                result = big.multiply_limbs(result, self.limbs)
+        negative = self.negative and intarithmetic.limbBit(exponent.limbs, 0) == 1
+        return BigInt(negative, result, self.width)
+
+    @integral
+    def __radd__(self, other):
+        return other.__add__(self)
+
+    @integral
+    def __rsub__(self, other):
+        return other.__sub__(self)
+
+    @integral
+    def __rmul__(self, other):
+        return other.__mul__(self)
+
+    @integral
+    def __rfloordiv__(self, other):
+        return other.__floordiv__(self)
+
+    @integral
+    def __rmod__(self, other):
+        return other.__mod__(self)
+
+    @integral
+    def __rdivmod__(self, other):
+        return other.__divmod__(self)
+
+
+def coerce(value):
+    if isinstance(value, BigInt):
+        return value
+    if not isinstance(value, numbers.Integral):
+        raise TypeError('cannot use %s as a BigInt' % type(value).__name__)
+    return BigInt.from_int(value, (int(value).bit_length() + 8) // 8)
+
+
+def add_signed(a_negative, a, b_negative, b, width):
+    if a_negative == b_negative:
+        return BigInt(a_negative, big.add_limbs(a, b), width)
+    if big.compare_limbs(a, b) >= 0:
+        return BigInt(a_negative, big.subtract_limbs(a, b), width)
+    return BigInt(b_negative, big.subtract_limbs(b, a), width)
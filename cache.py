@@ -0,0 +1,187 @@
+# Opt-in memoization of intarithmetic results and reduction contexts.
+#
+# enable() replaces intarithmetic.moduloExp, divide and modulo with
+# wrappers that look each call up in an LRU cache keyed on the bytes of
+# the operands, and intarithmetic.reductionContext with one that builds
+# the Montgomery or Barrett context for a modulus only once. The
+# functions keep their signatures, so callers do not change; disable()
+# puts the originals back. The patching goes through patch.py, so caching
+# combines with instrument.py and consttime.py in any order.
+#
+#     cache.enable(maxsize=4096)
+#     ...
+#     print(cache.results.stats())
+#     cache.disable()
+#
+# or, for a block of code,
+#
+#     with cache.caching(maxbytes=1 << 20):
+#         ...
+#
+# Operands of different widths are different keys, because the width of
+# a result follows the widths of the operands, and so are calls under
+# different big.RESULT_WIDTH modes. Results are stored as bytes and
+# handed out as fresh bytearrays, so callers may modify them.
+
+import collections
+import functools
+
+import big
+import intarithmetic
+import patch
+
+# Memoized functions by name; moduloExp's window argument only affects
+# speed, but it is part of the key all the same.
+OPERATIONS = ('moduloExp', 'divide', 'modulo')
+
+# The caches in use while caching is enabled, otherwise None.
+results = None
+contexts = None
+
+
+class LRUCache(object):
+    # Least recently used entries are evicted once there are more than
+    # maxsize of them or, if maxbytes is set, once the entries' sizes add
+    # up to more than maxbytes.
+    def __init__(self, maxsize=1024, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        try:
+            entry = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries[key] = entry
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, nbytes=0):
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key)[1]
+        self.entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while self.entries and (len(self.entries) > self.maxsize or
+                                (self.maxbytes is not None and self.nbytes > self.maxbytes)):
+            key, (value, nbytes) = self.entries.popitem(last=False)
+            self.nbytes -= nbytes
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.nbytes,
+        }
+
+
+def make_key(name, args, kwargs):
+    # The result width mode and the limb size change results too.
+    key = [name, big.RESULT_WIDTH, big.LIMB_BYTES]
+    for arg in args:
+        key.append(bytes(arg) if isinstance(arg, (bytearray, memoryview)) else arg)
+    for item in sorted(kwargs.items()):
+        key.append(item)
+    return tuple(key)
+
+
+def key_size(key):
+    return sum(len(part) for part in key[1:] if isinstance(part, bytes))
+
+
+def memoize(function, name, cache):
+    # Wraps a function returning a bytearray or a tuple of bytearrays.
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        key = make_key(name, args, kwargs)
+        stored = cache.get(key)
+        if stored is None:
+            result = function(*args, **kwargs)
+            if isinstance(result, tuple):
+                stored = tuple(bytes(array) for array in result)
+                cache.put(key, stored, sum(len(array) for array in stored) + key_size(key))
+            else:
+                stored = bytes(result)
+                cache.put(key, stored, len(stored) + key_size(key))
+            return result
+        if isinstance(stored, tuple):
+            return tuple(bytearray(array) for array in stored)
+        return bytearray(stored)
+    return wrapper
+
+
+def memoize_context(function, cache):
+    # Contexts are not modified once built, so they are shared. Their
+    # limb lists depend on LIMB_BYTES, so it is part of the key.
+    @functools.wraps(function)
+    def wrapper(modulus):
+        key = (bytes(modulus), big.LIMB_BYTES)
+        context = cache.get(key)
+        if context is None:
+            context = function(modulus)
+            cache.put(key, context)
+        return context
+    return wrapper
+
+
+def enable(maxsize=1024, maxbytes=None, context_maxsize=64, operations=OPERATIONS):
+    # Starts caching with empty caches. Calling enable again replaces
+    # the caches.
+    global results, contexts
+    disable()
+    results = LRUCache(maxsize, maxbytes)
+    contexts = LRUCache(context_maxsize)
+    wrappers = {}
+    for name in operations:
+        wrappers[(intarithmetic, name)] = functools.partial(memoize, name=name, cache=results)
+    wrappers[(intarithmetic, 'reductionContext')] = functools.partial(memoize_context, cache=contexts)
+    patch.install('cache', wrappers)
+
+
+def disable():
+    global results, contexts
+    patch.remove('cache')
+    results = None
+    contexts = None
+
+
+def enabled():
+    return patch.installed('cache')
+
+
+class caching(object):
+    # Context manager that enables caching for a block and disables it
+    # on the way out. The caches stay readable as .results and .contexts.
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        self.results = None
+        self.contexts = None
+
+    def __enter__(self):
+        enable(*self.args, **self.kwargs)
+        self.results = results
+        self.contexts = contexts
+        return self
+
+    def __exit__(self, *exc_info):
+        disable()
+        return False
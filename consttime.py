@@ -0,0 +1,372 @@
+# Constant-time exponentiation, division and comparisons for private-key
+# operations.
+#
+# moduloExp's sliding window skips work on zero exponent bits, Montgomery
+# and schoolbook loops skip zero limbs, and the comparisons in big.py stop
+# at the first difference, so their running times depend on the secret
+# values. The functions here do not branch on secret data and do not stop
+# early: every loop runs a number of times fixed by the operand widths,
+# which are treated as public, and choices are made with masks.
+#
+#   - select and cswap pick or swap limb lists under a 0/1 bit;
+#   - compare, equal, greater_than and less_than read every limb;
+#   - modulo_exp is a Montgomery ladder over all 8 * len(b) exponent
+#     bits, multiplying with a ConstantTimeContext whose Montgomery
+#     multiplication has no data-dependent branches;
+#   - divide_positive is restoring division, one quotient bit per step,
+#     and divide_with_remainder adds floor-division signs around it and
+#     returns results one byte wider than the operands, whatever their
+#     values;
+#   - fit_width applies a fixed big.RESULT_WIDTH with masks; 'minimal'
+#     trims to the value's own width and so gives away its length.
+#
+# This is the best pure Python can do: CPython's own integer operations
+# are not guaranteed to run in constant time, so the guarantee is against
+# branch and loop-count leaks, not against every timing difference.
+# The base of modulo_exp is reduced with ordinary division and should be
+# public, as the ciphertext is in RSA decryption.
+#
+# enable() swaps these in for intarithmetic.moduloExp,
+# divideWithRemainder (so divide and modulo) and dividePositive and for
+# big.equal, greater_than and less_than until disable(), through patch.py
+# like cache.py and instrument.py; constant-time moduloExp needs an odd
+# modulus.
+# bench_consttime.py measures the cost and the timing variance.
+
+import big
+import intarithmetic
+import montgomery
+import patch
+
+
+def limb_mask():
+    return (1 << (8 * big.LIMB_BYTES)) - 1
+
+
+##############################################
+# Limb lists of equal, fixed length
+
+def select(bit, a, b):
+    # a if bit is 1, b if bit is 0.
+    full = limb_mask()
+    mask = -bit & full
+    keep = mask ^ full
+    return [(x & mask) | (y & keep) for x, y in zip(a, b)]
+
+
+def cswap(bit, a, b):
+    # Swaps the contents of a and b in place if bit is 1.
+    mask = -bit & limb_mask()
+    for i in range(len(a)):
+        t = (a[i] ^ b[i]) & mask
+        a[i] ^= t
+        b[i] ^= t
+
+
+def subtract(a, b):
+    # (a - b mod b ** len(a), borrow) with a borrow of 1 if a < b.
+    bits = 8 * big.LIMB_BYTES
+    full = limb_mask()
+    output = [0] * len(a)
+    borrow = 0
+    for i in range(len(a)):
+        diff = a[i] - b[i] - borrow
+        output[i] = diff & full
+        borrow = (diff >> bits) & 1
+    return output, borrow
+
+
+def increment(limbs, bit):
+    # limbs + bit mod b ** len(limbs), carrying through every limb.
+    bits = 8 * big.LIMB_BYTES
+    full = limb_mask()
+    output = [0] * len(limbs)
+    carry = bit
+    for i in range(len(limbs)):
+        total = limbs[i] + carry
+        output[i] = total & full
+        carry = total >> bits
+    return output
+
+
+def nonzero(limbs):
+    # 1 if any limb is nonzero, else 0, reading every limb.
+    accumulated = 0
+    for limb in limbs:
+        accumulated |= limb
+    return (accumulated + limb_mask()) >> (8 * big.LIMB_BYTES)
+
+
+def compare_limbs(a, b):
+    # -1, 0 or 1, reading every limb.
+    difference, borrow = subtract(a, b)
+    return nonzero(difference) - 2 * borrow
+
+
+def pad(limbs, count):
+    return limbs + [0] * (count - len(limbs))
+
+
+##############################################
+# Bytearrays
+
+def extend(array, nbytes):
+    # Sign-extends to nbytes without branching on the sign.
+    fill = -(array[0] >> 7) & 0xff if array else 0
+    return bytearray([fill]) * (nbytes - len(array)) + bytearray(array)
+
+
+def fit_width(array):
+    # big.fit_result without branching on the value for a fixed
+    # RESULT_WIDTH; a 'minimal' width depends on the value by definition.
+    width = big.RESULT_WIDTH
+    if width is None:
+        return array
+    if width == 'minimal':
+        return big.fit_result(array)
+    if width >= len(array):
+        return extend(array, width)
+    # The dropped bytes must all be sign fill, and the kept top byte must
+    # have the same sign.
+    fill = -(array[0] >> 7) & 0xff
+    cut = len(array) - width
+    accumulated = (array[cut] ^ fill) & 0x80
+    for x in array[:cut]:
+        accumulated |= x ^ fill
+    if accumulated:
+        raise OverflowError('value does not fit in %d bytes' % width)
+    return array[cut:]
+
+
+def signed_limbs(a, b):
+    # a and b at a common width, with the sign bit flipped so that they
+    # compare as unsigned limb lists.
+    nbytes = max(len(a), len(b), 1)
+    count = (nbytes + big.LIMB_BYTES - 1) // big.LIMB_BYTES
+    top = 8 * nbytes - 1
+    bits = 8 * big.LIMB_BYTES
+    result = []
+    for array in (a, b):
+        limbs = pad(big.to_limbs(extend(array, nbytes)), count)
+        limbs[top // bits] ^= 1 << (top % bits)
+        result.append(limbs)
+    return result
+
+
+def compare(a, b):
+    x, y = signed_limbs(a, b)
+    return compare_limbs(x, y)
+
+
+def equal(a, b):
+    x, y = signed_limbs(a, b)
+    accumulated = 0
+    for p, q in zip(x, y):
+        accumulated |= p ^ q
+    return accumulated == 0
+
+
+def greater_than(a, b):
+    return compare(a, b) == 1
+
+
+def less_than(a, b):
+    return compare(a, b) == -1
+
+
+##############################################
+# Montgomery ladder
+
+class ConstantTimeContext(montgomery.MontgomeryContext):
+    # Montgomery multiplication (CIOS) on limb lists of exactly size
+    # limbs, with the final subtraction done by select.
+    def pad(self, limbs):
+        return pad(big.strip_limbs(limbs), self.size)
+
+    def multiply(self, x, y):
+        size = self.size
+        bits = self.bits
+        full = self.mask
+        modulus = self.modulus
+        n_prime = self.n_prime
+        t = [0] * (size + 2)
+        for i in range(size):
+            xi = x[i]
+            carry = 0
+            for j in range(size):
+                total = t[j] + xi * y[j] + carry
+                t[j] = total & full
+                carry = total >> bits
+            total = t[size] + carry
+            t[size] = total & full
+            t[size + 1] = total >> bits
+
+            m = (t[0] * n_prime) & full
+            carry = (t[0] + m * modulus[0]) >> bits
+            for j in range(1, size):
+                total = t[j] + m * modulus[j] + carry
+                t[j - 1] = total & full
+                carry = total >> bits
+            total = t[size] + carry
+            t[size - 1] = total & full
+            t[size] = t[size + 1] + (total >> bits)
+
+        # t < 2 * n; subtract n unless that borrows.
+        difference, borrow = subtract(t[:size + 1], modulus + [0])
+        return select(borrow, t[:size], difference[:size])
+
+    def square(self, x):
+        return self.multiply(x, x)
+
+    def encode(self, x):
+        # x must already be reduced modulo n.
+        return self.multiply(self.pad(x), self.r_squared)
+
+    def decode(self, x):
+        return self.multiply(x, pad([1], self.size))
+
+
+def ladder(context, base, exponent, nbits):
+    # base ** exponent in Montgomery form, where base is encoded and
+    # exponent has nbits bits. Every bit costs one multiply and one
+    # square, whatever its value.
+    bits = 8 * big.LIMB_BYTES
+    r0 = list(context.one)
+    r1 = list(base)
+    for i in range(nbits - 1, -1, -1):
+        bit = (exponent[i // bits] >> (i % bits)) & 1
+        cswap(bit, r0, r1)
+        r1 = context.multiply(r0, r1)
+        r0 = context.square(r0)
+        cswap(bit, r0, r1)
+    return r0
+
+
+def modulo_exp(a, b, n):
+    # Same result as intarithmetic.moduloExp(a, b, n) for an odd n, with
+    # the exponent and the intermediate values handled in constant time.
+    if big.is_negative(b):
+        raise ValueError("negative exponent")
+    if big.is_even(n):
+        raise ValueError("constant-time moduloExp needs an odd modulus")
+    n_negative = big.is_negative(n)
+    modulus = big.negate(n) if n_negative else n
+    context = ConstantTimeContext(modulus)
+    base = context.encode(intarithmetic.residueLimbs(a, modulus))
+    exponent = big.to_limbs(b)
+    result = context.decode(ladder(context, base, exponent, 8 * len(b)))
+    result = big.from_limbs(result, len(n))
+    if n_negative:
+        return intarithmetic.modulo(result, n)
+    return fit_width(result)
+
+
+##############################################
+# Division
+
+def divide_positive(a, b):
+    # (quotient, remainder) like intarithmetic.dividePositive for a >= 0
+    # and b > 0, by restoring division over all 8 * len(a) bits.
+    if big.is_negative(a) or big.is_negative(b):
+        raise ValueError("divide_positive needs nonnegative operands")
+    if not any(b):
+        raise ZeroDivisionError("division by zero")
+    nbytes = max(len(a), len(b))
+    count = (nbytes + big.LIMB_BYTES - 1) // big.LIMB_BYTES
+    bits = 8 * big.LIMB_BYTES
+    full = limb_mask()
+    u = pad(big.to_limbs(a), count)
+    divisor = pad(big.to_limbs(b), count + 1)
+    remainder = [0] * (count + 1)
+    quotient = [0] * count
+    for i in range(8 * len(a) - 1, -1, -1):
+        # remainder = 2 * remainder + bit i of a
+        carry = (u[i // bits] >> (i % bits)) & 1
+        for k in range(count + 1):
+            limb = remainder[k]
+            remainder[k] = ((limb << 1) & full) | carry
+            carry = limb >> (bits - 1)
+        difference, borrow = subtract(remainder, divisor)
+        remainder = select(borrow, remainder, difference)
+        quotient[i // bits] |= (1 - borrow) << (i % bits)
+    return big.from_limbs(quotient, nbytes), big.from_limbs(remainder, nbytes)
+
+
+def negate_if(bit, limbs):
+    # -limbs mod b ** len(limbs) if bit is 1, else limbs.
+    full = limb_mask()
+    return select(bit, increment([x ^ full for x in limbs], 1), limbs)
+
+
+def magnitude(array, nbytes):
+    # (sign bit, |array|) with |array| sign-extended to nbytes bytes, which
+    # must leave room for the magnitude of the most negative value.
+    extended = extend(array, nbytes)
+    negative = extended[0] >> 7
+    limbs = select(negative, big.to_limbs(big.negate(extended)), big.to_limbs(extended))
+    return negative, big.from_limbs(limbs, nbytes)
+
+
+def divide_with_remainder(a, b):
+    # The values intarithmetic.divideWithRemainder(a, b) returns, the
+    # floor quotient and a remainder with the sign of b, from
+    # divide_positive on the magnitudes, one byte wider than the operands.
+    nbytes = max(len(a), len(b))
+    a_negative, x = magnitude(a, nbytes + 1)
+    b_negative, y = magnitude(b, nbytes + 1)
+    quotient, remainder = divide_positive(x, y)
+    quotient = big.to_limbs(quotient)
+    remainder = big.to_limbs(remainder)
+    # Floor division rounds a negative quotient down when the division
+    # is inexact, and the remainder becomes |b| - remainder.
+    adjust = (a_negative ^ b_negative) & nonzero(remainder)
+    quotient = increment(quotient, adjust)
+    remainder = select(adjust, subtract(big.to_limbs(y), remainder)[0], remainder)
+    # Both results are built at nbytes + 1 bytes, which holds every
+    # quotient and remainder, rather than at the width of their values.
+    width = nbytes + 1
+    return (fit_width(big.from_limbs(negate_if(a_negative ^ b_negative, quotient), width)),
+            fit_width(big.from_limbs(negate_if(b_negative, remainder), width)))
+
+
+##############################################
+# Switching the library over
+
+def modulo_exp_replacement(a, b, n, window=None, context=None):
+    # moduloExp's signature; the window and context do not apply.
+    return modulo_exp(a, b, n)
+
+
+REPLACEMENTS = {
+    (intarithmetic, 'moduloExp'): modulo_exp_replacement,
+    (intarithmetic, 'divideWithRemainder'): divide_with_remainder,
+    (intarithmetic, 'dividePositive'): divide_positive,
+    (big, 'equal'): equal,
+    (big, 'greater_than'): greater_than,
+    (big, 'less_than'): less_than,
+}
+
+
+def enable():
+    disable()
+    patch.install('consttime', dict((key, lambda original, function=function: function)
+                                    for key, function in REPLACEMENTS.items()))
+
+
+def disable():
+    patch.remove('consttime')
+
+
+def enabled():
+    return patch.installed('consttime')
+
+
+class constant_time(object):
+    # Context manager for a block run in constant-time mode.
+    def __enter__(self):
+        enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        disable()
+        return False
@@ -0,0 +1,84 @@
+# Exponentiation modulo a number with known factors, by the Chinese
+# Remainder Theorem.
+#
+# For n = p * q, a ** d mod n follows from a ** (d mod (p - 1)) mod p and
+# a ** (d mod (q - 1)) mod q. Each of those works on numbers half as wide
+# with an exponent half as long, so together they cost about a quarter of
+# moduloExp(a, d, n). The residues are recombined with Garner's formula.
+#
+# A CRTKey holds pairwise coprime positive moduli (usually primes), the
+# exponent to use modulo each one, and the Garner coefficients:
+#
+#     key = CRTKey([p, q], [dP, dQ])
+#     m = key.power(c)
+#
+# power(a) returns the same bytearray as moduloExp(a, d, n). Given an
+# executor from concurrent.futures, the sub-exponentiations run on it
+# through parallel.map_modulo_exp.
+
+
+import big
+import intarithmetic
+import parallel
+
+
+class CRTKey(object):
+    def __init__(self, moduli, exponents, n=None):
+        # moduli and exponents are lists of bytearrays; n, the product of
+        # the moduli, sets the width of the results and is computed when
+        # not given.
+        if len(moduli) != len(exponents) or not moduli:
+            raise ValueError("need one exponent per modulus")
+        for modulus in moduli:
+            if big.is_negative(modulus) or not any(modulus):
+                raise ValueError("moduli must be positive")
+        for exponent in exponents:
+            if big.is_negative(exponent):
+                raise ValueError("negative exponent")
+        self.moduli = list(moduli)
+        self.exponents = list(exponents)
+        self.limbs = [big.strip_limbs(big.to_limbs(modulus)) for modulus in moduli]
+
+        # coefficients[i] = (m[0] * ... * m[i-1]) ** -1 mod m[i]
+        self.coefficients = [None]
+        product = self.limbs[0]
+        for i in range(1, len(moduli)):
+            residue = big.from_magnitude(intarithmetic.divideLimbs(product, self.limbs[i])[1], 1, False)
+            inverse = intarithmetic.modinv(residue, moduli[i])
+            self.coefficients.append(big.strip_limbs(big.to_limbs(inverse)))
+            product = big.strip_limbs(big.multiply_limbs(product, self.limbs[i]))
+        if n is None:
+            n = big.from_magnitude(product, 1, False)
+        self.n = n
+
+    def residues(self, a, executor=None):
+        jobs = list(zip([a] * len(self.moduli), self.exponents, self.moduli))
+        if executor is None:
+            return [intarithmetic.moduloExp(*job) for job in jobs]
+        return list(parallel.map_modulo_exp(jobs, executor=executor))
+
+    def power(self, a, executor=None):
+        residues = [big.strip_limbs(big.to_limbs(r)) for r in self.residues(a, executor)]
+        return big.fit_result(big.from_magnitude(garner(residues, self.limbs, self.coefficients), len(self.n), False))
+
+
+def garner(residues, moduli, coefficients):
+    # The x below the product of the moduli with x = residues[i] mod
+    # moduli[i], all as magnitude limb lists.
+    x = residues[0]
+    product = moduli[0]
+    for i in range(1, len(moduli)):
+        # h = (residues[i] - x) * coefficients[i] mod moduli[i]
+        xMod = big.strip_limbs(intarithmetic.divideLimbs(x, moduli[i])[1])
+        if big.compare_limbs(residues[i], xMod) >= 0:
+            difference = big.subtract_limbs(residues[i], xMod)
+        else:
+            difference = big.subtract_limbs(big.add_limbs(residues[i], moduli[i]), xMod)
+        h = intarithmetic.divideLimbs(big.multiply_limbs(difference, coefficients[i]), moduli[i])[1]
+        x = big.strip_limbs(big.add_limbs(x, big.multiply_limbs(product, h)))
+        product = big.strip_limbs(big.multiply_limbs(product, moduli[i]))
+    return x
+
+
+def crt_modulo_exp(a, moduli, exponents, n=None, executor=None):
+    return CRTKey(moduli, exponents, n).power(a, executor)
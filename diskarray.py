@@ -0,0 +1,267 @@
+# Arrays of fixed-width integers stored in a file and accessed through mmap.
+#
+# A DiskArray holds count records of nbytes bytes each, back to back, in
+# the two's-complement big-endian layout big.py uses, so record i is the
+# bytearray big.int2bytearray(x, nbytes) of its value x. The file is
+# memory-mapped rather than read, so tables larger than RAM can be
+# processed:
+#
+#     table = DiskArray('values.bin', 32)              # existing file
+#     table.add(big.int2bytearray(1, 32))              # in place
+#     total = table.sum(n)
+#     table.sort()
+#
+# table[i] is a memoryview of record i into the mapping, so no bytes are
+# copied and writes through it land in the file; it can be passed to the
+# arithmetic functions in big.py and intarithmetic.py like a bytearray.
+# Python 2's mmap has no buffer interface for memoryview, so there
+# table[i] is a bytearray copy instead.
+#
+# The bulk methods walk the records a block at a time, decoding each
+# block with one big.bytearray2ints call (one struct call for 1, 2, 4 and
+# 8-byte records) instead of converting every record by hand. Elementwise
+# results wrap modulo 2**(8 * nbytes), like fixed.FixedWidth, and are
+# written in place or into another DiskArray of the same shape.
+
+import array
+import heapq
+import mmap
+import os
+import tempfile
+
+import big
+
+# Bytes decoded at once by the bulk methods, and the memory the merge
+# phase of sort reads ahead.
+BLOCK_BYTES = 1 << 20
+
+# Whether memoryview can wrap an mmap (Python 3).
+try:
+    memoryview(mmap.mmap(-1, 1))
+    MEMORYVIEW_MMAP = True
+except TypeError:
+    MEMORYVIEW_MMAP = False
+
+
+class DiskArray(object):
+    def __init__(self, path, nbytes, count=None, readonly=False):
+        # Maps the file at path. With count given the file is created or
+        # resized to hold count records (new records are zero); otherwise
+        # it must exist and holds len(file) // nbytes records. path=None
+        # maps count records of anonymous memory instead.
+        if nbytes < 1:
+            raise ValueError('records need at least one byte')
+        self.path = path
+        self.nbytes = nbytes
+        self.readonly = readonly
+        self.file = None
+        if path is None:
+            self.count = count or 0
+        else:
+            if count is None:
+                count = os.path.getsize(path) // nbytes
+            elif readonly:
+                raise ValueError('cannot resize a read-only array')
+            else:
+                with open(path, 'ab') as f:
+                    f.truncate(count * nbytes)
+            self.count = count
+            self.file = open(path, 'rb' if readonly else 'r+b')
+        size = self.count * nbytes
+        if size == 0:
+            # mmap cannot map zero bytes.
+            self.mapped = bytearray()
+        elif self.file is None:
+            self.mapped = mmap.mmap(-1, size)
+        else:
+            access = mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE
+            self.mapped = mmap.mmap(self.file.fileno(), size, access=access)
+        self.view = memoryview(self.mapped) if MEMORYVIEW_MMAP or size == 0 else None
+        self.blockRecords = max(1, BLOCK_BYTES // nbytes)
+
+    def close(self):
+        # Views handed out by __getitem__ must be gone by now, or closing
+        # the mmap raises BufferError.
+        if self.view is not None and hasattr(self.view, 'release'):
+            self.view.release()
+        self.view = None
+        if isinstance(self.mapped, mmap.mmap):
+            self.mapped.close()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def flush(self):
+        if isinstance(self.mapped, mmap.mmap):
+            self.mapped.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    ##############################################
+    # Records
+
+    def __len__(self):
+        return self.count
+
+    def index(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('record index out of range')
+        return i * self.nbytes
+
+    def __getitem__(self, i):
+        start = self.index(i)
+        if self.view is not None:
+            return self.view[start:start + self.nbytes]
+        return bytearray(self.mapped[start:start + self.nbytes])
+
+    def __setitem__(self, i, value):
+        # value is a bytearray of any width whose value fits the record.
+        start = self.index(i)
+        self.mapped[start:start + self.nbytes] = bytes(big.normalize(bytearray(value), self.nbytes))
+
+    def read(self, start, stop):
+        # The values of records start to stop - 1, as ints.
+        return big.bytearray2ints(self.mapped[start * self.nbytes:stop * self.nbytes], self.nbytes)
+
+    def write(self, start, values):
+        # Stores ints from record start on, wrapping each to the width.
+        data = big.ints2bytearray(values, self.nbytes)
+        self.mapped[start * self.nbytes:start * self.nbytes + len(data)] = bytes(data)
+
+    def blocks(self, start=0, stop=None, size=None):
+        # (start, values) for consecutive blocks of records.
+        stop = self.count if stop is None else stop
+        size = size or self.blockRecords
+        for i in range(start, stop, size):
+            yield i, self.read(i, min(i + size, stop))
+
+    def values(self, start=0, stop=None, size=None):
+        for i, values in self.blocks(start, stop, size):
+            for value in values:
+                yield value
+
+    def fill(self, values, start=0):
+        # Writes an iterable of ints block by block from record start on.
+        block = []
+        for value in values:
+            block.append(value)
+            if len(block) == self.blockRecords:
+                self.write(start, block)
+                start += len(block)
+                block = []
+        if block:
+            self.write(start, block)
+
+    ##############################################
+    # Bulk operations against a scalar bytearray
+
+    def target(self, out):
+        if out is None:
+            out = self
+        if len(out) != self.count or out.nbytes != self.nbytes:
+            raise ValueError('out must have the same length and record width')
+        return out
+
+    def add(self, scalar, out=None):
+        # record + scalar for every record, wrapped to the width.
+        out = self.target(out)
+        x = big.bytearray2int(scalar)
+        for i, values in self.blocks():
+            out.write(i, [value + x for value in values])
+        return out
+
+    def modulo(self, n, out=None):
+        # record mod n for every record, with intarithmetic.modulo's signs;
+        # n must fit the record width.
+        out = self.target(out)
+        modulus = self.modulus(n)
+        # Raises OverflowError when n, and so a residue, may not fit.
+        big.normalize(bytearray(n), self.nbytes)
+        for i, values in self.blocks():
+            out.write(i, [value % modulus for value in values])
+        return out
+
+    def compare(self, scalar):
+        # -1, 0 or 1 for each record against scalar, as an array('b').
+        x = big.bytearray2int(scalar)
+        result = array.array('b')
+        for i, values in self.blocks():
+            result.extend([(value > x) - (value < x) for value in values])
+        return result
+
+    def count_compare(self, scalar):
+        # (less, equal, greater): how many records compare each way.
+        x = big.bytearray2int(scalar)
+        less = equal = 0
+        for i, values in self.blocks():
+            less += sum(1 for value in values if value < x)
+            equal += values.count(x)
+        return less, equal, self.count - less - equal
+
+    ##############################################
+    # Reductions modulo n; the results are like intarithmetic.modulo's.
+
+    def modulus(self, n):
+        modulus = big.bytearray2int(n)
+        if modulus == 0:
+            raise ZeroDivisionError('division by zero')
+        return modulus
+
+    def sum(self, n):
+        modulus = self.modulus(n)
+        total = 0
+        for i, values in self.blocks():
+            total = (total + sum(values)) % modulus
+        return big.fit_result(big.int2bytearray(total, max(len(n), self.nbytes)))
+
+    def product(self, n):
+        modulus = self.modulus(n)
+        total = 1 % modulus
+        for i, values in self.blocks():
+            for value in values:
+                total = total * value % modulus
+        return big.fit_result(big.int2bytearray(total, max(len(n), self.nbytes)))
+
+    ##############################################
+    # Sorting
+
+    def sort(self):
+        # Sorts the records by value, in place. Each block is sorted in
+        # memory, then the sorted runs are merged through a temporary
+        # file, reading BLOCK_BYTES of the runs at a time in all.
+        if self.readonly:
+            raise ValueError('cannot sort a read-only array')
+        runs = []
+        for i, values in self.blocks():
+            values.sort()
+            self.write(i, values)
+            runs.append((i, i + len(values)))
+        if len(runs) < 2:
+            return self
+
+        size = max(1, self.blockRecords // len(runs))
+        merged = heapq.merge(*[self.values(start, stop, size) for start, stop in runs])
+        with tempfile.TemporaryFile() as scratch:
+            block = []
+            for value in merged:
+                block.append(value)
+                if len(block) == self.blockRecords:
+                    scratch.write(bytes(big.ints2bytearray(block, self.nbytes)))
+                    block = []
+            scratch.write(bytes(big.ints2bytearray(block, self.nbytes)))
+            scratch.seek(0)
+            start = 0
+            while True:
+                data = scratch.read(self.blockRecords * self.nbytes)
+                if not data:
+                    break
+                self.mapped[start:start + len(data)] = data
+                start += len(data)
+        return self
@@ -0,0 +1,143 @@
+# Fixed-width wrapping integers, e.g. uint64/uint128/uint256 for hash and
+# counter arithmetic.
+#
+# A FixedWidth describes one width. Its operations take bytearrays (or
+# memoryviews) of exactly that width and write the result, wrapped modulo
+# 2**(8 * nbytes), into a buffer of the same width; nothing ever grows.
+# Results go into out when given, which may be one of the operands, or
+# into a new bytearray otherwise:
+#
+#     counters = UINT256.allocate(1000)       # views into one bytearray
+#     UINT256.add(counters[0], step, counters[0])
+#
+# Widths of 8, 16 and 32 bytes are read and written with single struct
+# calls; other widths go through big.py's conversions. With signed=True
+# the same bytes are read as two's-complement, which changes division,
+# right shifts and comparisons; division rounds toward minus infinity,
+# like intarithmetic.divide.
+
+import struct
+
+import big
+
+MASK64 = (1 << 64) - 1
+
+
+def read8(array):
+    return struct.unpack_from('>Q', array)[0]
+
+
+def write8(out, value):
+    struct.pack_into('>Q', out, 0, value)
+
+
+def read16(array):
+    high, low = struct.unpack_from('>QQ', array)
+    return (high << 64) | low
+
+
+def write16(out, value):
+    struct.pack_into('>QQ', out, 0, value >> 64, value & MASK64)
+
+
+def read32(array):
+    a, b, c, d = struct.unpack_from('>QQQQ', array)
+    return (a << 192) | (b << 128) | (c << 64) | d
+
+
+def write32(out, value):
+    struct.pack_into('>QQQQ', out, 0, value >> 192, (value >> 128) & MASK64,
+                     (value >> 64) & MASK64, value & MASK64)
+
+
+FAST_PATHS = {8: (read8, write8), 16: (read16, write16), 32: (read32, write32)}
+
+
+class FixedWidth(object):
+    def __init__(self, nbytes, signed=False):
+        self.nbytes = nbytes
+        self.signed = signed
+        self.bits = 8 * nbytes
+        self.mask = (1 << self.bits) - 1
+        self.read_unsigned, self.write_unsigned = FAST_PATHS.get(nbytes, (self.read_generic, self.write_generic))
+
+    def read_generic(self, array):
+        return big.bytearray2int(array) & self.mask
+
+    def write_generic(self, out, value):
+        out[:] = big.unsigned2bytes(value, self.nbytes)
+
+    ##############################################
+    # Conversions
+
+    def value(self, array):
+        # The int held in array.
+        if len(array) != self.nbytes:
+            raise ValueError('expected %d bytes, got %d' % (self.nbytes, len(array)))
+        value = self.read_unsigned(array)
+        if self.signed and value >> (self.bits - 1):
+            value -= 1 << self.bits
+        return value
+
+    def store(self, value, out=None):
+        # Writes value modulo 2**bits into out, or a new bytearray.
+        if out is None:
+            out = bytearray(self.nbytes)
+        elif len(out) != self.nbytes:
+            raise ValueError('expected %d bytes, got %d' % (self.nbytes, len(out)))
+        self.write_unsigned(out, value & self.mask)
+        return out
+
+    def allocate(self, count):
+        # count zeroed result buffers, as memoryviews into one bytearray.
+        view = memoryview(bytearray(count * self.nbytes))
+        return [view[i:i + self.nbytes] for i in range(0, count * self.nbytes, self.nbytes)]
+
+    ##############################################
+    # Arithmetic
+
+    def add(self, a, b, out=None):
+        return self.store(self.value(a) + self.value(b), out)
+
+    def subtract(self, a, b, out=None):
+        return self.store(self.value(a) - self.value(b), out)
+
+    def multiply(self, a, b, out=None):
+        return self.store(self.value(a) * self.value(b), out)
+
+    def negate(self, a, out=None):
+        return self.store(-self.value(a), out)
+
+    def divide(self, a, b, out=None):
+        return self.store(self.value(a) // self.nonzero(b), out)
+
+    def modulo(self, a, b, out=None):
+        return self.store(self.value(a) % self.nonzero(b), out)
+
+    def nonzero(self, b):
+        value = self.value(b)
+        if value == 0:
+            raise ZeroDivisionError('division by zero')
+        return value
+
+    def shift_left(self, a, shift, out=None):
+        big.check_shift(shift)
+        return self.store(self.value(a) << min(shift, self.bits), out)
+
+    def shift_right(self, a, shift, out=None):
+        # Logical for unsigned widths, arithmetic for signed ones.
+        big.check_shift(shift)
+        return self.store(self.value(a) >> min(shift, self.bits), out)
+
+    def compare(self, a, b):
+        x = self.value(a)
+        y = self.value(b)
+        return (x > y) - (x < y)
+
+
+UINT64 = FixedWidth(8)
+UINT128 = FixedWidth(16)
+UINT256 = FixedWidth(32)
+INT64 = FixedWidth(8, signed=True)
+INT128 = FixedWidth(16, signed=True)
+INT256 = FixedWidth(32, signed=True)
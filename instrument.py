@@ -0,0 +1,192 @@
+# Opt-in call, byte and allocation counters for big.py and intarithmetic.py.
+#
+# enable() replaces the functions listed in FUNCTIONS with wrappers that
+# record, per function, how often it was called, how many operand bytes
+# it was given, how many new bytearrays or limb lists it returned and how
+# large they were, how deep it recursed and how long it took. disable()
+# puts the originals back, so there is no cost at all while profiling is
+# off. As with cache.py, callers do not change, and both patch through
+# patch.py, so the two combine in either order:
+#
+#     with instrument.profiling() as session:
+#         intarithmetic.moduloExp(a, b, n)
+#     print(session.profile.to_json())
+#
+# Calls made while no other instrumented function is running are
+# top-level operations. For each of them the profile also counts the
+# calls it made to every other instrumented function, so a slow
+# moduloExp shows how many divideLimbs or add calls it cost, and
+# max_bytes_out shows which function let operand widths grow.
+#
+# Limb lists count LIMB_BYTES bytes per limb. A result that is one of the
+# arguments, as with the in-place helpers, is not an allocation.
+
+import array
+import functools
+import json
+import timeit
+
+import big
+import intarithmetic
+import patch
+
+# Instrumented functions by module.
+FUNCTIONS = {
+    big: (
+        'int2bytearray', 'bytearray2int', 'to_limbs', 'from_limbs', 'from_magnitude',
+        'add_limbs', 'subtract_limbs', 'compare_limbs', 'multiply_limbs', 'square_limbs',
+        'multiply_karatsuba', 'shift_limbs_left', 'shift_limbs_right',
+        'is_negative', 'negate', 'sign_extend', 'make_same_size', 'add', 'equal',
+        'greater_than', 'less_than', 'is_even', 'half', 'twice', 'multiply',
+        'shift_left', 'shift_right', 'shift_left_logical', 'shift_right_logical',
+        'bit_length', 'trim', 'normalize', 'add_aux', 'half_positive', 'twice_positive',
+        'negate_in_place',
+    ),
+    intarithmetic: (
+        'divide', 'modulo', 'divideWithRemainder', 'moduloExp', 'reductionContext',
+        'slidingWindowPower', 'residueLimbs', 'dividePositive', 'divideInts', 'divideLimbs', 'divideBySingleLimb',
+        'gcd', 'xgcd', 'modinv', 'gcdLimbs',
+    ),
+}
+
+# The profile being recorded while instrumentation is enabled, otherwise
+# None.
+profile = None
+
+
+class Profile(object):
+    def __init__(self):
+        self.functions = {}
+        self.operations = {}
+        self.stack = []
+        self.active = {}
+
+    def entry(self, name):
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = {
+                'calls': 0,
+                'top_level_calls': 0,
+                'bytes_in': 0,
+                'bytes_out': 0,
+                'allocations': 0,
+                'max_bytes_out': 0,
+                'max_depth': 0,
+                'seconds': 0.0,
+            }
+        return stats
+
+    def clear(self):
+        self.functions.clear()
+        self.operations.clear()
+
+    def as_dict(self):
+        return {'functions': self.functions, 'operations': self.operations}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.as_dict(), indent=indent, sort_keys=True)
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_json())
+
+    def top(self, count=10, key='calls'):
+        # The count (name, stats) pairs with the largest stats[key].
+        return sorted(self.functions.items(), key=lambda item: item[1][key], reverse=True)[:count]
+
+
+def data_bytes(value):
+    if isinstance(value, (bytearray, bytes, memoryview)):
+        return len(value)
+    if isinstance(value, (list, array.array)):
+        return len(value) * big.LIMB_BYTES
+    return 0
+
+
+def allocated(result, args):
+    # (allocations, bytes) for the new buffers in a result.
+    if isinstance(result, tuple):
+        counts = [allocated(part, args) for part in result]
+        return sum(count for count, nbytes in counts), sum(nbytes for count, nbytes in counts)
+    nbytes = data_bytes(result)
+    if not nbytes or any(result is arg for arg in args):
+        return 0, 0
+    return 1, nbytes
+
+
+def instrument(function, name, profile):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        stats = profile.entry(name)
+        stats['calls'] += 1
+        stack = profile.stack
+        if stack:
+            calls = profile.operations[stack[0]]
+            calls[name] = calls.get(name, 0) + 1
+        else:
+            stats['top_level_calls'] += 1
+            profile.operations.setdefault(name, {})
+        stats['bytes_in'] += sum(data_bytes(arg) for arg in args)
+
+        depth = profile.active.get(name, 0) + 1
+        profile.active[name] = depth
+        stats['max_depth'] = max(stats['max_depth'], depth)
+        stack.append(name)
+        start = timeit.default_timer()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            stats['seconds'] += timeit.default_timer() - start
+            stack.pop()
+            profile.active[name] = depth - 1
+
+        count, nbytes = allocated(result, args)
+        stats['allocations'] += count
+        stats['bytes_out'] += nbytes
+        if isinstance(result, tuple):
+            nbytes = max([data_bytes(part) for part in result] or [0])
+        stats['max_bytes_out'] = max(stats['max_bytes_out'], nbytes)
+        return result
+    return wrapper
+
+
+def enable(functions=None):
+    # Starts recording into a new profile, which is returned. functions
+    # maps modules to names and defaults to FUNCTIONS.
+    global profile
+    disable()
+    profile = Profile()
+    wrappers = {}
+    for module, names in (functions or FUNCTIONS).items():
+        for name in names:
+            label = '%s.%s' % (module.__name__, name)
+            wrappers[(module, name)] = functools.partial(instrument, name=label, profile=profile)
+    patch.install('instrument', wrappers)
+    return profile
+
+
+def disable():
+    global profile
+    patch.remove('instrument')
+    profile = None
+
+
+def enabled():
+    return patch.installed('instrument')
+
+
+class profiling(object):
+    # Context manager that records a profile for a block and disables
+    # instrumentation on the way out. The profile stays readable as
+    # .profile.
+    def __init__(self, functions=None):
+        self.functions = functions
+        self.profile = None
+
+    def __enter__(self):
+        self.profile = enable(self.functions)
+        return self
+
+    def __exit__(self, *exc_info):
+        disable()
+        return False
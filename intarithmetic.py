@@ -1,292 +1,377 @@
 # Kevin Kokomani
 
-# Python 2.7
+# Python 3 (also runs on Python 2.7)
 
 # Using the arithmetic functions in big.py, this program performs integer division for two positive integers represented
 # as bytearrays of the same size. The division function works correctly with negative numbers, bytearrays of different sizes,
 # and the program also supports the modulo operation and modular exponentiation. All code in big.py supplied by the instructor,
 # all code in intarithmetic.py written by Kevin Kokomani
 
-import unittest
 import big
+import barrett
+import montgomery
+
+#Scratch buffers shared by the division and exponentiation loops
+scratch = big.ScratchPool()
 
 #Main divide function
 def divide(a, b):
-    if len(a) < len(b):
-        a = big.sign_extend(a, len(b)-len(a))
-    if len(b) < len(a):
-        b = big.sign_extend(b, len(a) - len(b))
-
-    if big.is_negative(a) and big.is_negative(b):
-        quotient, remainder = dividePositive(big.negate(a), big.negate(b))
-        return quotient
-    elif big.is_negative(a):
-        quotient, remainder = dividePositive(big.negate(a), b)
-        return divideDifferentSigns(quotient, remainder)
-    elif big.is_negative(b):
-        quotient, remainder = dividePositive(a, big.negate(b))
-        return divideDifferentSigns(quotient, remainder)
-    else:
-        quotient, remainder = dividePositive(a, b)
-        return quotient
+    quotient, remainder = divideWithRemainder(a, b)
+    return quotient
 
 #Main modulo function
 def modulo(a, b):
-    if len(a) < len(b):
-        a = big.sign_extend(a, len(b) - len(a))
-    if len(b) < len(a):
-        b = big.sign_extend(b, len(a) - len(b))
-
-    if big.is_negative(a) and big.is_negative(b):
-        quotient, remainder = dividePositive(big.negate(a), big.negate(b))
-        return big.negate(remainder)
-    elif big.is_negative(a):
-        quotient, remainder = dividePositive(b, big.negate(a))
-        return remainder
-    elif big.is_negative(b):
-        quotient, remainder = dividePositive(big.negate(b), a)
-        return big.negate(remainder)
+    quotient, remainder = divideWithRemainder(a, b)
+    return remainder
+
+#Floor division returning quotient and remainder together, with the same
+#sign conventions as Python's divmod: the remainder takes the sign of b.
+def divideWithRemainder(a, b):
+    nbytes = max(len(a), len(b))
+    #Operands that fit in a single limb are divided as ints, like big.add_aux
+    if nbytes <= big.LIMB_BYTES:
+        return divideInts(big.bytearray2int(a), big.bytearray2int(b), nbytes)
+    aNegative = big.is_negative(a)
+    bNegative = big.is_negative(b)
+    if aNegative:
+        a = big.negate(a)
+    if bNegative:
+        b = big.negate(b)
+
+    quotient, remainder = divideLimbs(big.to_limbs(a), big.to_limbs(b))
+    if aNegative != bNegative and any(remainder):
+        quotient = big.add_limbs(quotient, [1])
+        remainder = big.subtract_limbs(big.to_limbs(b), remainder)
+
+    return (big.fit_result(big.from_magnitude(quotient, nbytes, aNegative != bNegative)),
+            big.fit_result(big.from_magnitude(remainder, nbytes, bNegative)))
+
+#Main Modulo Exp Function. Odd moduli use Montgomery reduction, even ones
+#Barrett reduction. The exponent is scanned with a sliding window;
+#window=None picks a width from the exponent size. Callers with many
+#exponentiations modulo the same n can pass context=reductionContext(|n|)
+#to build it only once.
+def moduloExp(a, b, n, window=None, context=None):
+    if big.is_negative(b):
+        raise ValueError("negative exponent")
+    nNegative = big.is_negative(n)
+    modulus = big.negate(n) if nNegative else n
+    base = residueLimbs(a, modulus)
+    exponent = big.strip_limbs(big.to_limbs(b))
+    if window is None:
+        window = chooseWindowSize(big.limbs_bit_length(exponent))
+
+    if context is None:
+        context = reductionContext(modulus)
+    result = slidingWindowPower(context, base, exponent, window)
+    result = big.from_magnitude(result, len(n), False)
+    if nNegative:
+        return modulo(result, n)
+    return big.fit_result(result)
+
+#Montgomery context for odd moduli, Barrett context for even ones
+def reductionContext(modulus):
+    if big.is_even(modulus):
+        return barrett.BarrettContext(modulus)
+    return montgomery.MontgomeryContext(modulus)
+
+#Window width that minimizes the number of multiplies for an exponent of
+#the given bit length (the table costs 2**(window-1) multiplies)
+def chooseWindowSize(bits):
+    if bits > 671:
+        return 6
+    if bits > 239:
+        return 5
+    if bits > 79:
+        return 4
+    if bits > 23:
+        return 3
+    return 1
+
+#Left-to-right sliding-window exponentiation of limb lists in a reduction
+#context, using a table of the odd powers base**1, base**3, ...,
+#base**(2**window - 1). With window=1 this is binary square-and-multiply.
+def slidingWindowPower(context, base, exponent, window):
+    exponent = big.strip_limbs(exponent)
+    i = big.limbs_bit_length(exponent) - 1
+    if i < 0:
+        return context.decode(context.one)
+
+    x = context.encode(base)
+    table = [x]
+    if window > 1:
+        x2 = context.square(x)
+        for k in range((1 << (window - 1)) - 1):
+            table.append(context.multiply(table[-1], x2))
+
+    result = None
+    while i >= 0:
+        if not limbBit(exponent, i):
+            result = context.square(result)
+            i -= 1
+            continue
+
+        # The window is bits i..j, where j is as low as the width allows
+        # while still ending on a one bit.
+        j = max(i - window + 1, 0)
+        while not limbBit(exponent, j):
+            j += 1
+        value = big.limb_bits(exponent, j, i - j + 1)
+
+        if result is None:
+            result = table[value >> 1]
+        else:
+            for k in range(i - j + 1):
+                result = context.square(result)
+            result = context.multiply(result, table[value >> 1])
+        i = j - 1
+    return context.decode(result)
+
+def limbBit(limbs, i):
+    bits = 8 * big.LIMB_BYTES
+    return (limbs[i // bits] >> (i % bits)) & 1
+
+#A base and modulus prepared for raising the same base to many exponents,
+#e.g. a fixed Diffie-Hellman generator. It stores base**(2**(window*i))
+#and evaluates base**b with Yao's method: one multiply per nonzero
+#window-bit digit of b plus 2**window, and no squarings.
+class PrecomputedBase(object):
+    def __init__(self, a, n, window=4):
+        self.n = n
+        self.nNegative = big.is_negative(n)
+        modulus = big.negate(n) if self.nNegative else n
+        self.context = reductionContext(modulus)
+        self.window = window
+        self.powers = [self.context.encode(residueLimbs(a, modulus))]
+
+    def extend(self, count):
+        while len(self.powers) < count:
+            x = self.powers[-1]
+            for k in range(self.window):
+                x = self.context.square(x)
+            self.powers.append(x)
+
+    def power(self, b):
+        if big.is_negative(b):
+            raise ValueError("negative exponent")
+        exponent = big.strip_limbs(big.to_limbs(b))
+        bits = big.limbs_bit_length(exponent)
+        count = (bits + self.window - 1) // self.window
+        self.extend(count)
+
+        buckets = {}
+        for i in range(count):
+            digit = big.limb_bits(exponent, self.window * i, self.window)
+            if digit:
+                buckets.setdefault(digit, []).append(self.powers[i])
+
+        context = self.context
+        product = None
+        result = None
+        for digit in range((1 << self.window) - 1, 0, -1):
+            for power in buckets.get(digit, ()):
+                product = power if product is None else context.multiply(product, power)
+            if product is not None:
+                result = product if result is None else context.multiply(result, product)
+        if result is None:
+            result = context.one
+
+        result = big.from_magnitude(context.decode(result), len(self.n), False)
+        if self.nNegative:
+            return modulo(result, self.n)
+        return big.fit_result(result)
+
+#Greatest common divisor, always nonnegative
+def gcd(a, b):
+    g, s = gcdLimbs(magnitudeLimbs(a), magnitudeLimbs(b), False)
+    return big.fit_result(big.from_magnitude(g, max(len(a), len(b)), False))
+
+#Extended Euclid: returns (g, s, t) with s*a + t*b == g == gcd(a, b)
+def xgcd(a, b):
+    nbytes = max(len(a), len(b))
+    u = magnitudeLimbs(a)
+    v = magnitudeLimbs(b)
+    g, s = gcdLimbs(u, v, True)
+    if v:
+        # t = (g - s*u) / v, an exact division
+        difference = addSigned((False, g), (not s[0], big.strip_limbs(big.multiply_limbs(s[1], u))))
+        t = (difference[0], big.strip_limbs(divideLimbs(difference[1], v)[0]))
     else:
-        quotient, remainder = dividePositive(a, b)
-        return remainder
-
-#Main Modulo Exp Function
-def moduloExp(a, b, n):
-    zero = bytearray(len(b))
-    if (big.equal(b, zero)):
-        return big.int2bytearray(1, len(b))
-
-    z = moduloExp(a, big.half(b), n)
-    if (big.is_even(b)):
-        return modulo(big.multiply(z, z), n)
-    else:
-        return modulo(big.multiply(a, big.multiply(z, z)), n)
+        t = (False, [])
+    sNegative = s[0] != big.is_negative(a)
+    tNegative = t[0] != big.is_negative(b)
+    return (big.fit_result(big.from_magnitude(g, nbytes, False)),
+            big.fit_result(big.from_magnitude(s[1], nbytes, sNegative and bool(s[1]))),
+            big.fit_result(big.from_magnitude(t[1], nbytes, tNegative and bool(t[1]))))
+
+#Modular inverse of a modulo n, with the sign conventions of modulo(x, n).
+#Raises ValueError when gcd(a, n) != 1.
+def modinv(a, n):
+    v = magnitudeLimbs(n)
+    if not v:
+        raise ZeroDivisionError("division by zero")
+    g, s = gcdLimbs(magnitudeLimbs(a), v, True)
+    if g != [1]:
+        raise ValueError("not invertible")
+    inverse = big.from_magnitude(s[1], max(len(a), len(n)), s[0] != big.is_negative(a))
+    return modulo(inverse, n)
+
+def magnitudeLimbs(a):
+    return big.strip_limbs(big.to_limbs(big.negate(a) if big.is_negative(a) else a))
+
+#a mod |n| as a limb list, on magnitudes so that RESULT_WIDTH only applies
+#to the final result of moduloExp and PrecomputedBase
+def residueLimbs(a, n):
+    v = magnitudeLimbs(n)
+    r = big.strip_limbs(divideLimbs(magnitudeLimbs(a), v)[1])
+    if r and big.is_negative(a):
+        r = big.strip_limbs(big.subtract_limbs(v, r))
+    return r or [0]
+
+#Lehmer's GCD on magnitude limb lists (Knuth, TAOCP vol. 2, 4.5.2,
+#Algorithm L). Each step runs Euclid on the leading limb of x and y in
+#single-precision and applies the collected cofactors to the full
+#numbers; a full division step is only needed when the leading limbs
+#cannot decide a quotient. Returns (gcd, s), where s is the signed
+#cofactor of u as a (negative, limbs) pair when extended is set.
+def gcdLimbs(u, v, extended):
+    bits = 8 * big.LIMB_BYTES
+    x, sx = u, (False, [1])
+    y, sy = v, (False, [])
+    if big.compare_limbs(x, y) < 0:
+        x, y = y, x
+        sx, sy = sy, sx
+    while y:
+        if len(y) > 1:
+            shift = big.limbs_bit_length(x) - bits
+            xHat = big.limb_bits(x, shift, bits)
+            yHat = big.limb_bits(y, shift, bits)
+            A, B, C, D = 1, 0, 0, 1
+            while yHat + C and yHat + D:
+                q = (xHat + A) // (yHat + C)
+                if q != (xHat + B) // (yHat + D):
+                    break
+                A, C = C, A - q * C
+                B, D = D, B - q * D
+                xHat, yHat = yHat, xHat - q * yHat
+            if B:
+                x, y = (addSigned(scaleSigned(A, (False, x)), scaleSigned(B, (False, y)))[1],
+                        addSigned(scaleSigned(C, (False, x)), scaleSigned(D, (False, y)))[1])
+                if extended:
+                    sx, sy = (addSigned(scaleSigned(A, sx), scaleSigned(B, sy)),
+                              addSigned(scaleSigned(C, sx), scaleSigned(D, sy)))
+                continue
+
+        quotient, remainder = divideLimbs(x, y)
+        x, y = y, big.strip_limbs(remainder)
+        if extended:
+            product = big.strip_limbs(big.multiply_limbs(quotient, sy[1]))
+            sx, sy = sy, addSigned(sx, (not sy[0], product))
+    return x, sx
+
+#Signed limb values are (negative, magnitude limbs) pairs
+def scaleSigned(k, value):
+    if k == 0 or not value[1]:
+        return (False, [])
+    return (value[0] != (k < 0), big.strip_limbs(big.multiply_limbs(value[1], [abs(k)])))
+
+def addSigned(x, y):
+    if x[0] == y[0]:
+        return (x[0], big.strip_limbs(big.add_limbs(x[1], y[1])))
+    if big.compare_limbs(x[1], y[1]) >= 0:
+        magnitude = big.strip_limbs(big.subtract_limbs(x[1], y[1]))
+        return (x[0] and bool(magnitude), magnitude)
+    return (y[0], big.strip_limbs(big.subtract_limbs(y[1], x[1])))
 
 #Helper functions
 def dividePositive(a, b):
-    zero = bytearray(len(a))
-    if big.equal(a, zero):
-        return (zero,zero)
-    quotient, remainder = dividePositive(big.half(a),b)
-    quotient = big.twice(quotient)
-    remainder = big.twice(remainder)
-    if (not big.is_even(a)):
-        remainder = incrementByOne(remainder)
-    if big.greater_than(remainder, b) or big.equal(remainder, b):
-        remainder = big.add(remainder, big.negate(b))
-        quotient = incrementByOne(quotient)
-    return (quotient, remainder)
-
-def divideDifferentSigns(a, b):
-    if not big.equal(b, bytearray(len(b))):
-        return big.negate(incrementByOne(a))
-    else:
-        return big.negate(a)
-
-def incrementByOne(number):
-    return big.add(number, big.int2bytearray(1, len(number)))
-
-
-
-class IntArithmetic(unittest.TestCase):
-
-    # START Unit Tests for Problem 1
-    def testDividePositive1(self):
-        print("Positive Division Test 1:")
-        a = big.int2bytearray(120, 8)
-        b = big.int2bytearray(4, 8)
-        c = divide(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, 120/4)
-
-    def testDividePositive2(self):
-        print("Positive Division Test 2:")
-        a = big.int2bytearray(47, 8)
-        b = big.int2bytearray(5, 8)
-        c = divide(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, 47/5)
-    # END Unit Tests for Problem 1
-
-    # START Unit Tests for Problem 2
-    def testDivideNegative1(self):
-        print("Negative Division Test 1:")
-        a = big.int2bytearray(-5, 8)
-        b = big.int2bytearray(4, 8)
-        c = divide(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, -5/4)
-
-    def testDivideNegative2(self):
-        print("Negative Division Test 2:")
-        a = big.int2bytearray(8, 8)
-        b = big.int2bytearray(-4, 8)
-        c = divide(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, 8/-4)
-
-    def testDivideNegative3(self):
-        print("Negative Division Test 3:")
-        a = big.int2bytearray(-6, 8)
-        b = big.int2bytearray(3, 8)
-        c = divide(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, -6/3)
-
-    def testDivideNegative4(self):
-        print("Negative Division Test 4:")
-        a = big.int2bytearray(-15, 8)
-        b = big.int2bytearray(-5, 8)
-        c = divide(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, -15/-5)
-    # END Unit Tests for Problem 2
-
-    # START Unit Tests for Problem 3
-    def testDivideSignExt1(self):
-        print("Sign Extension Division Test 1:")
-        a = big.int2bytearray(1234567890)
-        b = big.int2bytearray(2)
-        c = divide(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, 1234567890/2)
-    # END Unit Tests for Problem 3
-
-    # START Unit Tests for Problem 4
-    def testModulo1(self):
-        print("Modulo Test 1:")
-        a = big.int2bytearray(7, 8)
-        b = big.int2bytearray(3, 8)
-        c = modulo(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "%" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "%", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, 7 % 3)
-
-    def testModulo2(self):
-        print("Modulo Test 2:")
-        a = big.int2bytearray(-98, 8)
-        b = big.int2bytearray(-17, 8)
-        c = modulo(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "%" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "%", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, -98 % -17)
-    # END Unit Tests for Problem 4
-
-    # START Unit Tests for Problem 5
-    def testModulo3(self):
-        print("Modulo Test 3:")
-        a = big.int2bytearray(-3, 8)
-        b = big.int2bytearray(4, 8)
-        c = modulo(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "%" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "%", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, -3%4)
-
-    def testModulo4(self):
-        print("Modulo Test 4:")
-        a = big.int2bytearray(3, 8)
-        b = big.int2bytearray(-4, 8)
-        c = modulo(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "%" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "%", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, 3%-4)
-
-    def testModulo5(self):
-        print("Modulo Test 5:")
-        a = big.int2bytearray(1234567890)
-        b = big.int2bytearray(2)
-        c = modulo(a, b)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(big.bytearray2int(a)) + "%" + str(big.bytearray2int(b)) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", big.bytearray2int(a), "%", big.bytearray2int(b), "=", ans)
-        self.assertEqual(ans, 1234567890%2)
-    # END Unit Tests for Problem 5
-
-    # START Unit Tests for Problem 6
-    def testExpMod1(self):
-        print("Exponential Modulo Test 1:")
-        a = 5
-        aArray = big.int2bytearray(5, 8)
-
-        b = 756
-        bArray = big.int2bytearray(756, 8)
-
-        n = 25
-        nArray = big.int2bytearray(25, 8)
-
-        c = moduloExp(aArray, bArray, nArray)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(a) + "^" + str(b) + "%" + str(n) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", a, "^", b, "%", n, "=", ans)
-        self.assertEqual(ans, pow(a, b, n))
-
-    def testExpMod2(self):
-        print("Exponential Modulo Test 2:")
-        a = 9
-        aArray = big.int2bytearray(9, 8)
-
-        b = 3
-        bArray = big.int2bytearray(3, 8)
-
-        n = 4
-        nArray = big.int2bytearray(4, 8)
-
-        c = moduloExp(aArray, bArray, nArray)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(a) + "^" + str(b) + "%" + str(n) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", a, "^", b, "%", n, "=", ans)
-        self.assertEqual(ans, pow(a, b, n))
-
-    def testExpMod3(self):
-        print("Exponential Modulo Test 3:")
-        a = 12
-        aArray = big.int2bytearray(12, 8)
-
-        b = 17
-        bArray = big.int2bytearray(17, 8)
-
-        n = 7
-        nArray = big.int2bytearray(7, 8)
-
-        c = moduloExp(aArray, bArray, nArray)
-        ans = big.bytearray2int(c)
-        printstatement = "\n" + str(a) + "^" + str(b) + "%" + str(n) + "=" + str(ans)
-        print(printstatement)
-        # print("\n", a, "^", b, "%", n, "=", ans)
-        self.assertEqual(ans, pow(a, b, n))
-    # END Unit Tests for Problem 6
-
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    nbytes = max(len(a), len(b))
+    quotient, remainder = divideLimbs(big.to_limbs(a), big.to_limbs(b))
+    return (big.from_magnitude(quotient, nbytes, False), big.from_magnitude(remainder, nbytes, False))
+
+#divideWithRemainder for ints, returning bytearrays of at least nbytes bytes
+def divideInts(x, y, nbytes):
+    if y == 0:
+        raise ZeroDivisionError("division by zero")
+    quotient, remainder = divmod(x, y)
+    return (big.fit_result(intResult(quotient, nbytes)), big.fit_result(intResult(remainder, nbytes)))
+
+#An int as a bytearray of nbytes bytes, grown like big.from_magnitude if needed
+def intResult(value, nbytes):
+    return big.int2bytearray(value, max(nbytes, (value if value >= 0 else ~value).bit_length() // 8 + 1))
+
+#Schoolbook long division of little-endian limb lists (Knuth, TAOCP vol. 2,
+#4.3.1, Algorithm D). Works on magnitudes and returns (quotient, remainder).
+def divideLimbs(u, v):
+    bits = 8 * big.LIMB_BYTES
+    base = 1 << bits
+    mask = base - 1
+
+    v = big.strip_limbs(v)
+    if not v:
+        raise ZeroDivisionError("division by zero")
+    u = big.strip_limbs(u)
+    n = len(v)
+    if len(u) < n:
+        return [0], u or [0]
+
+    if n == 1:
+        return divideBySingleLimb(u, v[0])
+
+    # D1: normalize so that the top limb of v has its highest bit set.
+    # The normalized dividend lives in a scratch buffer.
+    shift = bits - v[-1].bit_length()
+    v = big.shift_limbs_left(v, shift)
+    work = scratch.take(len(u) + 1)
+    big.shift_limbs_left_into(work, u, shift)
+    u = work
+    m = len(u) - n - 1
+    vTop = v[-1]
+    vNext = v[-2]
+    quotient = [0] * (m + 1)
+
+    for j in range(m, -1, -1):
+        # D3: estimate the quotient limb from the top two limbs of u.
+        qhat, rhat = divmod((u[j + n] << bits) | u[j + n - 1], vTop)
+        while qhat >= base or qhat * vNext > ((rhat << bits) | u[j + n - 2]):
+            qhat -= 1
+            rhat += vTop
+            if rhat >= base:
+                break
+
+        # D4: multiply and subtract qhat * v from the current window of u.
+        carry = 0
+        borrow = 0
+        for i in range(n):
+            product = qhat * v[i] + carry
+            carry = product >> bits
+            diff = u[i + j] - (product & mask) - borrow
+            u[i + j] = diff & mask
+            borrow = 1 if diff < 0 else 0
+        diff = u[j + n] - carry - borrow
+        u[j + n] = diff & mask
+
+        # D6: qhat was one too large, add v back.
+        if diff < 0:
+            qhat -= 1
+            carry = 0
+            for i in range(n):
+                total = u[i + j] + v[i] + carry
+                u[i + j] = total & mask
+                carry = total >> bits
+            u[j + n] = (u[j + n] + carry) & mask
+
+        quotient[j] = qhat
+
+    # D8: unnormalize the remainder.
+    remainder = big.shift_limbs_right(u[:n], shift)
+    scratch.give(work)
+    return quotient, remainder
+
+def divideBySingleLimb(u, divisor):
+    bits = 8 * big.LIMB_BYTES
+    quotient = [0] * len(u)
+    remainder = 0
+    for i in range(len(u) - 1, -1, -1):
+        quotient[i], remainder = divmod((remainder << bits) | u[i], divisor)
+    return quotient, [remainder]
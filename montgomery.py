@@ -0,0 +1,97 @@
+# Montgomery arithmetic for repeated multiplication modulo an odd number.
+#
+# A MontgomeryContext is built once per modulus n. Numbers are kept in
+# Montgomery form x * R mod n, where R = 2 ** (8 * LIMB_BYTES * k) and k is
+# the number of limbs in n, so that every product is reduced with REDC
+# (shifts and multiplies by single limbs) instead of a long division.
+#
+# Contexts share one interface with barrett.BarrettContext:
+# encode/decode move limb lists in and out of the working form, multiply
+# and square work on encoded values, and one is the encoded 1.
+
+
+import big
+import intarithmetic
+
+
+class MontgomeryContext(object):
+    def __init__(self, modulus):
+        # modulus is a positive odd bytearray.
+        limbs = big.strip_limbs(big.to_limbs(modulus))
+        if big.is_negative(modulus) or not limbs or not limbs[0] & 1:
+            raise ValueError('Montgomery reduction needs a positive odd modulus')
+        self.nbytes = len(modulus)
+        self.modulus = limbs
+        self.size = len(limbs)
+        self.bits = 8 * big.LIMB_BYTES
+        self.mask = (1 << self.bits) - 1
+
+        # n_prime = -n**-1 mod 2**bits. Newton's iteration doubles the
+        # number of correct low bits each step; n is its own inverse
+        # modulo 8.
+        inverse = limbs[0]
+        for i in range(5):
+            inverse = (inverse * (2 - limbs[0] * inverse)) & self.mask
+        self.n_prime = -inverse & self.mask
+
+        self.one = self.pad(intarithmetic.divideLimbs([0] * self.size + [1], limbs)[1])
+        self.r_squared = self.pad(intarithmetic.divideLimbs([0] * (2 * self.size) + [1], limbs)[1])
+
+    def pad(self, limbs):
+        limbs = big.strip_limbs(limbs)
+        return limbs + [0] * (self.size - len(limbs))
+
+    def reduce(self, t):
+        # REDC: returns t / R mod n for 0 <= t < n * R.
+        buffer = intarithmetic.scratch.take(2 * self.size + 1)
+        t = big.strip_limbs(t)
+        buffer[:len(t)] = t
+        return self.reduce_in_place(buffer)
+
+    def reduce_in_place(self, t):
+        # REDC on a scratch buffer of 2 * size + 1 limbs, which is handed
+        # back to the pool.
+        size = self.size
+        bits = self.bits
+        mask = self.mask
+        modulus = self.modulus
+        n_prime = self.n_prime
+        for i in range(size):
+            m = (t[i] * n_prime) & mask
+            if m == 0:
+                continue
+            carry = 0
+            k = i
+            for limb in modulus:
+                total = t[k] + m * limb + carry
+                t[k] = total & mask
+                carry = total >> bits
+                k += 1
+            while carry:
+                total = t[k] + carry
+                t[k] = total & mask
+                carry = total >> bits
+                k += 1
+
+        result = t[size:]
+        intarithmetic.scratch.give(t)
+        if big.compare_limbs(result, modulus) >= 0:
+            result = big.subtract_limbs(result, modulus)
+        return result[:size]
+
+    def encode(self, x):
+        # x must already be reduced modulo n.
+        return self.reduce(big.multiply_limbs(x, self.r_squared))
+
+    def decode(self, x):
+        return big.strip_limbs(self.reduce(x)) or [0]
+
+    def multiply(self, x, y):
+        t = intarithmetic.scratch.take(2 * self.size + 1)
+        big.multiply_limbs_into(t, x, y)
+        return self.reduce_in_place(t)
+
+    def square(self, x):
+        t = intarithmetic.scratch.take(2 * self.size + 1)
+        big.square_limbs_into(t, x)
+        return self.reduce_in_place(t)
@@ -0,0 +1,213 @@
+# Process-pool parallel moduloExp and division for batches of independent jobs.
+#
+# The arithmetic is pure Python and holds the GIL, so independent jobs
+# (batch signature checks, say) only run in parallel in separate
+# processes. The functions here spread an iterable of jobs over a
+# concurrent.futures.ProcessPoolExecutor:
+#
+#     for result in map_modulo_exp([(a1, b1, n1), (a2, b2, n2), ...]):
+#         ...
+#
+# Jobs are sorted by estimated cost and cut into chunks of about equal
+# cost, so operands of similar size travel together and workers finish at
+# about the same time. Each chunk is sent as one bytes blob of
+# length-prefixed operands rather than as many small pickled bytearrays.
+# Results come back in input order, or with ordered=False as
+# (index, result) pairs as soon as each chunk completes.
+#
+# On Python 2 this needs the futures backport.
+
+import multiprocessing
+import os
+import struct
+
+import intarithmetic
+
+# concurrent.futures, imported on first use so that importing this module
+# (crt.py does) stays cheap.
+futures = None
+
+# Chunks per worker. More chunks balance better, fewer cost less overhead.
+CHUNKS_PER_WORKER = 4
+
+
+def require_futures():
+    global futures
+    if futures is None:
+        try:
+            from concurrent import futures
+        except ImportError:
+            raise ImportError('parallel.py needs concurrent.futures (pip install futures on Python 2)')
+    return futures
+
+
+def have_futures():
+    try:
+        require_futures()
+    except ImportError:
+        return False
+    return True
+
+
+def divmod_job(a, b):
+    return intarithmetic.divideWithRemainder(a, b)
+
+
+def divide_job(a, b):
+    return (intarithmetic.divide(a, b),)
+
+
+def modulo_job(a, b):
+    return (intarithmetic.modulo(a, b),)
+
+
+def modulo_exp_job(a, b, n):
+    return (intarithmetic.moduloExp(a, b, n),)
+
+
+# name: (function returning a tuple of bytearrays, operands, results)
+OPERATIONS = {
+    'divmod': (divmod_job, 2, 2),
+    'divide': (divide_job, 2, 1),
+    'modulo': (modulo_job, 2, 1),
+    'moduloExp': (modulo_exp_job, 3, 1),
+}
+
+
+##############################################
+# Chunk encoding
+
+def pack_groups(groups):
+    # Every bytearray of every group as a 4-byte length and its bytes.
+    parts = []
+    for group in groups:
+        for array in group:
+            parts.append(struct.pack('>I', len(array)))
+            parts.append(bytes(array))
+    return b''.join(parts)
+
+
+def unpack_groups(blob, size):
+    # Inverse of pack_groups for groups of size bytearrays.
+    view = memoryview(blob)
+    groups = []
+    offset = 0
+    while offset < len(view):
+        group = []
+        for i in range(size):
+            (length,) = struct.unpack_from('>I', blob, offset)
+            offset += 4
+            group.append(bytearray(view[offset:offset + length]))
+            offset += length
+        groups.append(tuple(group))
+    return groups
+
+
+def run_chunk(operation, blob):
+    # Runs in a worker process.
+    function, operands, results = OPERATIONS[operation]
+    return pack_groups([function(*job) for job in unpack_groups(blob, operands)])
+
+
+##############################################
+# Scheduling
+
+def job_cost(operation, job):
+    # Rough relative cost: schoolbook products and long division are
+    # quadratic in the width, exponentiation does one product per
+    # exponent bit.
+    width = max(len(array) for array in job)
+    if operation == 'moduloExp':
+        return width * width * (8 * len(job[1]) + 1)
+    return width * width + 1
+
+
+def make_chunks(operation, jobs, count):
+    # Splits the job indices into about count chunks of similar cost.
+    costs = [job_cost(operation, job) for job in jobs]
+    target = max(sum(costs) // max(count, 1), 1)
+    chunks = []
+    chunk = []
+    total = 0
+    for index in sorted(range(len(jobs)), key=costs.__getitem__):
+        chunk.append(index)
+        total += costs[index]
+        if total >= target:
+            chunks.append(chunk)
+            chunk = []
+            total = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def cpu_count():
+    # os.cpu_count is new in Python 3.4.
+    return getattr(os, 'cpu_count', multiprocessing.cpu_count)() or 1
+
+
+def map_jobs(operation, jobs, workers=None, ordered=True, executor=None):
+    # Yields a tuple of result bytearrays per job, in input order, or
+    # (index, results) pairs in completion order. Pass an executor to
+    # reuse its worker processes across calls, and its number of workers
+    # as workers; workers defaults to cpu_count().
+    require_futures()
+    function, operands, results = OPERATIONS[operation]
+    jobs = [tuple(job) for job in jobs]
+    for job in jobs:
+        if len(job) != operands:
+            raise ValueError('%s jobs have %d operands' % (operation, operands))
+
+    if workers is None:
+        workers = cpu_count()
+    own_executor = executor is None
+    if own_executor:
+        executor = futures.ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = {}
+        for chunk in make_chunks(operation, jobs, workers * CHUNKS_PER_WORKER):
+            blob = pack_groups([jobs[index] for index in chunk])
+            pending[executor.submit(run_chunk, operation, blob)] = chunk
+
+        done = {}
+        next_index = 0
+        for future in futures.as_completed(pending):
+            for index, result in zip(pending[future], unpack_groups(future.result(), results)):
+                if not ordered:
+                    yield index, result
+                else:
+                    done[index] = result
+            while next_index in done:
+                yield done.pop(next_index)
+                next_index += 1
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+def single_results(pairs, ordered):
+    for item in pairs:
+        if ordered:
+            yield item[0]
+        else:
+            yield item[0], item[1][0]
+
+
+def map_modulo_exp(jobs, workers=None, ordered=True, executor=None):
+    # jobs are (a, b, n) triples; yields moduloExp(a, b, n) for each.
+    return single_results(map_jobs('moduloExp', jobs, workers, ordered, executor), ordered)
+
+
+def map_divide(jobs, workers=None, ordered=True, executor=None):
+    # jobs are (a, b) pairs; yields divide(a, b) for each.
+    return single_results(map_jobs('divide', jobs, workers, ordered, executor), ordered)
+
+
+def map_modulo(jobs, workers=None, ordered=True, executor=None):
+    # jobs are (a, b) pairs; yields modulo(a, b) for each.
+    return single_results(map_jobs('modulo', jobs, workers, ordered, executor), ordered)
+
+
+def map_divmod(jobs, workers=None, ordered=True, executor=None):
+    # jobs are (a, b) pairs; yields (quotient, remainder) for each.
+    return map_jobs('divmod', jobs, workers, ordered, executor)
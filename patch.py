@@ -0,0 +1,50 @@
+# Shared bookkeeping for the tools that swap functions in big and
+# intarithmetic at run time: cache.py, instrument.py and consttime.py.
+#
+# Every patched (module, name) keeps its original function and a stack of
+# layers, one per tool, each a function that wraps whatever is below it.
+# The installed function is the original with the layers applied in the
+# order the tools were enabled, so the tool enabled last sees each call
+# first: instrumenting after enabling the cache counts cache hits as calls.
+# Removing a tool rebuilds the names it touched from the layers that
+# remain, so tools can be enabled and disabled in any order without
+# undoing one another.
+
+# (module, name) -> the unpatched function
+originals = {}
+
+# (module, name) -> [(owner, wrap), ...], bottom layer first
+layers = {}
+
+
+def install(owner, wrappers):
+    # wrappers maps (module, name) to wrap(function), which returns the
+    # replacement for the function below it.
+    for key, wrap in wrappers.items():
+        if key not in originals:
+            originals[key] = getattr(*key)
+            layers[key] = []
+        layers[key].append((owner, wrap))
+        rebuild(key)
+
+
+def remove(owner):
+    for key in list(layers):
+        remaining = [layer for layer in layers[key] if layer[0] != owner]
+        if len(remaining) != len(layers[key]):
+            layers[key] = remaining
+            rebuild(key)
+
+
+def installed(owner):
+    return any(layer[0] == owner for stack in layers.values() for layer in stack)
+
+
+def rebuild(key):
+    function = originals[key]
+    for owner, wrap in layers[key]:
+        function = wrap(function)
+    setattr(key[0], key[1], function)
+    if not layers[key]:
+        del layers[key]
+        del originals[key]
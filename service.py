@@ -0,0 +1,506 @@
+# An asyncio front end for moduloExp, divide, modulo and divmod.
+#
+# The arithmetic is pure Python, so calling it from an event loop stalls
+# every other connection for as long as it runs. An ArithmeticService
+# queues requests instead and runs them in an executor, a thread pool by
+# default or a ProcessPoolExecutor for real parallelism:
+#
+#     async with ArithmeticService(executor) as service:
+#         c = await service.modulo_exp(a, b, n)
+#
+# A dispatcher task takes requests off the queue in micro-batches of up
+# to max_batch, waiting up to max_delay seconds for a batch to fill, and
+# groups them by operation, operand widths and modulus. Each group runs as
+# one executor job, so a moduloExp group builds its reduction context
+# once and a modulo group with a wide shared divisor reduces with one
+# barrett.BarrettContext. Operands travel as one blob, as in parallel.py.
+#
+# The queue holds at most max_pending requests and at most max_running
+# groups run at once. When both are full, submit() waits, and so do
+# callers and the connections they read from: load is pushed back to the
+# clients instead of piling up in memory. An error in one request, such
+# as a zero divisor, fails only that request.
+#
+# serve() puts a service behind a TCP or Unix socket, Client talks to it,
+# and generate_load() drives either one with random jobs:
+#
+#     python service.py --requests 2000 --concurrency 64 --width 128
+#
+# Wire format: every message is a 4-byte length and a body. A request
+# body is a 4-byte id, a 1-byte operation code and the operands packed
+# with parallel.pack_groups. A response body is the id, a status byte
+# (0 for results, 1 for an error message) and the packed results or the
+# UTF-8 message.
+#
+# Needs Python 3.7 or later.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+import barrett
+import big
+import intarithmetic
+import parallel
+
+CODES = {'divmod': 0, 'divide': 1, 'modulo': 2, 'moduloExp': 3}
+OPERATION_NAMES = dict((code, name) for name, code in CODES.items())
+
+# Shared divisors at least this wide are reduced with Barrett reduction
+# (it wins over long division from about 256 bits).
+BARRETT_MIN_BYTES = 32
+
+HEADER = struct.Struct('>I')
+REQUEST = struct.Struct('>IB')
+
+
+def batch_key(operation, operands):
+    # Requests with the same key run in the same executor job.
+    if operation == 'moduloExp':
+        a, b, n = operands
+        return (operation, len(a), len(b), bytes(n))
+    if operation == 'modulo':
+        a, b = operands
+        return (operation, len(a), bytes(b))
+    return (operation,) + tuple(len(array) for array in operands)
+
+
+def run_batch(operation, blob):
+    # Runs in the executor. Returns the packed results, with empty
+    # placeholders for failed jobs, and the exceptions by job index.
+    function, operands, results = parallel.OPERATIONS[operation]
+    jobs = parallel.unpack_groups(blob, operands)
+    if operation == 'moduloExp':
+        function = modulo_exp_function(jobs[0][2])
+    elif operation == 'modulo' and len(jobs) > 1 and len(jobs[0][1]) >= BARRETT_MIN_BYTES:
+        function = modulo_function(jobs[0][1])
+    output = []
+    errors = {}
+    for i, job in enumerate(jobs):
+        try:
+            output.append(function(*job))
+        except Exception as error:
+            errors[i] = error
+            output.append((bytearray(),) * results)
+    return parallel.pack_groups(output), errors
+
+
+def modulo_exp_function(n):
+    # moduloExp for jobs that all use modulus n, sharing its context.
+    try:
+        context = intarithmetic.reductionContext(big.negate(n) if big.is_negative(n) else n)
+    except ZeroDivisionError:
+        return parallel.modulo_exp_job
+
+    def modulo_exp(a, b, n):
+        return (intarithmetic.moduloExp(a, b, n, context=context),)
+    return modulo_exp
+
+
+def modulo_function(b):
+    try:
+        context = barrett.BarrettContext(b)
+    except ZeroDivisionError:
+        return parallel.modulo_job
+
+    def modulo(a, b):
+        return (context.reduce(a),)
+    return modulo
+
+
+class ArithmeticService(object):
+    def __init__(self, executor=None, max_pending=1024, max_batch=64, max_delay=0.0005, max_running=None):
+        # executor=None uses the event loop's default thread pool.
+        # max_running, the number of groups run at once, defaults to the
+        # number of CPUs.
+        self.executor = executor
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        if max_running is None:
+            max_running = os.cpu_count() or 1
+        self.max_running = max_running
+        self.loop = None
+        self.queue = None
+        self.dispatcher = None
+        self.closing = False
+        self.submitting = 0
+        self.running = set()
+        self.requests = 0
+        self.batches = 0
+        self.groups = 0
+        self.failures = 0
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(self.max_pending)
+        self.slots = asyncio.Semaphore(self.max_running)
+        self.admitted = asyncio.Event()
+        self.stopped = asyncio.Event()
+        self.closing = False
+        self.dispatcher = self.loop.create_task(self.dispatch())
+        return self
+
+    async def close(self):
+        # Refuses new requests, finishes every queued one, then stops the
+        # dispatcher. Requests still waiting for room in the queue are
+        # let in first, so the end-of-queue marker comes after all of them.
+        if self.dispatcher is None:
+            return
+        if self.closing:
+            await self.stopped.wait()
+            return
+        self.closing = True
+        if self.submitting:
+            await self.admitted.wait()
+        await self.queue.put(None)
+        await self.dispatcher
+        if self.running:
+            await asyncio.wait(list(self.running))
+        self.dispatcher = None
+        self.stopped.set()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+        return False
+
+    async def submit(self, operation, *operands):
+        # Queues a request, waiting while the queue is full, and returns
+        # a future for its result.
+        if self.dispatcher is None or self.closing:
+            raise RuntimeError('the service is not running')
+        if operation not in parallel.OPERATIONS:
+            raise ValueError('unknown operation %r' % (operation,))
+        count = parallel.OPERATIONS[operation][1]
+        if len(operands) != count:
+            raise ValueError('%s takes %d operands' % (operation, count))
+        future = self.loop.create_future()
+        self.submitting += 1
+        try:
+            await self.queue.put((batch_key(operation, operands), operands, future))
+        finally:
+            self.submitting -= 1
+            if self.closing and not self.submitting:
+                self.admitted.set()
+        self.requests += 1
+        return future
+
+    async def call(self, operation, *operands):
+        # The result bytearray, or for divmod the (quotient, remainder)
+        # pair.
+        return await (await self.submit(operation, *operands))
+
+    async def modulo_exp(self, a, b, n):
+        return await self.call('moduloExp', a, b, n)
+
+    async def divide(self, a, b):
+        return await self.call('divide', a, b)
+
+    async def modulo(self, a, b):
+        return await self.call('modulo', a, b)
+
+    async def divmod(self, a, b):
+        return await self.call('divmod', a, b)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'groups': self.groups,
+            'failures': self.failures,
+            'queued': self.queue.qsize() if self.queue else 0,
+            'running': len(self.running),
+        }
+
+    async def dispatch(self):
+        closing = False
+        while not closing:
+            item = await self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            if self.queue.empty() and self.max_delay:
+                await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                item = self.queue.get_nowait()
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            self.batches += 1
+
+            groups = {}
+            for key, operands, future in batch:
+                if not future.cancelled():
+                    groups.setdefault(key, []).append((operands, future))
+            for key, requests in groups.items():
+                await self.slots.acquire()
+                task = self.loop.create_task(self.run(key[0], requests))
+                self.running.add(task)
+                task.add_done_callback(self.running.discard)
+
+    async def run(self, operation, requests):
+        self.groups += 1
+        try:
+            blob = parallel.pack_groups([operands for operands, future in requests])
+            try:
+                blob, errors = await self.loop.run_in_executor(self.executor, run_batch, operation, blob)
+            except Exception as error:
+                blob, errors = None, dict((i, error) for i in range(len(requests)))
+        finally:
+            self.slots.release()
+
+        count = parallel.OPERATIONS[operation][2]
+        results = parallel.unpack_groups(blob, count) if blob is not None else [None] * len(requests)
+        for i, ((operands, future), result) in enumerate(zip(requests, results)):
+            if future.done():
+                continue
+            if i in errors:
+                self.failures += 1
+                future.set_exception(errors[i])
+            else:
+                future.set_result(result if count > 1 else result[0])
+
+
+##############################################
+# Socket server and client
+
+async def read_message(reader):
+    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return await reader.readexactly(length)
+
+
+def write_message(writer, body):
+    writer.write(HEADER.pack(len(body)) + body)
+
+
+class Server(object):
+    # The service behind a TCP or Unix socket. Each connection reads
+    # requests and writes responses as they complete, so a client may
+    # pipeline requests; while the service is full it stops reading.
+    def __init__(self, service):
+        self.service = service
+        self.connections = set()
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self
+
+    def address(self):
+        # (host, port) for TCP, the path for a Unix socket.
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        # Stops accepting connections and drops the open ones.
+        self.server.close()
+        await self.server.wait_closed()
+        for task in self.connections:
+            task.cancel()
+        if self.connections:
+            await asyncio.wait(list(self.connections))
+
+    async def handle(self, reader, writer):
+        self.connections.add(asyncio.current_task())
+        pending = set()
+        try:
+            while True:
+                try:
+                    body = await read_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                request_id, code = REQUEST.unpack_from(body)
+                try:
+                    operation = OPERATION_NAMES[code]
+                    count = parallel.OPERATIONS[operation][1]
+                    operands = parallel.unpack_groups(body[REQUEST.size:], count)[0]
+                    future = await self.service.submit(operation, *operands)
+                except Exception as error:
+                    future = self.service.loop.create_future()
+                    future.set_exception(error)
+                task = self.service.loop.create_task(respond(writer, request_id, future))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.wait(list(pending))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+            writer.close()
+            self.connections.discard(asyncio.current_task())
+
+
+async def serve(service, host='127.0.0.1', port=0, path=None):
+    # Starts a Server on a TCP port, or on a Unix socket if path is given.
+    return await Server(service).start(host, port, path)
+
+
+async def respond(writer, request_id, future):
+    try:
+        result = await future
+    except Exception as error:
+        body = REQUEST.pack(request_id, 1) + ('%s: %s' % (type(error).__name__, error)).encode('utf-8')
+    else:
+        results = result if isinstance(result, tuple) else (result,)
+        body = REQUEST.pack(request_id, 0) + parallel.pack_groups([results])
+    write_message(writer, body)
+    await writer.drain()
+
+
+class RemoteError(Exception):
+    pass
+
+
+class Client(object):
+    # Pipelined client for serve(): any number of calls may be in flight
+    # on one connection.
+    def __init__(self):
+        self.pending = {}
+        self.next_id = 0
+
+    async def connect(self, host='127.0.0.1', port=None, path=None):
+        if path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.receiver = asyncio.get_running_loop().create_task(self.receive())
+        return self
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self.receiver
+
+    async def call(self, operation, *operands):
+        request_id = self.next_id
+        self.next_id = (self.next_id + 1) & 0xffffffff
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = (future, parallel.OPERATIONS[operation][2])
+        write_message(self.writer, REQUEST.pack(request_id, CODES[operation]) + parallel.pack_groups([operands]))
+        await self.writer.drain()
+        return await future
+
+    async def receive(self):
+        try:
+            while True:
+                body = await read_message(self.reader)
+                request_id, status = REQUEST.unpack_from(body)
+                future, count = self.pending.pop(request_id)
+                if status:
+                    future.set_exception(RemoteError(body[REQUEST.size:].decode('utf-8')))
+                else:
+                    results = parallel.unpack_groups(body[REQUEST.size:], count)[0]
+                    future.set_result(results if count > 1 else results[0])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for future, count in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('connection closed'))
+            self.pending.clear()
+
+
+##############################################
+# Load generator
+
+def random_jobs(rng, operation, count, width, moduli=4):
+    # count random jobs for operation on width-byte operands, drawing the
+    # modulus or divisor from a few fixed ones so that batches can share
+    # them. Exponents are positive.
+    shared = []
+    for i in range(moduli):
+        shared.append(big.int2bytearray(rng.getrandbits(8 * width - 1) | 1, width))
+    jobs = []
+    for i in range(count):
+        a = big.int2bytearray(rng.getrandbits(8 * width) - (1 << (8 * width - 1)), width)
+        n = rng.choice(shared)
+        if operation == 'moduloExp':
+            jobs.append((a, big.int2bytearray(rng.getrandbits(8 * width - 1), width), n))
+        else:
+            jobs.append((a, n))
+    return jobs
+
+
+async def generate_load(call, operation, jobs, concurrency):
+    # Runs jobs through call (service.call or client.call) with at most
+    # concurrency requests in flight, and reports throughput and latency.
+    latencies = []
+    results = [None] * len(jobs)
+    indices = iter(range(len(jobs)))
+
+    async def worker():
+        for i in indices:
+            start = time.perf_counter()
+            results[i] = await call(operation, *jobs[i])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for i in range(concurrency)])
+    seconds = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+
+    return results, {
+        'requests': len(jobs),
+        'seconds': seconds,
+        'requests_per_sec': len(jobs) / seconds if seconds else 0.0,
+        'latency_p50': percentile(0.50),
+        'latency_p99': percentile(0.99),
+    }
+
+
+async def run_load(args):
+    executor = None
+    if args.processes:
+        executor = parallel.require_futures().ProcessPoolExecutor(max_workers=args.processes)
+    try:
+        jobs = random_jobs(random.Random(args.seed), args.operation, args.requests, args.width)
+        async with ArithmeticService(executor, max_pending=args.max_pending, max_batch=args.max_batch,
+                                     max_running=2 * args.processes if args.processes else None) as service:
+            server = await serve(service, port=0, path=args.unix)
+            client = await Client().connect(port=None if args.unix else server.address()[1], path=args.unix)
+            try:
+                results, report = await generate_load(client.call, args.operation, jobs, args.concurrency)
+            finally:
+                await client.close()
+                await server.close()
+            report['service'] = service.stats()
+        return report
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the arithmetic service over a local socket.')
+    parser.add_argument('--operation', default='moduloExp', choices=sorted(CODES))
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--width', type=int, default=64, help='operand width in bytes')
+    parser.add_argument('--processes', type=int, default=0, help='worker processes (0: a thread pool)')
+    parser.add_argument('--max-pending', type=int, default=1024)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--unix', help='serve on this Unix socket path instead of TCP')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(run_load(args)), indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# Repeated division by a constant that fits in one limb, such as 10,
+# 256, 1000 or a small prime in formatting and checksum code.
+#
+# A SmallDivisor is built once per divisor d and returns exactly what
+# intarithmetic.divide, modulo and divideWithRemainder return for a / d,
+# including their sign conventions and result widths. It precomputes:
+#
+#   - the weight 2 ** (8 * LIMB_BYTES * i) mod d of each limb position, so
+#     that a remainder is one dot product of the dividend's limbs with the
+#     weights and a single %, done by map and sum rather than a loop;
+#   - the weight 2 ** (8 * nbytes) mod d of the sign of each dividend
+#     width, so that negative dividends are reduced without negating them;
+#   - for d = 2 ** k, the mask d - 1, so that a remainder is the low bits.
+#
+# Quotients take one pass of intarithmetic.divideBySingleLimb, which also
+# gives the remainder; divide_with_remainder only saves the per-call setup
+# of divideWithRemainder. The multiply-by-reciprocal step of Granlund and
+# Montgomery, "Division by invariant integers using multiplication"
+# (1994), does not pay off in that pass: CPython divides a two-limb int by
+# a one-limb int in C, and the reciprocal's wider product measured slower
+# for every one-limb divisor.
+
+
+import operator
+
+import big
+import intarithmetic
+
+
+class SmallDivisor(object):
+    def __init__(self, divisor):
+        # divisor is a nonzero bytearray of either sign whose magnitude
+        # fits in one limb.
+        self.nbytes = len(divisor)
+        self.value = big.bytearray2int(divisor)
+        self.magnitude = abs(self.value)
+        self.negative = self.value < 0
+        if self.magnitude == 0:
+            raise ZeroDivisionError("division by zero")
+        if self.magnitude >> (8 * big.LIMB_BYTES):
+            raise ValueError('SmallDivisor needs a divisor that fits in one limb')
+        if self.magnitude & (self.magnitude - 1):
+            self.mask = None
+        else:
+            self.mask = self.magnitude - 1
+        self.weights = [1 % self.magnitude]
+        self.wraps = {}
+
+    def weigh(self, count):
+        # Extends the limb weights to count positions.
+        base = (1 << (8 * big.LIMB_BYTES)) % self.magnitude
+        while len(self.weights) < count:
+            self.weights.append(self.weights[-1] * base % self.magnitude)
+
+    def wrap(self, nbytes):
+        # 2 ** (8 * nbytes) mod d, the weight of the sign of a dividend.
+        if nbytes not in self.wraps:
+            self.wraps[nbytes] = pow(2, 8 * nbytes, self.magnitude)
+        return self.wraps[nbytes]
+
+    def remainder(self, a):
+        # a mod d as an int, with the sign of d like Python's %.
+        limbs = big.to_limbs(a)
+        if self.mask is not None:
+            r = limbs[0] & self.mask
+        else:
+            self.weigh(len(limbs))
+            r = sum(map(operator.mul, limbs, self.weights[:len(limbs)]))
+        if big.is_negative(a):
+            r -= self.wrap(len(a))
+        r %= self.magnitude
+        if self.negative and r:
+            r -= self.magnitude
+        return r
+
+    def modulo(self, a):
+        # Same result as intarithmetic.modulo(a, d).
+        nbytes = max(len(a), self.nbytes)
+        return big.fit_result(intarithmetic.intResult(self.remainder(a), nbytes))
+
+    def divide(self, a):
+        # Same result as intarithmetic.divide(a, d).
+        return self.divide_with_remainder(a)[0]
+
+    def divide_with_remainder(self, a):
+        # Same result as intarithmetic.divideWithRemainder(a, d).
+        nbytes = max(len(a), self.nbytes)
+        if nbytes <= big.LIMB_BYTES:
+            return intarithmetic.divideInts(big.bytearray2int(a), self.value, nbytes)
+
+        aNegative = big.is_negative(a)
+        quotient, remainder = intarithmetic.divideBySingleLimb(big.to_limbs(big.negate(a) if aNegative else a),
+                                                               self.magnitude)
+        r = remainder[0]
+        if aNegative != self.negative and r:
+            quotient = big.add_limbs(quotient, [1])
+            r = self.magnitude - r
+        return (big.fit_result(big.from_magnitude(quotient, nbytes, aNegative != self.negative)),
+                big.fit_result(intarithmetic.intResult(-r if self.negative else r, nbytes)))
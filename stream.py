@@ -0,0 +1,110 @@
+# Division of a dividend too large to hold in memory, read as a stream.
+#
+# The dividend is an unsigned big-endian byte string that arrives in
+# chunks: from an iterable of bytes-like chunks (a socket reader, say),
+# a file object opened in binary mode, or a bytes-like object such as an
+# mmap. A StreamDivider keeps only the running remainder, which is
+# smaller than the divisor, so memory stays proportional to the divisor
+# however long the input is:
+#
+#     divider = StreamDivider(n)
+#     with open(path, 'rb') as f:
+#         for chunk in divider.divide(f):
+#             out.write(chunk)
+#     r = divider.remainder()
+#
+# or, when only the remainder is wanted,
+#
+#     r = stream_modulo(f, n)
+#
+# Each block of the input is divided together with the remainder so far,
+# so the quotient comes out in blocks of the same sizes as the input
+# blocks; concatenated, they are the quotient as an unsigned big-endian
+# byte string as long as the dividend. The divisor must be positive and
+# the remainder has the divisor's width, subject to big.RESULT_WIDTH.
+
+import mmap
+
+import big
+import intarithmetic
+
+# Largest block divided at once. Longer chunks are split, so a block and
+# its quotient are the only other buffers held.
+BLOCK_BYTES = 1 << 16
+
+
+class StreamDivider(object):
+    def __init__(self, divisor):
+        if big.is_negative(divisor):
+            raise ValueError("negative divisor")
+        limbs = big.strip_limbs(big.to_limbs(divisor))
+        if not limbs:
+            raise ZeroDivisionError("division by zero")
+        self.nbytes = len(divisor)
+        self.divisor = limbs
+        # Bytes needed for any remainder, i.e. for divisor - 1.
+        self.remainderBytes = (big.limbs_bit_length(limbs) + 7) // 8
+        self.remainderLimbs = [0]
+        self.length = 0
+
+    def update(self, block):
+        # Feeds the next bytes of the dividend and returns the quotient
+        # bytes at the same positions, as a bytearray as long as block.
+        quotient = self.step(block)
+        return big.from_limbs(quotient, len(block))
+
+    def step(self, block):
+        # The quotient limbs of (remainder, block) divided by the divisor;
+        # the new remainder is kept.
+        u = big.to_limbs(big.from_limbs(self.remainderLimbs, self.remainderBytes) + bytearray(block))
+        quotient, remainder = intarithmetic.divideLimbs(u, self.divisor)
+        self.remainderLimbs = remainder
+        self.length += len(block)
+        return quotient
+
+    def divide(self, source, block_bytes=BLOCK_BYTES):
+        # Generator of quotient chunks for the rest of the dividend.
+        for block in read_blocks(source, block_bytes):
+            yield self.update(block)
+
+    def consume(self, source, block_bytes=BLOCK_BYTES):
+        # Feeds the rest of the dividend without building the quotient.
+        for block in read_blocks(source, block_bytes):
+            self.step(block)
+        return self
+
+    def remainder(self):
+        # The remainder of the dividend read so far.
+        return big.fit_result(big.from_magnitude(self.remainderLimbs, self.nbytes, False))
+
+
+def read_blocks(source, block_bytes=BLOCK_BYTES):
+    # Blocks of at most block_bytes bytes from a file object, a bytes-like
+    # object (including an mmap, which is sliced rather than read so its
+    # file position is left alone) or an iterable of bytes-like chunks.
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        for start in range(0, len(source), block_bytes):
+            yield source[start:start + block_bytes]
+    elif hasattr(source, 'read'):
+        while True:
+            block = source.read(block_bytes)
+            if not block:
+                break
+            yield block
+    else:
+        for chunk in source:
+            if len(chunk) <= block_bytes:
+                yield chunk
+            else:
+                for start in range(0, len(chunk), block_bytes):
+                    yield chunk[start:start + block_bytes]
+
+
+def stream_divide(source, divisor, block_bytes=BLOCK_BYTES):
+    # Generator of the quotient's chunks; use a StreamDivider to get the
+    # remainder as well.
+    return StreamDivider(divisor).divide(source, block_bytes)
+
+
+def stream_modulo(source, divisor, block_bytes=BLOCK_BYTES):
+    return StreamDivider(divisor).consume(source, block_bytes).remainder()
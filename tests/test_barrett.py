@@ -0,0 +1,73 @@
+# Tests for barrett.py.
+
+import random
+import unittest
+
+import barrett
+import big
+import intarithmetic
+
+
+class TestBarrettContext(unittest.TestCase):
+    def array(self, x):
+        return big.int2bytearray(x, (abs(x).bit_length() + 8) // 8)
+
+    def testZeroModulusRejected(self):
+        self.assertRaises(ZeroDivisionError, barrett.BarrettContext, bytearray(4))
+
+    def testReduceMatchesModulo(self):
+        rng = random.Random(11)
+        for bits in (7, 32, 33, 64, 200, 1100):
+            n = rng.getrandbits(bits) | (1 << (bits - 1))
+            for nsign in (1, -1):
+                context = barrett.BarrettContext(self.array(nsign * n))
+                values = [0, 1, -1, n, -n, n * n - 1, n * n, (n * n) << 40]
+                values += [rng.getrandbits(2 * bits) - (1 << (2 * bits - 1)) for i in range(10)]
+                for x in values:
+                    a = self.array(x)
+                    self.assertEqual(context.reduce(a), intarithmetic.modulo(a, self.array(nsign * n)))
+
+    def testReduceMany(self):
+        n = self.array(1000003)
+        context = barrett.BarrettContext(n)
+        values = [self.array(x) for x in (5, -5, 10 ** 12, -(10 ** 12))]
+        self.assertEqual(context.reduce_many(values), [intarithmetic.modulo(a, n) for a in values])
+
+    def testResultWidthModes(self):
+        n = self.array(-1000003)
+        context = barrett.BarrettContext(n)
+        a = big.int2bytearray(10 ** 12, 16)
+        with big.result_width('minimal'):
+            self.assertEqual(context.reduce(a), intarithmetic.modulo(a, n))
+            self.assertEqual(context.reduce(a), big.int2bytearray(10 ** 12 % -1000003))
+        with big.result_width(4):
+            self.assertEqual(context.reduce_many([a]), [big.int2bytearray(10 ** 12 % -1000003, 4)])
+        with big.result_width(2):
+            self.assertRaises(OverflowError, context.reduce, a)
+
+    def testSmallModuli(self):
+        for n in (1, 2, 3, 255, 256):
+            context = barrett.BarrettContext(self.array(n))
+            for x in range(0, 70000, 997):
+                self.assertEqual(big.bytearray2int(context.reduce(self.array(x))), x % n)
+
+    def testMultiplyAndSquare(self):
+        rng = random.Random(12)
+        for bits in (16, 64, 512):
+            n = rng.getrandbits(bits) | (1 << (bits - 1))
+            n &= ~1
+            context = barrett.BarrettContext(self.array(n))
+            limbs = lambda x: big.to_limbs(self.array(x))
+            value = lambda x: big.bytearray2int(big.from_magnitude(x, 1, False))
+            self.assertEqual(value(context.decode(context.one)), 1)
+            for i in range(10):
+                x = rng.randrange(n)
+                y = rng.randrange(n)
+                self.assertEqual(value(context.multiply(context.encode(limbs(x)), limbs(y))), x * y % n)
+                self.assertEqual(value(context.square(limbs(x))), x * x % n)
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
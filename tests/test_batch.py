@@ -0,0 +1,75 @@
+# Tests for batch.py.
+
+import random
+import unittest
+
+import batch
+import big
+import intarithmetic
+
+
+@unittest.skipIf(not batch.have_numpy(), 'NumPy is not installed')
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(256)
+        self.nbytes = 7
+        top = 1 << (8 * self.nbytes - 1)
+        values = [0, 1, -1, 2, -2, top - 1, -top, 255, -256]
+        values += [rng.randrange(-top, top) for i in range(40)]
+        self.x = values + [rng.randrange(-top, top) for i in range(len(values))]
+        self.y = [rng.randrange(-top, top) for i in range(len(values))] + values
+        self.a = [big.int2bytearray(v, self.nbytes) for v in self.x]
+        self.b = [big.int2bytearray(v, self.nbytes) for v in self.y]
+        self.ma = batch.from_bytearrays(self.a)
+        self.mb = batch.from_bytearrays(self.b)
+
+    def values(self, matrix):
+        return [big.bytearray2int(row) for row in batch.to_bytearrays(matrix)]
+
+    def testRoundTrip(self):
+        self.assertEqual(batch.to_bytearrays(self.ma), self.a)
+        limbs, kind, nbytes = batch.unpack(self.ma)
+        self.assertEqual(batch.to_bytearrays(batch.pack(limbs, kind, nbytes)), self.a)
+
+    def testAddSubtractNegate(self):
+        self.assertEqual(self.values(batch.add(self.ma, self.mb)),
+                         [big.bytearray2int(big.add(p, q)) for p, q in zip(self.a, self.b)])
+        self.assertEqual(self.values(batch.subtract(self.ma, self.mb)), [p - q for p, q in zip(self.x, self.y)])
+        self.assertEqual(self.values(batch.negate(self.ma)), [-p for p in self.x])
+
+    def testCompare(self):
+        self.assertEqual(list(batch.greater_than(self.ma, self.mb)),
+                         [big.greater_than(p, q) for p, q in zip(self.a, self.b)])
+        self.assertEqual(list(batch.equal(self.ma, self.ma)), [True] * len(self.a))
+        self.assertEqual(list(batch.less_than(self.ma, self.mb)),
+                         [big.less_than(p, q) for p, q in zip(self.a, self.b)])
+
+    def testShifts(self):
+        for shift in (1, 7, 8, 33, 70):
+            self.assertEqual(self.values(batch.shift_left(self.ma, shift)), [p << shift for p in self.x])
+            self.assertEqual(self.values(batch.shift_right(self.ma, shift)), [p >> shift for p in self.x])
+        self.assertEqual(self.values(batch.shift_right(self.ma, 1)), [big.bytearray2int(big.half(p)) for p in self.a])
+
+    def testMultiply(self):
+        self.assertEqual(self.values(batch.multiply(self.ma, self.mb)),
+                         [big.bytearray2int(big.multiply(p, q)) for p, q in zip(self.a, self.b)])
+
+    def testDivmod(self):
+        b = [q if big.bytearray2int(q) else big.int2bytearray(3, self.nbytes) for q in self.b]
+        quotient, remainder = batch.divmod_(self.ma, batch.from_bytearrays(b))
+        expected = [intarithmetic.divideWithRemainder(p, q) for p, q in zip(self.a, b)]
+        self.assertEqual(self.values(quotient), [big.bytearray2int(q) for q, r in expected])
+        self.assertEqual(self.values(remainder), [big.bytearray2int(r) for q, r in expected])
+        self.assertRaises(ZeroDivisionError, batch.divmod_, self.ma, self.mb * 0)
+
+    def testWordMatrices(self):
+        words = batch.from_bytearrays([big.int2bytearray(v, 8) for v in self.x]).view('>u4').astype(batch.numpy.uint32)
+        result = batch.add(words, words)
+        self.assertEqual(result.dtype, batch.numpy.uint32)
+        self.assertEqual(self.values(result), [2 * p for p in self.x])
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
@@ -0,0 +1,52 @@
+# Tests for benchmark.py.
+
+import json
+import random
+import unittest
+
+import benchmark
+import big
+import cache
+import intarithmetic
+
+
+class TestBenchmark(unittest.TestCase):
+    def testCasesCoverSigns(self):
+        names = [name for name, function, arguments in benchmark.cases(['add', 'negate', 'moduloExp'], [1, 4], 2)]
+        self.assertEqual(len(names), 2 * 4 + 2 * 2 + 1 * 4)
+        self.assertTrue('add/4/-+' in names)
+        self.assertTrue('negate/1/-' in names)
+        self.assertFalse('moduloExp/4/++' in names)
+
+    def testOperandsUseWholeWidth(self):
+        rng = random.Random(0)
+        for nbytes in (1, 2, 16):
+            self.assertTrue(big.bytearray2int(benchmark.operand(rng, nbytes, '+')) > 0)
+            self.assertTrue(big.bytearray2int(benchmark.operand(rng, nbytes, '-')) < 0)
+            self.assertEqual(len(benchmark.operand(rng, nbytes, '-')), nbytes)
+
+    def testCasesTimeEnabledModes(self):
+        divide = intarithmetic.divide
+        with cache.caching():
+            functions = dict((name, function) for name, function, arguments in benchmark.cases(['divide'], [8], 0))
+            self.assertTrue(functions['divide/8/++'] is intarithmetic.divide)
+            self.assertFalse(functions['divide/8/++'] is divide)
+
+    def testCompareFlagsRegressions(self):
+        baseline = {'results': {'a': {'ops_per_sec': 100.0}, 'b': {'ops_per_sec': 100.0}}}
+        current = {'results': {'a': {'ops_per_sec': 95.0}, 'b': {'ops_per_sec': 80.0},
+                               'c': {'ops_per_sec': 1.0}}}
+        rows, regressions = benchmark.compare(current, baseline, 0.10)
+        self.assertEqual([row[0] for row in rows], ['a', 'b'])
+        self.assertEqual(regressions, ['b'])
+
+    def testRunProducesJson(self):
+        result = benchmark.run(['add'], [1], 0, 0.001)
+        self.assertEqual(sorted(result['results']), ['add/1/++', 'add/1/+-', 'add/1/-+', 'add/1/--'])
+        json.dumps(result)
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
@@ -0,0 +1,675 @@
+# Tests for big.py.
+
+import random
+import unittest
+
+import big
+
+
+class TestIntToBytearray(unittest.TestCase):
+    def test0(self):
+        nbytes = 4
+        b = big.int2bytearray(0, nbytes)
+        for i in range(len(b)):
+            self.assertEqual(b[i], 0)
+
+    def test5(self):
+        nbytes = 4
+        b = big.int2bytearray(5, nbytes)
+        self.assertEqual(b[nbytes - 1], 5)
+
+    def test256(self):
+        nbytes = 4
+        b = big.int2bytearray(256, nbytes)
+        self.assertEqual(b[nbytes - 1], 0)
+        self.assertEqual(b[nbytes - 2], 1)
+
+    def testAutosize5(self):
+        b = big.int2bytearray(5)
+        self.assertEqual(len(b), 1)
+        self.assertEqual(big.bytearray2int(b), 5)
+
+    def testAutosize729(self):
+        b = big.int2bytearray(729)
+        self.assertEqual(len(b), 2)
+        self.assertEqual(big.bytearray2int(b), 729)
+
+
+    def testAutosizeBoundaries(self):
+        for val, nbytes in ((0, 1), (127, 1), (128, 2), (-128, 1), (-129, 2), (2 ** 63, 9)):
+            b = big.int2bytearray(val)
+            self.assertEqual(len(b), nbytes)
+            self.assertEqual(big.bytearray2int(b), val)
+
+    def testWrapsToWidth(self):
+        self.assertEqual(big.int2bytearray(0x1ff, 1), bytearray([0xff]))
+        self.assertEqual(big.int2bytearray(-1, 3), bytearray([0xff, 0xff, 0xff]))
+
+    def testLargeValue(self):
+        val = -(7 ** 5000)
+        self.assertEqual(big.bytearray2int(big.int2bytearray(val)), val)
+
+
+##############################################
+class TestBytearrayToInt(unittest.TestCase):
+    def test0(self):
+        nbytes = 4
+        array = bytearray(nbytes)
+        val = big.bytearray2int(array)
+        self.assertEqual(val, 0)
+
+    def test5(self):
+        nbytes = 4
+        array = bytearray(nbytes)
+        array[nbytes - 1] = 5;
+        val = big.bytearray2int(array)
+        self.assertEqual(val, 5)
+
+    def test256(self):
+        nbytes = 4
+        array = bytearray(nbytes)
+        array[nbytes - 2] = 1;
+        val = big.bytearray2int(array)
+        self.assertEqual(val, 256)
+
+
+    def testMemoryview(self):
+        array = big.int2bytearray(-50000, 8)
+        self.assertEqual(big.bytearray2int(memoryview(array)[4:]), -50000)
+
+
+##############################################
+class TestBulkConversion(unittest.TestCase):
+    def testRoundTrip(self):
+        values = [0, 1, -1, 127, -128, 2 ** 40, -(2 ** 47)]
+        for nbytes in (6, 8, 13):
+            buffer = big.ints2bytearray(values, nbytes)
+            self.assertEqual(len(buffer), nbytes * len(values))
+            self.assertEqual(big.bytearray2ints(buffer, nbytes), values)
+            self.assertEqual(big.bytearray2ints(memoryview(buffer)[nbytes:], nbytes), values[1:])
+
+    def testMatchesSingleConversion(self):
+        values = [5, -729, 2 ** 31 - 1, -(2 ** 31)]
+        for nbytes in (4, 5):
+            buffer = big.ints2bytearray(values, nbytes)
+            self.assertEqual(buffer, bytearray().join([big.int2bytearray(v, nbytes) for v in values]))
+
+    def testWraps(self):
+        self.assertEqual(big.bytearray2ints(big.ints2bytearray([255, 256], 1), 1), [-1, 0])
+
+
+##############################################
+class TestNegation(unittest.TestCase):
+    def test0(self):
+        array = bytearray(4)
+        big.negate_in_place(array)
+        self.assertEqual(big.bytearray2int(array), 0)
+
+    def testNeg5(self):
+        nbytes = 4
+        array = big.int2bytearray(5, nbytes)
+        big.negate_in_place(array)
+        self.assertEqual(big.bytearray2int(array), -5)
+
+    def testNeg50000(self):
+        nbytes = 4
+        array = big.int2bytearray(50000, nbytes)
+        big.negate_in_place(array)
+        self.assertEqual(big.bytearray2int(array), -50000)
+
+    def testCreateNegativeArray(self):
+        nbytes = 4
+        array = big.int2bytearray(-50000, nbytes)
+        self.assertTrue(big.is_negative(array))
+        self.assertEqual(big.bytearray2int(array), -50000)
+
+
+##############################################
+class TestAddition(unittest.TestCase):
+    def test0and0(self):
+        a = bytearray(4)
+        b = bytearray(4)
+        c = big.add(a, b)
+        self.assertEqual(big.bytearray2int(c), 0)
+
+    def test10and5(self):
+        nbytes = 4
+        a = big.int2bytearray(10, nbytes)
+        b = big.int2bytearray(5, nbytes)
+        c = big.add(a, b)
+        self.assertEqual(big.bytearray2int(c), 15)
+
+    def testBigNumbers(self):
+        nbytes = 4
+        x = 50000
+        y = 60729
+        a = big.int2bytearray(x, nbytes)
+        b = big.int2bytearray(y, nbytes)
+        c = big.add(a, b)
+        self.assertEqual(big.bytearray2int(c), x + y)
+
+    def testAddNegative(self):
+        nbytes = 4
+        x = 50000
+        y = -60729
+        a = big.int2bytearray(x, nbytes)
+        b = big.int2bytearray(y, nbytes)
+        c = big.add(a, b)
+        self.assertEqual(big.bytearray2int(c), x + y)
+
+    def testPositiveOverflow(self):
+        nbytes = 4
+        a = bytearray(nbytes)
+        b = bytearray(nbytes)
+        a[0] = 0x7f
+        b[0] = 0x7f
+        for i in range(1, len(a)):
+            a[i] = 0xff
+            b[i] = 0xff
+        c = big.add(a, b)
+        self.assertFalse(big.is_negative(c))
+        self.assertEqual(len(c), len(a) + 1)
+
+    def testSignExtension(self):
+        nbytes = 4
+        a = big.int2bytearray(-5, nbytes)
+        b = big.sign_extend(a)
+        self.assertEqual(big.bytearray2int(a), big.bytearray2int(b))
+        self.assertEqual(len(b), len(a) + 1)
+
+    def testNegativeOverflow(self):
+        nbytes = 2
+        val = -32768
+        a = big.int2bytearray(val, nbytes)
+        b = big.int2bytearray(val, nbytes)
+
+        self.assertTrue(big.is_negative(a))
+        self.assertTrue(big.is_negative(b))
+
+        c = big.add(a, b)
+        self.assertTrue(big.is_negative(c))
+        self.assertEqual(len(c), len(a) + 1)
+
+    def testAddDifferentSizes(self):
+        val = 32767
+        a = big.int2bytearray(val, 2)
+        b = big.int2bytearray(2 * val, 4)
+        c = big.add(a, b)
+        self.assertEqual(len(c), len(b))
+        self.assertEqual(big.bytearray2int(c), 3 * val)
+
+        c = big.add(b, a)
+        self.assertEqual(big.bytearray2int(c), 3 * val)
+
+
+##############################################
+class TestEqual(unittest.TestCase):
+    def test10and5(self):
+        nbytes = 4
+        a = big.int2bytearray(10, nbytes)
+        b = big.int2bytearray(5, nbytes)
+        self.assertFalse(big.equal(a, b))
+        self.assertTrue(big.equal(a, a))
+
+    def testDifferenceSizes(self):
+        a = big.int2bytearray(5, 2)
+        b = big.int2bytearray(5, 8)
+        self.assertTrue(big.equal(a, b))
+
+
+##############################################
+class TestGreaterPositive(unittest.TestCase):
+    def test10and5(self):
+        nbytes = 4
+        a = big.int2bytearray(10, nbytes)
+        b = big.int2bytearray(5, nbytes)
+        self.assertTrue(big.greater_positive(a, b))
+        self.assertFalse(big.greater_positive(b, a))
+        self.assertFalse(big.greater_positive(a, a))
+
+
+##############################################
+class TestGreaterNegative(unittest.TestCase):
+    def testNeg10and5(self):
+        nbytes = 4
+        a = big.int2bytearray(-10, nbytes)
+        b = big.int2bytearray(-5, nbytes)
+        self.assertTrue(big.greater_negative(b, a))
+        self.assertFalse(big.greater_negative(a, b))
+        self.assertFalse(big.greater_negative(b, b))
+
+
+##############################################
+class TestGreaterThan(unittest.TestCase):
+    def testPositives(self):
+        nbytes = 4
+        a = big.int2bytearray(10, nbytes)
+        b = big.int2bytearray(5, nbytes)
+        self.assertTrue(big.greater_than(a, b))
+        self.assertFalse(big.greater_than(b, a))
+        self.assertFalse(big.greater_than(a, a))
+
+    def testNegatives(self):
+        nbytes = 4
+        a = big.int2bytearray(-10, nbytes)
+        b = big.int2bytearray(-5, nbytes)
+        self.assertTrue(big.greater_than(b, a))
+        self.assertFalse(big.greater_than(a, b))
+        self.assertFalse(big.greater_than(b, b))
+
+    def testMixedSigns(self):
+        nbytes = 4
+        a = big.int2bytearray(-10, nbytes)
+        b = big.int2bytearray(5, nbytes)
+        self.assertTrue(big.greater_than(b, a))
+        self.assertFalse(big.greater_than(a, b))
+        self.assertFalse(big.greater_than(b, b))
+
+    def testDifferentSizes(self):
+        a = big.int2bytearray(100)
+        b = big.int2bytearray(48957655)
+        self.assertFalse(big.greater_than(a, b))
+
+
+##############################################
+class TestLessThan(unittest.TestCase):
+    def testPositives(self):
+        nbytes = 4
+        a = big.int2bytearray(10, nbytes)
+        b = big.int2bytearray(5, nbytes)
+        self.assertFalse(big.less_than(a, b))
+        self.assertTrue(big.less_than(b, a))
+        self.assertFalse(big.less_than(a, a))
+
+    def testNegatives(self):
+        nbytes = 4
+        a = big.int2bytearray(-10, nbytes)
+        b = big.int2bytearray(-5, nbytes)
+        self.assertFalse(big.less_than(b, a))
+        self.assertTrue(big.less_than(a, b))
+        self.assertFalse(big.less_than(b, b))
+
+    def testMixedSigns(self):
+        nbytes = 4
+        a = big.int2bytearray(-10, nbytes)
+        b = big.int2bytearray(5, nbytes)
+        self.assertFalse(big.less_than(b, a))
+        self.assertTrue(big.less_than(a, b))
+        self.assertFalse(big.less_than(b, b))
+
+
+##############################################
+class TestIsEven(unittest.TestCase):
+    def test4(self):
+        nbytes = 8
+        a = big.int2bytearray(4, nbytes)
+        self.assertTrue(big.is_even(a))
+
+    def test3(self):
+        nbytes = 8
+        a = big.int2bytearray(3, nbytes)
+        self.assertFalse(big.is_even(a))
+
+
+##############################################
+class TestHalf(unittest.TestCase):
+    def test4(self):
+        nbytes = 1
+        a = big.int2bytearray(4, nbytes)
+        self.assertFalse(big.is_negative(a))
+        b = big.half(a)
+        self.assertEqual(big.bytearray2int(b), 2)
+
+    def test500(self):
+        nbytes = 16
+        a = big.int2bytearray(500, nbytes)
+        b = big.half(a)
+        self.assertEqual(big.bytearray2int(b), 250)
+
+    def test501(self):
+        nbytes = 16
+        a = big.int2bytearray(501, nbytes)
+        b = big.half(a)
+        self.assertEqual(big.bytearray2int(b), 250)
+
+    def testNeg4(self):
+        nbytes = 16
+        a = big.int2bytearray(-4, nbytes)
+        b = big.half(a)
+        self.assertEqual(big.bytearray2int(b), -2)
+
+    def testNeg5(self):
+        nbytes = 16
+        a = big.int2bytearray(-5, nbytes)
+        b = big.half(a)
+        self.assertEqual(big.bytearray2int(b), -3)
+
+
+##############################################
+class TestTwice(unittest.TestCase):
+    def test4(self):
+        nbytes = 1
+        a = big.int2bytearray(4, nbytes)
+        b = big.twice(a)
+        self.assertEqual(big.bytearray2int(b), 8)
+
+    def test250(self):
+        nbytes = 16
+        a = big.int2bytearray(250, nbytes)
+        b = big.twice(a)
+        self.assertEqual(big.bytearray2int(b), 500)
+
+    def testNeg250(self):
+        nbytes = 16
+        a = big.int2bytearray(-250, nbytes)
+        b = big.twice(a)
+        self.assertEqual(big.bytearray2int(b), -500)
+
+    def testOverflow(self):
+        nbytes = 2
+        val = 32767
+        a = big.int2bytearray(val, nbytes)
+        b = big.twice(a)
+        self.assertEqual(len(b), 3)
+        self.assertEqual(big.bytearray2int(b), 2 * val)
+
+
+##############################################
+class TestMultiply(unittest.TestCase):
+    def testZero(self):
+        nbytes = 4
+        x = big.int2bytearray(729, nbytes)
+        y = big.int2bytearray(0, nbytes)
+        z = big.multiply(x, y)
+        self.assertEqual(big.bytearray2int(z), 0)
+
+    def testBigNumbers(self):
+        nbytes = 4
+        x = big.int2bytearray(729, nbytes)
+        y = big.int2bytearray(927, nbytes)
+        z = big.multiply(x, y)
+        self.assertEqual(big.bytearray2int(z), 729 * 927)
+
+    def testBigNegativeNumbers(self):
+        nbytes = 4
+        x = big.int2bytearray(-729, nbytes)
+        y = big.int2bytearray(-927, nbytes)
+        z = big.multiply(x, y)
+        self.assertEqual(big.bytearray2int(z), -729 * -927)
+
+    def testBigMixedNumbers1(self):
+        nbytes = 4
+        x = big.int2bytearray(-729, nbytes)
+        y = big.int2bytearray(927, nbytes)
+        z = big.multiply(x, y)
+        self.assertEqual(big.bytearray2int(z), -729 * 927)
+
+    def testBigMixedNumbers2(self):
+        nbytes = 4
+        x = big.int2bytearray(729, nbytes)
+        y = big.int2bytearray(-927, nbytes)
+        z = big.multiply(x, y)
+        self.assertEqual(big.bytearray2int(z), -729 * 927)
+
+    def testInfinitePrecision(self):
+        nbytes = 2
+        val = 32767
+        x = big.int2bytearray(val, nbytes)
+        y = big.int2bytearray(val, nbytes)
+        z = big.multiply(x, y)
+        self.assertEqual(big.bytearray2int(z), val * val)
+        self.assertEqual(len(z), 4)
+
+    def testDifferentSizes(self):
+        a = 729
+        b = 123456789
+        x = big.int2bytearray(a)
+        y = big.int2bytearray(b)
+        c = big.multiply(x, y)
+        self.assertEqual(big.bytearray2int(c), a * b)
+
+        c = big.multiply(y, x)
+        self.assertEqual(big.bytearray2int(c), b * a)
+
+
+##############################################
+class TestMultiplyKernels(unittest.TestCase):
+    def tearDown(self):
+        big.KARATSUBA_THRESHOLD = 32
+
+    def testMostNegative(self):
+        z = big.multiply(big.int2bytearray(-128, 1), big.int2bytearray(-1, 1))
+        self.assertEqual(big.bytearray2int(z), 128)
+        self.assertEqual(len(z), 2)
+
+    def testWidthIsMinimalButAtLeastOperandWidth(self):
+        z = big.multiply(big.int2bytearray(3, 8), big.int2bytearray(-5, 2))
+        self.assertEqual(len(z), 8)
+        z = big.multiply(big.int2bytearray(-64, 1), big.int2bytearray(2, 1))
+        self.assertEqual(big.bytearray2int(z), -128)
+        self.assertEqual(len(z), 1)
+
+    def testKaratsubaMatchesSchoolbook(self):
+        rng = random.Random(2048)
+        for nbytes_a, nbytes_b in ((256, 256), (512, 300), (600, 100), (257, 255)):
+            x = rng.getrandbits(8 * nbytes_a - 1) - (1 << (8 * nbytes_a - 2))
+            y = rng.getrandbits(8 * nbytes_b - 1) - (1 << (8 * nbytes_b - 2))
+            a = big.int2bytearray(x, nbytes_a)
+            b = big.int2bytearray(y, nbytes_b)
+            for big.KARATSUBA_THRESHOLD in (2, 8, 32, 10 ** 6):
+                self.assertEqual(big.bytearray2int(big.multiply(a, b)), x * y)
+
+
+##############################################
+class TestLimbKernels(unittest.TestCase):
+    def testCompare(self):
+        self.assertEqual(big.compare_limbs([1, 2], [1, 2, 0]), 0)
+        self.assertEqual(big.compare_limbs([5, 1], [7]), 1)
+        self.assertEqual(big.compare_limbs([5, 1], [6, 1]), -1)
+
+    def testSquareMatchesMultiply(self):
+        rng = random.Random(7)
+        for n in (1, 2, 5, 31, 32, 70):
+            a = [rng.getrandbits(8 * big.LIMB_BYTES) for i in range(n)]
+            self.assertEqual(big.strip_limbs(big.square_limbs(a)), big.strip_limbs(big.multiply_limbs(a, a)))
+
+
+##############################################
+class TestInPlace(unittest.TestCase):
+    def setUp(self):
+        self.saved = big.LIMB_BYTES
+
+    def tearDown(self):
+        big.LIMB_BYTES = self.saved
+
+    def wrap(self, value, nbytes):
+        value %= 2 ** (8 * nbytes)
+        return value - 2 ** (8 * nbytes) if value >= 2 ** (8 * nbytes - 1) else value
+
+    def check(self, out, value, overflow):
+        nbytes = len(out)
+        self.assertEqual(big.bytearray2int(bytearray(out.tobytes())), self.wrap(value, nbytes))
+        self.assertEqual(overflow, self.wrap(value, nbytes) != value)
+
+    def testRandomizedAgainstPython(self):
+        rng = random.Random(77)
+        for big.LIMB_BYTES in (1, 2, 4, 8):
+            for i in range(300):
+                na, nb, nout = rng.randint(1, 9), rng.randint(1, 9), rng.randint(1, 9)
+                x = rng.randint(-2 ** (8 * na - 1), 2 ** (8 * na - 1) - 1)
+                y = rng.randint(-2 ** (8 * nb - 1), 2 ** (8 * nb - 1) - 1)
+                a = big.int2bytearray(x, na)
+                b = big.int2bytearray(y, nb)
+                buffer = bytearray(nout + 2)
+                out = memoryview(buffer)[1:nout + 1]
+                shift = rng.randint(0, 40)
+                self.check(out, x + y, big.add_into(out, a, b))
+                self.check(out, -x, big.negate_into(out, a))
+                self.check(out, x, big.sign_extend_into(out, a))
+                self.check(out, x << shift, big.shift_into(out, a, shift))
+                self.check(out, x >> shift, big.shift_into(out, a, -shift))
+                self.check(out, x * y, big.multiply_into(out, a, b))
+                self.assertEqual((buffer[0], buffer[-1]), (0, 0))
+
+    def testBytearrayOutAndAliasing(self):
+        a = big.int2bytearray(-5, 4)
+        self.assertFalse(big.half_into(a, a))
+        self.assertEqual(big.bytearray2int(a), -3)
+        self.assertFalse(big.twice_into(a, a))
+        self.assertEqual(big.bytearray2int(a), -6)
+        self.assertTrue(big.add_into(a, big.int2bytearray(2 ** 31 - 1, 4), big.int2bytearray(1, 4)))
+
+    def testScratchPoolReusesZeroedBuffers(self):
+        pool = big.ScratchPool()
+        buffer = pool.take(5)
+        buffer[2] = 7
+        pool.give(buffer)
+        again = pool.take(5)
+        self.assertTrue(again is buffer)
+        self.assertEqual(again, [0] * 5)
+        self.assertEqual(len(pool.take(5)), 5)
+
+    def testMakeSameSizeDoesNotCopyEqualWidths(self):
+        a = big.int2bytearray(5, 4)
+        b = big.int2bytearray(-5, 4)
+        a_pad, b_pad = big.make_same_size(a, b)
+        self.assertTrue(a_pad is a and b_pad is b)
+
+
+##############################################
+class TestNormalize(unittest.TestCase):
+    def tearDown(self):
+        big.RESULT_WIDTH = None
+
+    def testTrim(self):
+        for x, nbytes in ((0, 1), (127, 1), (128, 2), (-128, 1), (-129, 2), (2 ** 40, 6)):
+            for width in (nbytes, nbytes + 1, 12):
+                self.assertEqual(big.trim(big.int2bytearray(x, width)), big.int2bytearray(x))
+
+    def testNormalizeToWidth(self):
+        self.assertEqual(big.normalize(big.int2bytearray(-5, 8), 2), big.int2bytearray(-5, 2))
+        self.assertEqual(big.normalize(big.int2bytearray(-5, 1), 4), big.int2bytearray(-5, 4))
+        self.assertRaises(OverflowError, big.normalize, big.int2bytearray(200, 4), 1)
+
+    def testMinimalMode(self):
+        big.RESULT_WIDTH = 'minimal'
+        a = big.int2bytearray(3, 16)
+        self.assertEqual(big.add(a, a), big.int2bytearray(6, 1))
+        self.assertEqual(big.multiply(a, big.int2bytearray(-100, 16)), big.int2bytearray(-300, 2))
+        x = big.int2bytearray(1, 1)
+        for i in range(100):
+            x = big.twice(x)
+        for i in range(99):
+            x = big.half(x)
+        self.assertEqual(x, big.int2bytearray(2, 1))
+
+    def testFixedMode(self):
+        with big.result_width(2):
+            self.assertEqual(big.add(big.int2bytearray(5, 1), big.int2bytearray(7, 8)), big.int2bytearray(12, 2))
+            self.assertRaises(OverflowError, big.add, big.int2bytearray(32767, 2), big.int2bytearray(1, 2))
+            self.assertRaises(OverflowError, big.shift_left, big.int2bytearray(1, 2), 15)
+        self.assertEqual(big.RESULT_WIDTH, None)
+        self.assertEqual(len(big.add(big.int2bytearray(32767, 2), big.int2bytearray(1, 2))), 3)
+
+
+##############################################
+class TestShifts(unittest.TestCase):
+    def testRandomizedAgainstPython(self):
+        rng = random.Random(16)
+        for i in range(500):
+            nbytes = rng.randint(1, 20)
+            x = rng.randint(-2 ** (8 * nbytes - 1), 2 ** (8 * nbytes - 1) - 1)
+            a = big.int2bytearray(x, nbytes)
+            shift = rng.randint(0, 100)
+            unsigned = x % 2 ** (8 * nbytes)
+            self.assertEqual(big.bytearray2int(big.shift_left(a, shift)), x << shift)
+            self.assertEqual(len(big.shift_left(a, shift)), max(nbytes, len(big.int2bytearray(x << shift))))
+            self.assertEqual(big.shift_right(a, shift), big.int2bytearray(x >> shift, nbytes))
+            self.assertEqual(big.shift_left_logical(a, shift), big.int2bytearray(unsigned << shift, nbytes))
+            self.assertEqual(big.shift_right_logical(a, shift), big.int2bytearray(unsigned >> shift, nbytes))
+            self.assertEqual(big.bit_length(a), x.bit_length())
+            self.assertEqual(big.signed_bit_length(a), (x if x >= 0 else ~x).bit_length())
+            self.assertEqual(big.test_bit(a, shift), (x >> shift) & 1)
+            if x:
+                self.assertEqual(big.count_trailing_zeros(a), (x & -x).bit_length() - 1)
+
+    def testMatchesHalfAndTwice(self):
+        for x in (0, 1, -1, 5, -5, 127, -127, -128):
+            a = big.int2bytearray(x, 1)
+            self.assertEqual(big.shift_left(a, 1), big.twice(a))
+            self.assertEqual(big.shift_right(a, 1), big.half(a))
+
+    def testEdgeCases(self):
+        self.assertEqual(big.count_trailing_zeros(bytearray(3)), 24)
+        self.assertEqual(big.bit_length(big.int2bytearray(-128, 1)), 8)
+        self.assertRaises(ValueError, big.shift_left, bytearray(1), -1)
+
+    def testLimbShifts(self):
+        saved = big.LIMB_BYTES
+        rng = random.Random(17)
+        try:
+            for big.LIMB_BYTES in (1, 2, 4, 8):
+                for i in range(50):
+                    x = rng.getrandbits(rng.randint(1, 300))
+                    limbs = big.to_limbs(big.int2bytearray(x, x.bit_length() // 8 + 1))
+                    shift = rng.randint(0, 150)
+                    value = lambda limbs: big.bytearray2int(big.from_magnitude(limbs, 1, False))
+                    self.assertEqual(value(big.shift_limbs_left(limbs, shift)), x << shift)
+                    self.assertEqual(value(big.shift_limbs_right(limbs, shift)), x >> shift)
+                    self.assertEqual(big.limb_bits(limbs, shift, 13), (x >> shift) & 0x1fff)
+                    if x:
+                        self.assertEqual(big.limbs_trailing_zeros(limbs), (x & -x).bit_length() - 1)
+        finally:
+            big.LIMB_BYTES = saved
+
+
+##############################################
+class TestLimbs(unittest.TestCase):
+    def setUp(self):
+        self.saved = big.LIMB_BYTES
+
+    def tearDown(self):
+        big.LIMB_BYTES = self.saved
+
+    def testRoundTrip(self):
+        array = big.int2bytearray(0x0102030405, 5)
+        for big.LIMB_BYTES in (1, 2, 4, 8):
+            self.assertEqual(big.from_limbs(big.to_limbs(array), 5), array)
+            self.assertEqual(big.from_limb_array(big.to_limb_array(array), 5), array)
+            self.assertEqual(list(big.to_limb_array(array)), big.to_limbs(array))
+
+    def testLittleEndian(self):
+        big.LIMB_BYTES = 4
+        self.assertEqual(big.to_limbs(big.int2bytearray(0x0102030405, 5)), [0x02030405, 0x01])
+        big.LIMB_BYTES = 1
+        self.assertEqual(big.to_limbs(big.int2bytearray(0x0102, 2)), [0x02, 0x01])
+
+    def testFromLimbsPads(self):
+        self.assertEqual(big.from_limbs([5], 6), big.int2bytearray(5, 6))
+
+    def testFromMagnitudeWidth(self):
+        self.assertEqual(len(big.from_magnitude([128], 1, True)), 1)
+        self.assertEqual(len(big.from_magnitude([128], 1, False)), 2)
+        self.assertEqual(big.bytearray2int(big.from_magnitude([0, 1], 2, True)), -2 ** (8 * big.LIMB_BYTES))
+
+    def testBytearrayKernelsAllLimbSizes(self):
+        rng = random.Random(15)
+        for big.LIMB_BYTES in (1, 2, 4, 8):
+            for i in range(200):
+                na, nb = rng.randint(1, 20), rng.randint(1, 20)
+                x = rng.randint(-2 ** (8 * na - 1), 2 ** (8 * na - 1) - 1)
+                y = rng.randint(-2 ** (8 * nb - 1), 2 ** (8 * nb - 1) - 1)
+                a = big.int2bytearray(x, na)
+                b = big.int2bytearray(y, nb)
+                self.assertEqual(big.bytearray2int(big.add(a, b)), x + y)
+                self.assertEqual(big.bytearray2int(big.negate(a)), -x if x != -2 ** (8 * na - 1) else x)
+                self.assertEqual(big.bytearray2int(big.half(a)), x >> 1)
+                self.assertEqual(big.bytearray2int(big.twice(a)), 2 * x)
+                self.assertEqual(big.equal(a, b), x == y)
+                self.assertEqual(big.greater_than(a, b), x > y)
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
@@ -0,0 +1,90 @@
+# Tests for bigint.py.
+
+import random
+import sys
+import unittest
+
+import big
+import bigint
+
+
+class TestBigInt(unittest.TestCase):
+    def testBytearrayRoundTrip(self):
+        for value, nbytes in ((0, 4), (5, 1), (-5, 8), (-128, 1), (127, 1), (2 ** 100, 16), (-2 ** 127, 16)):
+            array = big.int2bytearray(value, nbytes)
+            number = bigint.BigInt.from_bytearray(array)
+            self.assertEqual(number.to_bytearray(), array)
+            self.assertEqual(int(number), value)
+
+    def testBitLength(self):
+        for value in (0, 1, 255, 256, -256, 2 ** 70):
+            self.assertEqual(bigint.BigInt.from_int(value, 16).bit_length(), abs(value).bit_length())
+
+    def testSlots(self):
+        number = bigint.BigInt.from_int(5, 4)
+        self.assertRaises(AttributeError, setattr, number, 'other', 1)
+
+    def testOperatorsMatchPython(self):
+        rng = random.Random(5)
+        values = [0, 1, -1, 7, -7, 2 ** 64, -(2 ** 64) + 3]
+        values += [rng.getrandbits(200) - (1 << 199) for i in range(8)]
+        for x in values:
+            for y in values:
+                a = bigint.BigInt.from_int(x, 32)
+                b = bigint.BigInt.from_int(y, 32)
+                self.assertEqual(int(a + b), x + y)
+                self.assertEqual(int(a - b), x - y)
+                self.assertEqual(int(a * b), x * y)
+                self.assertEqual(a < b, x < y)
+                self.assertEqual(a <= b, x <= y)
+                self.assertEqual(a == b, x == y)
+                self.assertEqual(a != b, x != y)
+                if y:
+                    self.assertEqual(int(a // b), x // y)
+                    self.assertEqual(int(a % b), x % y)
+                    self.assertEqual(tuple(int(v) for v in divmod(a, b)), divmod(x, y))
+
+    def testMixedWithInts(self):
+        a = bigint.BigInt.from_int(100, 4)
+        self.assertEqual(int(a + 5), 105)
+        self.assertEqual(int(5 - a), -95)
+        self.assertEqual(int(3 * a), 300)
+        self.assertEqual(int(1000 // a), 10)
+        self.assertTrue(a == 100)
+
+    def testPower(self):
+        self.assertEqual(int(bigint.BigInt.from_int(-3, 4) ** 5), -243)
+        self.assertEqual(int(bigint.BigInt.from_int(-3, 4) ** 4), 81)
+        self.assertEqual(int(bigint.BigInt.from_int(7, 4) ** 0), 1)
+        self.assertEqual(int(pow(bigint.BigInt.from_int(12, 8), 17, 7)), pow(12, 17, 7))
+        self.assertEqual(int(pow(bigint.BigInt.from_int(5, 8), 756, 25)), pow(5, 756, 25))
+
+    def testResultWidth(self):
+        a = bigint.BigInt.from_int(3, 8)
+        b = bigint.BigInt.from_int(-5, 2)
+        self.assertEqual(len((a * b).to_bytearray()), 8)
+        self.assertEqual((a * b).to_bytearray(), big.multiply(a.to_bytearray(), b.to_bytearray()))
+
+    def testOtherTypes(self):
+        a = bigint.BigInt.from_int(100, 4)
+        self.assertFalse(a == 'x')
+        self.assertTrue(a != 1.5)
+        self.assertRaises(TypeError, lambda: a + 'x')
+        self.assertRaises(TypeError, lambda: a * 1.5)
+        self.assertRaises(TypeError, lambda: 'x' - a)
+        self.assertRaises(TypeError, lambda: 1.5 // a)
+        self.assertRaises(TypeError, divmod, a, 1.5)
+        self.assertRaises(TypeError, pow, a, 2.0)
+        self.assertRaises(TypeError, a.compare, 'x')
+        if sys.version_info[0] >= 3:
+            self.assertRaises(TypeError, lambda: a < 1.5)
+            self.assertRaises(TypeError, lambda: a >= 'x')
+
+    def testDivideByZero(self):
+        self.assertRaises(ZeroDivisionError, divmod, bigint.BigInt.from_int(5, 4), bigint.BigInt.from_int(0, 4))
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
@@ -0,0 +1,110 @@
+# Tests for cache.py.
+
+import unittest
+
+import big
+import cache
+import intarithmetic
+
+
+class TestLRUCache(unittest.TestCase):
+    def testEvictsLeastRecentlyUsed(self):
+        lru = cache.LRUCache(maxsize=2)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        self.assertEqual(lru.get('a'), 1)
+        lru.put('c', 3)
+        self.assertFalse('b' in lru)
+        self.assertTrue('a' in lru)
+        self.assertEqual(lru.get('b'), None)
+        self.assertEqual(lru.stats(), {'hits': 1, 'misses': 1, 'evictions': 1, 'entries': 2, 'bytes': 0})
+
+    def testByteBudget(self):
+        lru = cache.LRUCache(maxsize=100, maxbytes=10)
+        lru.put('a', 'x', 4)
+        lru.put('b', 'y', 4)
+        lru.put('c', 'z', 4)
+        self.assertEqual(len(lru), 2)
+        self.assertEqual(lru.nbytes, 8)
+        lru.put('c', 'w', 1)
+        self.assertEqual(lru.nbytes, 5)
+        lru.put('d', 'v', 20)
+        self.assertEqual(len(lru), 0)
+        self.assertEqual(lru.nbytes, 0)
+
+
+class TestCaching(unittest.TestCase):
+    def tearDown(self):
+        cache.disable()
+
+    def testResultsMatchAndHit(self):
+        a = big.int2bytearray(-12345, 4)
+        b = big.int2bytearray(77, 2)
+        n = big.int2bytearray(1000, 2)
+        expected = (intarithmetic.moduloExp(a, b, n), intarithmetic.divide(a, b), intarithmetic.modulo(a, b))
+        with cache.caching(maxsize=16) as caches:
+            for i in range(3):
+                self.assertEqual((intarithmetic.moduloExp(a, b, n), intarithmetic.divide(a, b),
+                                  intarithmetic.modulo(a, b)), expected)
+            self.assertEqual(caches.results.get(('divide', None, big.LIMB_BYTES, bytes(a), bytes(b))), bytes(expected[1]))
+            self.assertTrue(caches.results.hits >= 6)
+        self.assertFalse(cache.enabled())
+        self.assertEqual(intarithmetic.divide.__name__, 'divide')
+        self.assertFalse(hasattr(intarithmetic.divide, '__wrapped__'))
+
+    def testResultsAreCopies(self):
+        cache.enable()
+        a = big.int2bytearray(100, 2)
+        b = big.int2bytearray(7, 2)
+        first = intarithmetic.divide(a, b)
+        first[0] = 0xff
+        self.assertEqual(intarithmetic.divide(a, b), big.int2bytearray(14, 2))
+
+    def testWidthIsPartOfKey(self):
+        cache.enable()
+        self.assertEqual(len(intarithmetic.divide(big.int2bytearray(9, 1), big.int2bytearray(2, 1))), 1)
+        self.assertEqual(len(intarithmetic.divide(big.int2bytearray(9, 4), big.int2bytearray(2, 1))), 4)
+
+    def testContextsBuiltOnce(self):
+        cache.enable()
+        n = big.int2bytearray(1000003, 4)
+        for i in range(5):
+            intarithmetic.moduloExp(big.int2bytearray(i + 2, 4), big.int2bytearray(65537, 4), n)
+        self.assertEqual(cache.contexts.misses, 1)
+        self.assertEqual(cache.contexts.hits, 4)
+
+    def testLimbSizeIsPartOfContextKey(self):
+        cache.enable()
+        a = big.int2bytearray(12345, 16)
+        b = big.int2bytearray(65537, 4)
+        n = big.int2bytearray(2 ** 120 + 451, 16)
+        expected = pow(12345, 65537, 2 ** 120 + 451)
+        saved = big.LIMB_BYTES
+        try:
+            for big.LIMB_BYTES in (saved, 2):
+                self.assertEqual(big.bytearray2int(intarithmetic.moduloExp(a, b, n)), expected)
+        finally:
+            big.LIMB_BYTES = saved
+        self.assertEqual(cache.contexts.misses, 2)
+
+    def testResultWidthIsPartOfKey(self):
+        cache.enable()
+        a = big.int2bytearray(1000, 8)
+        b = big.int2bytearray(7, 8)
+        self.assertEqual(len(intarithmetic.divide(a, b)), 8)
+        with big.result_width('minimal'):
+            self.assertEqual(intarithmetic.divide(a, b), big.int2bytearray(142))
+        with big.result_width(1):
+            self.assertRaises(OverflowError, intarithmetic.divide, a, b)
+            self.assertRaises(OverflowError, intarithmetic.divide, a, b)
+
+    def testErrorsAreNotCached(self):
+        cache.enable()
+        self.assertRaises(ZeroDivisionError, intarithmetic.divide, bytearray(1), bytearray(1))
+        self.assertEqual(len(cache.results), 0)
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
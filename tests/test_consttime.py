@@ -0,0 +1,152 @@
+# Tests for consttime.py.
+
+import random
+import unittest
+
+import big
+import consttime
+import intarithmetic
+
+
+class TestPrimitives(unittest.TestCase):
+    def testSelectAndSwap(self):
+        a = [1, 2, 3]
+        b = [4, 5, 6]
+        self.assertEqual(consttime.select(1, a, b), a)
+        self.assertEqual(consttime.select(0, a, b), b)
+        consttime.cswap(0, a, b)
+        self.assertEqual((a, b), ([1, 2, 3], [4, 5, 6]))
+        consttime.cswap(1, a, b)
+        self.assertEqual((a, b), ([4, 5, 6], [1, 2, 3]))
+
+    def testComparisonsMatchBig(self):
+        rng = random.Random(24)
+        values = [0, 1, -1, 127, -128, 255, -256]
+        values += [rng.randint(-2 ** 70, 2 ** 70) for i in range(40)]
+        for x in values:
+            for y in values[:12] + [x]:
+                a = big.int2bytearray(x, 9 + rng.randint(0, 8))
+                b = big.int2bytearray(y, 9 + rng.randint(0, 8))
+                self.assertEqual(consttime.equal(a, b), x == y)
+                self.assertEqual(consttime.greater_than(a, b), x > y)
+                self.assertEqual(consttime.less_than(a, b), x < y)
+                self.assertEqual(consttime.compare(a, b), (x > y) - (x < y))
+
+    def testDividePositive(self):
+        rng = random.Random(7)
+        for i in range(60):
+            x = rng.getrandbits(rng.randint(1, 200))
+            y = rng.getrandbits(rng.randint(1, 120)) or 1
+            a = big.int2bytearray(x, 26)
+            b = big.int2bytearray(y, 16)
+            self.assertEqual(consttime.divide_positive(a, b), intarithmetic.dividePositive(a, b))
+        self.assertRaises(ZeroDivisionError, consttime.divide_positive, bytearray(2), bytearray(1))
+        self.assertRaises(ValueError, consttime.divide_positive, big.int2bytearray(-3, 2), bytearray(b'\x01'))
+
+    def testDivideWithRemainder(self):
+        rng = random.Random(9)
+        values = [0, 1, -1, 7, -7, 127, -128]
+        values += [rng.randint(-2 ** 100, 2 ** 100) for i in range(20)]
+        for x in values:
+            for y in values:
+                if y == 0:
+                    continue
+                a = big.int2bytearray(x, 14)
+                b = big.int2bytearray(y, rng.randint(1, 14) if -128 <= y < 128 else 14)
+                results = consttime.divide_with_remainder(a, b)
+                self.assertEqual([len(r) for r in results], [15, 15])
+                self.assertEqual([big.bytearray2int(r) for r in results], list(divmod(x, y)))
+        results = consttime.divide_with_remainder(big.int2bytearray(-128, 1), big.int2bytearray(-1, 1))
+        self.assertEqual(results, (big.int2bytearray(128, 2), bytearray(2)))
+        with big.result_width(1):
+            results = consttime.divide_with_remainder(big.int2bytearray(-100, 4), big.int2bytearray(7, 4))
+            self.assertEqual(results, (big.int2bytearray(-15, 1), big.int2bytearray(5, 1)))
+            self.assertRaises(OverflowError, consttime.divide_with_remainder, big.int2bytearray(-1000, 4), big.int2bytearray(7, 4))
+        self.assertRaises(ZeroDivisionError, consttime.divide_with_remainder, bytearray(b'\x05'), bytearray(2))
+
+
+class TestModuloExp(unittest.TestCase):
+    def testMatchesModuloExp(self):
+        rng = random.Random(1)
+        for bits in (8, 64, 100, 256, 521):
+            nbytes = bits // 8 + 1
+            for i in range(4):
+                n = rng.getrandbits(bits) | 1
+                x = rng.randint(-2 ** bits, 2 ** bits)
+                y = rng.getrandbits(bits)
+                for modulus in (n, -n):
+                    a = big.int2bytearray(x, nbytes)
+                    b = big.int2bytearray(y, nbytes)
+                    m = big.int2bytearray(modulus, nbytes)
+                    self.assertEqual(consttime.modulo_exp(a, b, m), intarithmetic.moduloExp(a, b, m))
+        self.assertEqual(consttime.modulo_exp(bytearray(b'\x05'), bytearray(1), bytearray(b'\x07')),
+                         bytearray(b'\x01'))
+
+    def testSameWorkForEveryExponent(self):
+        # The ladder does one multiply and one square per exponent bit,
+        # whatever the bits are.
+        n = big.int2bytearray(2 ** 127 - 1, 16)
+        base = big.int2bytearray(3, 16)
+        counts = []
+        for y in (0, 1, 2 ** 127, 2 ** 128 - 1, 0x5555 << 100):
+            context = consttime.ConstantTimeContext(n)
+            encoded = context.encode(big.to_limbs(base))
+            calls = []
+            multiply = context.multiply
+            context.multiply = lambda x, z: calls.append(1) or multiply(x, z)
+            consttime.ladder(context, encoded, big.to_limbs(big.int2bytearray(y, 16)), 128)
+            counts.append(len(calls))
+        self.assertEqual(counts, [256] * 5)
+
+    def testFixedResultWidth(self):
+        # The base 1006 does not fit one byte; only the result has to.
+        with big.result_width(1):
+            self.assertEqual(consttime.modulo_exp(big.int2bytearray(1006, 4), big.int2bytearray(3, 4), big.int2bytearray(1001, 4)),
+                             big.int2bytearray(125, 1))
+
+    def testErrors(self):
+        one = bytearray(b'\x01')
+        self.assertRaises(ValueError, consttime.modulo_exp, one, one, bytearray(b'\x08'))
+        self.assertRaises(ValueError, consttime.modulo_exp, one, bytearray(b'\xff'), bytearray(b'\x07'))
+
+
+class TestConstantTimeMode(unittest.TestCase):
+    def tearDown(self):
+        consttime.disable()
+
+    def testEnableAndDisable(self):
+        original = intarithmetic.moduloExp
+        a = big.int2bytearray(12345, 4)
+        b = big.int2bytearray(65537, 4)
+        n = big.int2bytearray(1000003, 4)
+        expected = intarithmetic.moduloExp(a, b, n)
+        with consttime.constant_time():
+            self.assertTrue(consttime.enabled())
+            self.assertEqual(intarithmetic.moduloExp(a, b, n), expected)
+            self.assertTrue(big.greater_than(n, a))
+            self.assertRaises(ValueError, intarithmetic.moduloExp, a, b, big.int2bytearray(1000, 4))
+        self.assertFalse(consttime.enabled())
+        self.assertTrue(intarithmetic.moduloExp is original)
+        self.assertEqual(intarithmetic.divideWithRemainder.__module__, 'intarithmetic')
+        self.assertEqual(big.equal.__module__, 'big')
+
+    def testDivisionReachesDividePositive(self):
+        a = big.int2bytearray(-1000, 16)
+        b = big.int2bytearray(7, 16)
+        expected = (-143, 1)
+        calls = []
+        original = consttime.divide_positive
+        consttime.divide_positive = lambda x, y: calls.append(1) or original(x, y)
+        try:
+            with consttime.constant_time():
+                results = (intarithmetic.divide(a, b), intarithmetic.modulo(a, b))
+        finally:
+            consttime.divide_positive = original
+        self.assertEqual(tuple(big.bytearray2int(r) for r in results), expected)
+        self.assertEqual(len(calls), 2)
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
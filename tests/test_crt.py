@@ -0,0 +1,71 @@
+# Tests for crt.py.
+
+import random
+import unittest
+
+import big
+import crt
+import intarithmetic
+import parallel
+
+
+class TestCRT(unittest.TestCase):
+    PRIMES = [2 ** 61 - 1, 2 ** 89 - 1, 2 ** 107 - 1, 2 ** 127 - 1]
+
+    def array(self, x, nbytes=None):
+        return big.int2bytearray(x, nbytes or (x.bit_length() + 8) // 8)
+
+    def key(self, primes, d, n=None):
+        return crt.CRTKey([self.array(p) for p in primes], [self.array(d % (p - 1)) for p in primes],
+                      n and self.array(n))
+
+    def testMatchesModuloExp(self):
+        rng = random.Random(14)
+        for primes in (self.PRIMES[:2], self.PRIMES[1:], [3, 5, 7], [2 ** 61 - 1]):
+            n = 1
+            for p in primes:
+                n *= p
+            nbytes = (n.bit_length() + 8) // 8
+            d = rng.getrandbits(n.bit_length())
+            key = self.key(primes, d, n)
+            for x in (0, 1, -1, 2, n - 1, rng.getrandbits(n.bit_length()) - n, rng.randrange(n)):
+                a = self.array(x, nbytes)
+                expected = intarithmetic.moduloExp(a, self.array(d, nbytes), self.array(n, nbytes))
+                self.assertEqual(key.power(a), expected)
+                self.assertEqual(big.bytearray2int(key.power(a)), pow(x, d, n))
+
+    def testResultWidthModes(self):
+        key = self.key([5, 7], 5, 35)
+        a = self.array(3, 8)
+        with big.result_width('minimal'):
+            self.assertEqual(key.power(a), self.array(pow(3, 5, 35)))
+        with big.result_width(4):
+            self.assertEqual(key.power(a), big.int2bytearray(pow(3, 5, 35), 4))
+
+    def testDefaultWidth(self):
+        key = self.key([5, 7], 5)
+        self.assertEqual(key.n, self.array(35))
+        self.assertEqual(big.bytearray2int(key.power(self.array(3))), pow(3, 5, 35))
+
+    def testErrors(self):
+        self.assertRaises(ValueError, crt.CRTKey, [self.array(5)], [])
+        self.assertRaises(ValueError, crt.CRTKey, [self.array(-5)], [self.array(3)])
+        self.assertRaises(ValueError, crt.CRTKey, [self.array(5)], [self.array(-3)])
+        self.assertRaises(ValueError, crt.CRTKey, [self.array(6), self.array(9)], [self.array(1), self.array(1)])
+
+    @unittest.skipIf(not parallel.have_futures(), 'concurrent.futures is not installed')
+    def testExecutor(self):
+        executor = parallel.futures.ProcessPoolExecutor(max_workers=2)
+        try:
+            key = self.key(self.PRIMES[:2], 65537)
+            n = self.PRIMES[0] * self.PRIMES[1]
+            x = 123456789123456789
+            self.assertEqual(big.bytearray2int(key.power(self.array(x), executor)), pow(x, 65537, n))
+        finally:
+            executor.shutdown()
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
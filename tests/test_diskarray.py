@@ -0,0 +1,110 @@
+# Tests for diskarray.py.
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import big
+import diskarray
+import intarithmetic
+
+
+class TestDiskArray(unittest.TestCase):
+    def setUp(self):
+        self.blockBytes = diskarray.BLOCK_BYTES
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'table.bin')
+
+    def tearDown(self):
+        diskarray.BLOCK_BYTES = self.blockBytes
+        shutil.rmtree(self.directory)
+
+    def array(self, x, nbytes=None):
+        return big.int2bytearray(x, nbytes or (abs(x).bit_length() + 8) // 8)
+
+    def wrap(self, x, nbytes):
+        return big.bytearray2int(big.int2bytearray(x, nbytes))
+
+    def make(self, nbytes, xs, path=None):
+        table = diskarray.DiskArray(path, nbytes, len(xs))
+        table.fill(xs)
+        return table
+
+    def testFileLayoutAndReopen(self):
+        xs = [0, 1, -1, 2 ** 70, -(2 ** 70)]
+        with self.make(10, xs, self.path) as table:
+            self.assertEqual(list(table.values()), xs)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(bytearray(f.read()), bytearray().join(big.int2bytearray(x, 10) for x in xs))
+        with diskarray.DiskArray(self.path, 10, readonly=True) as table:
+            self.assertEqual(len(table), 5)
+            self.assertEqual(big.bytearray2int(table[-1]), -(2 ** 70))
+            self.assertRaises(IndexError, table.__getitem__, 5)
+        with diskarray.DiskArray(self.path, 10, count=7) as table:
+            self.assertEqual(list(table.values()), xs + [0, 0])
+
+    def testItemsAreOperands(self):
+        with self.make(16, [10 ** 20, -(10 ** 18), 7], self.path) as table:
+            self.assertEqual(big.bytearray2int(big.add(table[0], table[2])), 10 ** 20 + 7)
+            table[2] = big.int2bytearray(-3, 1)
+            self.assertEqual(big.bytearray2int(table[2]), -3)
+            self.assertRaises(OverflowError, table.__setitem__, 0, self.array(2 ** 130))
+            if diskarray.MEMORYVIEW_MMAP:
+                self.assertEqual(big.bytearray2int(intarithmetic.modulo(table[1], table[2])), -(10 ** 18) % -3)
+                view = table[0]
+                view[15] = 0
+                view.release()
+                self.assertEqual(table.read(0, 1), [10 ** 20 - 10 ** 20 % 256])
+
+    def testBulkOperationsMatchInts(self):
+        diskarray.BLOCK_BYTES = 64
+        rng = random.Random(20)
+        for nbytes in (1, 4, 8, 13, 32):
+            bits = 8 * nbytes
+            xs = [rng.getrandbits(bits) - (1 << (bits - 1)) for i in range(50)]
+            table = self.make(nbytes, xs)
+            x = rng.getrandbits(bits - 1) - (1 << (bits - 2))
+            n = rng.getrandbits(bits - 1) | 1
+            self.assertEqual(list(table.compare(self.array(x))), [(y > x) - (y < x) for y in xs])
+            self.assertEqual(table.count_compare(self.array(x)),
+                             (sum(y < x for y in xs), xs.count(x), sum(y > x for y in xs)))
+            self.assertEqual(big.bytearray2int(table.sum(self.array(n))), sum(xs) % n)
+            product = 1
+            for y in xs:
+                product = product * y % n
+            self.assertEqual(big.bytearray2int(table.product(self.array(n))), product)
+
+            out = diskarray.DiskArray(None, nbytes, len(xs))
+            table.modulo(self.array(-n), out)
+            self.assertEqual(list(out.values()), [y % -n for y in xs])
+            table.add(self.array(x))
+            self.assertEqual(list(table.values()), [self.wrap(y + x, nbytes) for y in xs])
+            out.fill(xs)
+            self.assertEqual(list(out.sort().values()), sorted(xs))
+
+    def testSortLargerThanBlock(self):
+        diskarray.BLOCK_BYTES = 40
+        rng = random.Random(21)
+        xs = [rng.randint(-1000, 1000) for i in range(333)]
+        with self.make(2, xs, self.path) as table:
+            table.sort()
+            self.assertEqual(list(table.values()), sorted(xs))
+
+    def testEmptyAndErrors(self):
+        table = diskarray.DiskArray(None, 8)
+        self.assertEqual(len(table), 0)
+        self.assertEqual(big.bytearray2int(table.sum(self.array(5))), 0)
+        self.assertEqual(big.bytearray2int(table.product(self.array(5))), 1)
+        table.sort()
+        self.assertRaises(ValueError, diskarray.DiskArray, None, 0)
+        self.assertRaises(ZeroDivisionError, self.make(4, [1]).sum, bytearray(4))
+        self.assertRaises(OverflowError, self.make(1, [1]).modulo, self.array(1000))
+        self.assertRaises(ValueError, self.make(4, [1]).add, self.array(1), diskarray.DiskArray(None, 4, 2))
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
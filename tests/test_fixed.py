@@ -0,0 +1,65 @@
+# Tests for fixed.py.
+
+import random
+import unittest
+
+import big
+import fixed
+
+
+class TestFixedWidth(unittest.TestCase):
+    def testRandomizedAgainstPython(self):
+        rng = random.Random(18)
+        for nbytes in (1, 5, 8, 16, 32, 64):
+            for signed in (False, True):
+                width = fixed.FixedWidth(nbytes, signed)
+                modulus = 1 << (8 * nbytes)
+
+                def wrap(value):
+                    value %= modulus
+                    if signed and value >= modulus // 2:
+                        value -= modulus
+                    return value
+
+                for i in range(100):
+                    x = wrap(rng.getrandbits(8 * nbytes))
+                    y = wrap(rng.getrandbits(8 * nbytes)) or 1
+                    a = width.store(x)
+                    b = width.store(y)
+                    shift = rng.randint(0, 8 * nbytes + 3)
+                    self.assertEqual(width.value(a), x)
+                    self.assertEqual(width.value(width.add(a, b)), wrap(x + y))
+                    self.assertEqual(width.value(width.subtract(a, b)), wrap(x - y))
+                    self.assertEqual(width.value(width.multiply(a, b)), wrap(x * y))
+                    self.assertEqual(width.value(width.negate(a)), wrap(-x))
+                    self.assertEqual(width.value(width.divide(a, b)), wrap(x // y))
+                    self.assertEqual(width.value(width.modulo(a, b)), wrap(x % y))
+                    self.assertEqual(width.value(width.shift_left(a, shift)), wrap(x << shift))
+                    self.assertEqual(width.value(width.shift_right(a, shift)), wrap(x >> shift))
+                    self.assertEqual(width.compare(a, b), (x > y) - (x < y))
+
+    def testMatchesBigForSigned(self):
+        a = big.int2bytearray(-5, 16)
+        self.assertEqual(fixed.INT128.value(a), -5)
+        self.assertEqual(fixed.INT128.multiply(a, big.int2bytearray(3, 16)), big.int2bytearray(-15, 16))
+
+    def testOutBuffers(self):
+        buffers = fixed.UINT256.allocate(3)
+        one = fixed.UINT256.store(1)
+        for i in range(5):
+            fixed.UINT256.add(buffers[1], one, buffers[1])
+        self.assertEqual(fixed.UINT256.value(buffers[1]), 5)
+        self.assertEqual(fixed.UINT256.value(buffers[0]), 0)
+        self.assertEqual(fixed.UINT256.value(fixed.UINT256.subtract(buffers[0], one, buffers[2])), 2 ** 256 - 1)
+
+    def testErrors(self):
+        self.assertRaises(ValueError, fixed.UINT64.add, bytearray(4), bytearray(8))
+        self.assertRaises(ValueError, fixed.UINT64.store, 1, bytearray(9))
+        self.assertRaises(ZeroDivisionError, fixed.UINT64.divide, fixed.UINT64.store(1), bytearray(8))
+        self.assertRaises(ValueError, fixed.UINT64.shift_left, bytearray(8), -1)
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
@@ -0,0 +1,71 @@
+# Tests for instrument.py.
+
+import json
+import unittest
+
+import big
+import instrument
+import intarithmetic
+
+
+class TestInstrument(unittest.TestCase):
+    def tearDown(self):
+        instrument.disable()
+
+    def testCountsOneCall(self):
+        a = big.int2bytearray(1000, 2)
+        b = big.int2bytearray(-7, 4)
+        with instrument.profiling() as session:
+            result = big.add(a, b)
+        self.assertEqual(big.bytearray2int(result), 993)
+        stats = session.profile.functions['big.add']
+        self.assertEqual(stats['calls'], 1)
+        self.assertEqual(stats['top_level_calls'], 1)
+        self.assertEqual(stats['bytes_in'], 6)
+        self.assertEqual(stats['allocations'], 1)
+        self.assertEqual(stats['bytes_out'], len(result))
+        self.assertTrue(session.profile.operations['big.add']['big.make_same_size'] >= 1)
+        self.assertEqual(session.profile.functions['big.make_same_size']['top_level_calls'], 0)
+
+    def testModuloExpBreakdown(self):
+        a = big.int2bytearray(123456789, 16)
+        b = big.int2bytearray(65537, 4)
+        n = big.int2bytearray(1000000007, 8)
+        expected = intarithmetic.moduloExp(a, b, n)
+        instrument.enable()
+        self.assertEqual(intarithmetic.moduloExp(a, b, n), expected)
+        self.assertEqual(intarithmetic.modulo(a, n), a)
+        self.assertEqual(sorted(instrument.profile.operations), ['intarithmetic.modulo', 'intarithmetic.moduloExp'])
+        calls = instrument.profile.operations['intarithmetic.moduloExp']
+        self.assertEqual(calls['intarithmetic.residueLimbs'], 1)
+        self.assertEqual(calls['intarithmetic.divideLimbs'], instrument.profile.functions['intarithmetic.divideLimbs']['calls'] - 1)
+
+    def testRecursionDepth(self):
+        x = big.int2bytearray(3 ** 5000, 1000)
+        with instrument.profiling({big: ('multiply_karatsuba',)}) as session:
+            big.multiply(x, x)
+        self.assertTrue(session.profile.functions['big.multiply_karatsuba']['max_depth'] > 1)
+        self.assertEqual(list(session.profile.functions), ['big.multiply_karatsuba'])
+
+    def testInPlaceIsNotAllocation(self):
+        with instrument.profiling() as session:
+            big.negate_in_place(bytearray(b'\x01\x00'))
+        self.assertEqual(session.profile.functions['big.negate_in_place']['allocations'], 0)
+
+    def testDisableRestoresAndJson(self):
+        with instrument.profiling() as session:
+            intarithmetic.divide(big.int2bytearray(100, 1), big.int2bytearray(7, 1))
+        self.assertFalse(instrument.enabled())
+        self.assertEqual(big.add.__module__, 'big')
+        self.assertFalse(hasattr(intarithmetic.divide, '__wrapped__'))
+        data = json.loads(session.profile.to_json())
+        self.assertEqual(data['functions']['intarithmetic.divide']['calls'], 1)
+        self.assertEqual(data, json.loads(json.dumps(session.profile.as_dict())))
+        self.assertEqual(session.profile.top(1, 'bytes_in')[0][1]['bytes_in'],
+                         max(stats['bytes_in'] for stats in data['functions'].values()))
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
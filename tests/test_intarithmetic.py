@@ -0,0 +1,437 @@
+# Tests for intarithmetic.py.
+
+import random
+import unittest
+
+import big
+import intarithmetic
+
+
+class IntArithmetic(unittest.TestCase):
+
+    # START Unit Tests for Problem 1
+    def testDividePositive1(self):
+        print("Positive Division Test 1:")
+        a = big.int2bytearray(120, 8)
+        b = big.int2bytearray(4, 8)
+        c = intarithmetic.divide(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, 120 // 4)
+
+    def testDividePositive2(self):
+        print("Positive Division Test 2:")
+        a = big.int2bytearray(47, 8)
+        b = big.int2bytearray(5, 8)
+        c = intarithmetic.divide(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, 47 // 5)
+    # END Unit Tests for Problem 1
+
+    # START Unit Tests for Problem 2
+    def testDivideNegative1(self):
+        print("Negative Division Test 1:")
+        a = big.int2bytearray(-5, 8)
+        b = big.int2bytearray(4, 8)
+        c = intarithmetic.divide(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, -5 // 4)
+
+    def testDivideNegative2(self):
+        print("Negative Division Test 2:")
+        a = big.int2bytearray(8, 8)
+        b = big.int2bytearray(-4, 8)
+        c = intarithmetic.divide(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, 8 // -4)
+
+    def testDivideNegative3(self):
+        print("Negative Division Test 3:")
+        a = big.int2bytearray(-6, 8)
+        b = big.int2bytearray(3, 8)
+        c = intarithmetic.divide(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, -6 // 3)
+
+    def testDivideNegative4(self):
+        print("Negative Division Test 4:")
+        a = big.int2bytearray(-15, 8)
+        b = big.int2bytearray(-5, 8)
+        c = intarithmetic.divide(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, -15 // -5)
+    # END Unit Tests for Problem 2
+
+    # START Unit Tests for Problem 3
+    def testDivideSignExt1(self):
+        print("Sign Extension Division Test 1:")
+        a = big.int2bytearray(1234567890)
+        b = big.int2bytearray(2)
+        c = intarithmetic.divide(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "/" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "/", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, 1234567890 // 2)
+    # END Unit Tests for Problem 3
+
+    # START Unit Tests for Problem 4
+    def testModulo1(self):
+        print("Modulo Test 1:")
+        a = big.int2bytearray(7, 8)
+        b = big.int2bytearray(3, 8)
+        c = intarithmetic.modulo(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "%" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "%", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, 7 % 3)
+
+    def testModulo2(self):
+        print("Modulo Test 2:")
+        a = big.int2bytearray(-98, 8)
+        b = big.int2bytearray(-17, 8)
+        c = intarithmetic.modulo(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "%" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "%", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, -98 % -17)
+    # END Unit Tests for Problem 4
+
+    # START Unit Tests for Problem 5
+    def testModulo3(self):
+        print("Modulo Test 3:")
+        a = big.int2bytearray(-3, 8)
+        b = big.int2bytearray(4, 8)
+        c = intarithmetic.modulo(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "%" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "%", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, -3%4)
+
+    def testModulo4(self):
+        print("Modulo Test 4:")
+        a = big.int2bytearray(3, 8)
+        b = big.int2bytearray(-4, 8)
+        c = intarithmetic.modulo(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "%" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "%", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, 3%-4)
+
+    def testModulo5(self):
+        print("Modulo Test 5:")
+        a = big.int2bytearray(1234567890)
+        b = big.int2bytearray(2)
+        c = intarithmetic.modulo(a, b)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(big.bytearray2int(a)) + "%" + str(big.bytearray2int(b)) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", big.bytearray2int(a), "%", big.bytearray2int(b), "=", ans)
+        self.assertEqual(ans, 1234567890%2)
+    # END Unit Tests for Problem 5
+
+    # START Unit Tests for Problem 6
+    def testExpMod1(self):
+        print("Exponential Modulo Test 1:")
+        a = 5
+        aArray = big.int2bytearray(5, 8)
+
+        b = 756
+        bArray = big.int2bytearray(756, 8)
+
+        n = 25
+        nArray = big.int2bytearray(25, 8)
+
+        c = intarithmetic.moduloExp(aArray, bArray, nArray)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(a) + "^" + str(b) + "%" + str(n) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", a, "^", b, "%", n, "=", ans)
+        self.assertEqual(ans, pow(a, b, n))
+
+    def testExpMod2(self):
+        print("Exponential Modulo Test 2:")
+        a = 9
+        aArray = big.int2bytearray(9, 8)
+
+        b = 3
+        bArray = big.int2bytearray(3, 8)
+
+        n = 4
+        nArray = big.int2bytearray(4, 8)
+
+        c = intarithmetic.moduloExp(aArray, bArray, nArray)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(a) + "^" + str(b) + "%" + str(n) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", a, "^", b, "%", n, "=", ans)
+        self.assertEqual(ans, pow(a, b, n))
+
+    def testExpMod3(self):
+        print("Exponential Modulo Test 3:")
+        a = 12
+        aArray = big.int2bytearray(12, 8)
+
+        b = 17
+        bArray = big.int2bytearray(17, 8)
+
+        n = 7
+        nArray = big.int2bytearray(7, 8)
+
+        c = intarithmetic.moduloExp(aArray, bArray, nArray)
+        ans = big.bytearray2int(c)
+        printstatement = "\n" + str(a) + "^" + str(b) + "%" + str(n) + "=" + str(ans)
+        print(printstatement)
+        # print("\n", a, "^", b, "%", n, "=", ans)
+        self.assertEqual(ans, pow(a, b, n))
+    # END Unit Tests for Problem 6
+
+class TestDivisionEngine(unittest.TestCase):
+    def checkDivide(self, x, y, xbytes, ybytes):
+        quotient, remainder = intarithmetic.divideWithRemainder(big.int2bytearray(x, xbytes), big.int2bytearray(y, ybytes))
+        self.assertEqual((big.bytearray2int(quotient), big.bytearray2int(remainder)), divmod(x, y))
+
+    def testDividePositiveReturnsBoth(self):
+        quotient, remainder = intarithmetic.dividePositive(big.int2bytearray(47, 8), big.int2bytearray(5, 8))
+        self.assertEqual(big.bytearray2int(quotient), 9)
+        self.assertEqual(big.bytearray2int(remainder), 2)
+
+    def testModuloMixedSigns(self):
+        self.assertEqual(big.bytearray2int(intarithmetic.modulo(big.int2bytearray(-10, 8), big.int2bytearray(4, 8))), 2)
+        self.assertEqual(big.bytearray2int(intarithmetic.modulo(big.int2bytearray(10, 8), big.int2bytearray(-4, 8))), -2)
+
+    def testMostNegativeDividend(self):
+        self.checkDivide(-128, -1, 1, 1)
+        self.checkDivide(-2 ** 63, -1, 8, 8)
+
+    def testSingleLimbOperands(self):
+        # These are divided as ints; the widths must match the limb path.
+        for x in range(-128, 128, 3):
+            for y in list(range(-128, 0, 5)) + list(range(1, 128, 5)) + [-1]:
+                for xbytes, ybytes in ((1, 1), (1, 8), (8, 2), (9, 1)):
+                    a = big.int2bytearray(x, xbytes)
+                    quotient, remainder = intarithmetic.divideWithRemainder(a, big.int2bytearray(y, ybytes))
+                    self.assertEqual((big.bytearray2int(quotient), big.bytearray2int(remainder)), divmod(x, y))
+                    self.assertEqual(len(quotient), max(xbytes, ybytes, len(big.int2bytearray(x // y))))
+                    self.assertEqual(len(remainder), max(xbytes, ybytes))
+
+    def test4096BitDividend(self):
+        x = 3 ** 2580
+        y = 7 ** 350
+        self.checkDivide(x, y, 520, 128)
+        self.checkDivide(-x, y, 520, 128)
+        self.checkDivide(x, -y, 520, 128)
+        self.checkDivide(-x, -y, 520, 128)
+
+    def testRandomizedAllLimbSizes(self):
+        saved = big.LIMB_BYTES
+        rng = random.Random(1234)
+        try:
+            for limbBytes in (1, 2, 4, 8):
+                big.LIMB_BYTES = limbBytes
+                for i in range(200):
+                    xbytes = rng.randint(1, 40)
+                    ybytes = rng.randint(1, 40)
+                    x = rng.randint(-2 ** (8 * xbytes - 1), 2 ** (8 * xbytes - 1) - 1)
+                    y = rng.randint(-2 ** (8 * ybytes - 1), 2 ** (8 * ybytes - 1) - 1) or 1
+                    self.checkDivide(x, y, xbytes, ybytes)
+        finally:
+            big.LIMB_BYTES = saved
+
+    def testDivideByZero(self):
+        self.assertRaises(ZeroDivisionError, intarithmetic.divide, big.int2bytearray(5, 8), bytearray(8))
+
+    def testResultWidthModes(self):
+        a = big.int2bytearray(-1000, 32)
+        b = big.int2bytearray(7, 32)
+        with big.result_width('minimal'):
+            self.assertEqual(intarithmetic.divide(a, b), big.int2bytearray(-143))
+            self.assertEqual(intarithmetic.modulo(a, b), big.int2bytearray(1))
+            self.assertEqual(intarithmetic.moduloExp(a, b, big.int2bytearray(1001, 32)), big.int2bytearray(pow(-1000, 7, 1001)))
+            base = intarithmetic.PrecomputedBase(b, big.int2bytearray(1001, 32))
+            self.assertEqual(base.power(big.int2bytearray(3, 32)), big.int2bytearray(343))
+            self.assertEqual(intarithmetic.gcd(a, big.int2bytearray(15, 32)), big.int2bytearray(5))
+            self.assertEqual(intarithmetic.xgcd(a, b), (big.int2bytearray(1), big.int2bytearray(1), big.int2bytearray(143)))
+        with big.result_width(1):
+            self.assertRaises(OverflowError, intarithmetic.divide, a, b)
+            self.assertRaises(OverflowError, intarithmetic.gcd, a, big.int2bytearray(3000, 32))
+
+
+class TestModuloExpEngine(unittest.TestCase):
+    def checkExp(self, x, y, m, nbytes):
+        c = intarithmetic.moduloExp(big.int2bytearray(x, nbytes), big.int2bytearray(y, nbytes), big.int2bytearray(m, nbytes))
+        self.assertEqual(big.bytearray2int(c), pow(x, y, m))
+
+    def testZeroExponent(self):
+        self.checkExp(5, 0, 7, 8)
+        self.checkExp(5, 0, 1, 8)
+
+    def testNegativeBaseAndModulus(self):
+        self.checkExp(-12, 17, 7, 8)
+        self.checkExp(12, 17, -7, 8)
+        self.checkExp(-12, 5, -8, 8)
+
+    def testFixedResultWidth(self):
+        # Only the result has to fit the width, not the reduced base.
+        n = big.int2bytearray(1000, 4)
+        with big.result_width(1):
+            self.assertEqual(intarithmetic.moduloExp(big.int2bytearray(500, 4), big.int2bytearray(2, 4), n), bytearray(1))
+            self.assertEqual(intarithmetic.moduloExp(big.int2bytearray(-500, 4), big.int2bytearray(2, 4), n), bytearray(1))
+            self.assertEqual(intarithmetic.moduloExp(big.int2bytearray(1006, 4), big.int2bytearray(3, 4), big.int2bytearray(1001, 4)),
+                             big.int2bytearray(125, 1))
+            base = intarithmetic.PrecomputedBase(big.int2bytearray(500, 4), n)
+            self.assertEqual(base.power(big.int2bytearray(2, 4)), bytearray(1))
+
+    def testNegativeExponent(self):
+        self.assertRaises(ValueError, intarithmetic.moduloExp, big.int2bytearray(2, 8), big.int2bytearray(-1, 8), big.int2bytearray(7, 8))
+
+    def testRandomizedOddAndEvenModuli(self):
+        rng = random.Random(99)
+        for bits in (16, 64, 200, 512):
+            nbytes = bits // 8 + 1
+            for parity in (0, 1):
+                m = rng.getrandbits(bits) | (1 << (bits - 1))
+                m = m - (m & 1) + parity
+                x = rng.getrandbits(bits)
+                y = rng.getrandbits(bits)
+                self.checkExp(x, y, m, nbytes)
+
+    def testExplicitWindowSizes(self):
+        rng = random.Random(5)
+        m = rng.getrandbits(300) | 1
+        x = rng.getrandbits(300)
+        y = rng.getrandbits(300)
+        for window in (1, 2, 3, 5, 7):
+            c = intarithmetic.moduloExp(big.int2bytearray(x, 40), big.int2bytearray(y, 40), big.int2bytearray(m, 40), window)
+            self.assertEqual(big.bytearray2int(c), pow(x, y, m))
+
+    def testSharedContext(self):
+        for m in (1000003, -1000003, 1000000):
+            n = big.int2bytearray(m, 4)
+            context = intarithmetic.reductionContext(big.int2bytearray(abs(m), 4))
+            for x in (2, -3, 999999):
+                a = big.int2bytearray(x, 4)
+                b = big.int2bytearray(65537, 4)
+                self.assertEqual(intarithmetic.moduloExp(a, b, n, context=context), intarithmetic.moduloExp(a, b, n))
+
+
+class CountingContext(object):
+    def __init__(self, context):
+        self.context = context
+        self.one = context.one
+        self.count = 0
+
+    def encode(self, x):
+        return self.context.encode(x)
+
+    def decode(self, x):
+        return self.context.decode(x)
+
+    def multiply(self, x, y):
+        self.count += 1
+        return self.context.multiply(x, y)
+
+    def square(self, x):
+        self.count += 1
+        return self.context.square(x)
+
+
+class TestWindowedExponentiation(unittest.TestCase):
+    def testSlidingWindowSavesMultiplies(self):
+        rng = random.Random(11)
+        modulus = big.int2bytearray(rng.getrandbits(64) | 1, 9)
+        exponent = [rng.getrandbits(8 * big.LIMB_BYTES) for i in range(1024 // (8 * big.LIMB_BYTES))]
+        counts = {}
+        for window in (1, intarithmetic.chooseWindowSize(1024)):
+            context = CountingContext(intarithmetic.reductionContext(modulus))
+            intarithmetic.slidingWindowPower(context, [3], exponent, window)
+            counts[window] = context.count
+        self.assertTrue(counts[intarithmetic.chooseWindowSize(1024)] < 0.85 * counts[1])
+
+    def testPrecomputedBase(self):
+        rng = random.Random(12)
+        for bits in (64, 256):
+            nbytes = bits // 8 + 1
+            for m in (rng.getrandbits(bits) | 1, rng.getrandbits(bits) & ~1, -(rng.getrandbits(bits) | 1)):
+                x = rng.getrandbits(bits) - (1 << (bits - 1))
+                base = intarithmetic.PrecomputedBase(big.int2bytearray(x, nbytes), big.int2bytearray(m, nbytes))
+                for y in (0, 1, 2, rng.getrandbits(bits // 2), rng.getrandbits(bits)):
+                    c = base.power(big.int2bytearray(y, nbytes))
+                    self.assertEqual(big.bytearray2int(c), pow(x, y, m))
+
+
+class TestGcd(unittest.TestCase):
+    def referenceGcd(self, x, y):
+        x, y = abs(x), abs(y)
+        while y:
+            x, y = y, x % y
+        return x
+
+    def values(self, rng):
+        values = [0, 1, -1, 2, 12, -18, 2 ** 64, -(2 ** 127)]
+        for bits in (8, 31, 64, 100, 512, 1030):
+            values.append(rng.getrandbits(bits) - (1 << (bits - 1)))
+        common = rng.getrandbits(200) | 1
+        values += [common * rng.getrandbits(300), -common * rng.getrandbits(100)]
+        return values
+
+    def testGcdAndXgcd(self):
+        rng = random.Random(13)
+        values = self.values(rng)
+        for x in values:
+            for y in values:
+                a = big.int2bytearray(x, (x.bit_length() + 8) // 8)
+                b = big.int2bytearray(y, (y.bit_length() + 16) // 8)
+                g = self.referenceGcd(x, y)
+                self.assertEqual(big.bytearray2int(intarithmetic.gcd(a, b)), g)
+                self.assertTrue(len(intarithmetic.gcd(a, b)) >= max(len(a), len(b)))
+                g2, s, t = [big.bytearray2int(c) for c in intarithmetic.xgcd(a, b)]
+                self.assertEqual(g2, g)
+                self.assertEqual(s * x + t * y, g)
+
+    def testModinv(self):
+        rng = random.Random(14)
+        for bits in (8, 64, 521, 1024):
+            n = rng.getrandbits(bits) | 1 | (1 << (bits - 1))
+            for sign in (1, -1):
+                for i in range(5):
+                    x = rng.getrandbits(bits + 10) - (1 << (bits + 9))
+                    if self.referenceGcd(x, n) != 1:
+                        continue
+                    nbytes = bits // 8 + 3
+                    inverse = intarithmetic.modinv(big.int2bytearray(x, nbytes), big.int2bytearray(sign * n, nbytes))
+                    value = big.bytearray2int(inverse)
+                    self.assertEqual(value * x % n, 1 % n)
+                    self.assertEqual(inverse, intarithmetic.modulo(inverse, big.int2bytearray(sign * n, nbytes)))
+
+    def testModinvErrors(self):
+        self.assertRaises(ValueError, intarithmetic.modinv, big.int2bytearray(6, 2), big.int2bytearray(9, 2))
+        self.assertRaises(ZeroDivisionError, intarithmetic.modinv, big.int2bytearray(6, 2), bytearray(2))
+        self.assertEqual(big.bytearray2int(intarithmetic.modinv(big.int2bytearray(6, 2), big.int2bytearray(1, 2))), 0)
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
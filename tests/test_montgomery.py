@@ -0,0 +1,50 @@
+# Tests for montgomery.py.
+
+import random
+import unittest
+
+import big
+import montgomery
+
+
+class TestMontgomeryContext(unittest.TestCase):
+    def context(self, n):
+        return montgomery.MontgomeryContext(big.int2bytearray(n, (n.bit_length() + 8) // 8))
+
+    def value(self, limbs):
+        return big.bytearray2int(big.from_magnitude(limbs, 1, False))
+
+    def limbs(self, x):
+        return big.to_limbs(big.int2bytearray(x, (x.bit_length() + 8) // 8))
+
+    def testEvenModulusRejected(self):
+        self.assertRaises(ValueError, self.context, 100)
+
+    def testRoundTrip(self):
+        context = self.context(1000003)
+        for x in (0, 1, 2, 999999, 1000002):
+            self.assertEqual(self.value(context.decode(context.encode(self.limbs(x)))), x)
+
+    def testOne(self):
+        context = self.context(97)
+        self.assertEqual(self.value(context.decode(context.one)), 1)
+        self.assertEqual(self.value(self.context(1).decode(self.context(1).one)), 0)
+
+    def testRandomizedMultiplyAndSquare(self):
+        rng = random.Random(3)
+        for bits in (8, 31, 32, 33, 100, 512, 1030):
+            n = rng.getrandbits(bits) | 1 | (1 << (bits - 1))
+            context = self.context(n)
+            for i in range(10):
+                x = rng.randrange(n)
+                y = rng.randrange(n)
+                product = context.multiply(context.encode(self.limbs(x)), context.encode(self.limbs(y)))
+                self.assertEqual(self.value(context.decode(product)), x * y % n)
+                square = context.square(context.encode(self.limbs(x)))
+                self.assertEqual(self.value(context.decode(square)), x * x % n)
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
@@ -0,0 +1,68 @@
+# Tests for parallel.py.
+
+import random
+import unittest
+
+import big
+import intarithmetic
+import parallel
+
+
+def random_jobs(rng, count, operands):
+    jobs = []
+    for i in range(count):
+        nbytes = rng.choice([1, 4, 16, 40])
+        job = [big.int2bytearray(rng.getrandbits(8 * nbytes) - (1 << (8 * nbytes - 1)), nbytes)
+               for j in range(operands)]
+        if not any(job[-1]):
+            job[-1] = big.int2bytearray(3, nbytes)
+        if operands == 3:
+            job[1] = big.int2bytearray(abs(big.bytearray2int(job[1])), nbytes + 1)
+        jobs.append(tuple(job))
+    return jobs
+
+
+@unittest.skipIf(not parallel.have_futures(), 'concurrent.futures is not installed')
+class TestParallel(unittest.TestCase):
+    def testPackRoundTrip(self):
+        groups = [(bytearray(b'\x01\x02'), bytearray()), (bytearray(b'\xff' * 300), bytearray(b'\x00'))]
+        self.assertEqual(parallel.unpack_groups(parallel.pack_groups(groups), 2), groups)
+        self.assertEqual(parallel.unpack_groups(parallel.pack_groups([]), 2), [])
+
+    def testChunksCoverJobsOnce(self):
+        jobs = random_jobs(random.Random(1), 50, 3)
+        chunks = parallel.make_chunks('moduloExp', jobs, 8)
+        self.assertEqual(sorted(index for chunk in chunks for index in chunk), list(range(50)))
+        self.assertTrue(len(chunks) <= 9)
+
+    def testMatchesSerial(self):
+        rng = random.Random(2)
+        executor = parallel.futures.ProcessPoolExecutor(max_workers=2)
+        try:
+            jobs = random_jobs(rng, 20, 3)
+            self.assertEqual(list(parallel.map_modulo_exp(jobs, workers=2, executor=executor)),
+                             [intarithmetic.moduloExp(*job) for job in jobs])
+            jobs = random_jobs(rng, 40, 2)
+            self.assertEqual(list(parallel.map_divmod(jobs, executor=executor)),
+                             [intarithmetic.divideWithRemainder(*job) for job in jobs])
+            self.assertEqual(list(parallel.map_divide(jobs, executor=executor)),
+                             [intarithmetic.divide(*job) for job in jobs])
+            unordered = dict(parallel.map_modulo(jobs, ordered=False, executor=executor))
+            self.assertEqual([unordered[i] for i in range(len(jobs))],
+                             [intarithmetic.modulo(*job) for job in jobs])
+        finally:
+            executor.shutdown()
+
+    def testOwnExecutor(self):
+        jobs = [(big.int2bytearray(7, 1), big.int2bytearray(2, 1))]
+        self.assertEqual(list(parallel.map_divide(jobs, workers=1)), [big.int2bytearray(3, 1)])
+        self.assertEqual(list(parallel.map_divide([], workers=1)), [])
+
+    def testWrongArity(self):
+        self.assertRaises(ValueError, list, parallel.map_modulo_exp([(bytearray(1), bytearray(1))], workers=1))
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
@@ -0,0 +1,63 @@
+# Tests for patch.py.
+
+import unittest
+
+import big
+import cache
+import consttime
+import instrument
+import intarithmetic
+
+
+class TestInterleaving(unittest.TestCase):
+    def setUp(self):
+        self.divide = intarithmetic.divide
+        self.a = big.int2bytearray(1000, 16)
+        self.b = big.int2bytearray(7, 16)
+
+    def tearDown(self):
+        cache.disable()
+        instrument.disable()
+        consttime.disable()
+
+    def testDisableCacheUnderInstrumentation(self):
+        cache.enable()
+        instrument.enable()
+        cache.disable()
+        self.assertTrue(instrument.enabled())
+        self.assertFalse(cache.enabled())
+        intarithmetic.divide(self.a, self.b)
+        intarithmetic.divide(self.a, self.b)
+        self.assertEqual(instrument.profile.functions['intarithmetic.divide']['calls'], 2)
+        self.assertEqual(instrument.profile.functions['intarithmetic.divideLimbs']['calls'], 2)
+        instrument.disable()
+        self.assertTrue(intarithmetic.divide is self.divide)
+
+    def testDisableInstrumentationUnderCache(self):
+        instrument.enable()
+        cache.enable()
+        instrument.disable()
+        self.assertTrue(cache.enabled())
+        self.assertFalse(instrument.enabled())
+        for i in range(3):
+            self.assertEqual(intarithmetic.divide(self.a, self.b), big.int2bytearray(142, 16))
+        self.assertEqual(cache.results.hits, 2)
+        self.assertFalse(hasattr(intarithmetic.divideLimbs, '__wrapped__'))
+        cache.disable()
+        self.assertTrue(intarithmetic.divide is self.divide)
+
+    def testConstantTimeUnderCache(self):
+        cache.enable()
+        consttime.enable()
+        self.assertTrue(intarithmetic.divideWithRemainder is consttime.divide_with_remainder)
+        cache.disable()
+        self.assertTrue(consttime.enabled())
+        self.assertTrue(intarithmetic.divide is self.divide)
+        consttime.disable()
+        self.assertEqual(intarithmetic.divideWithRemainder.__module__, 'intarithmetic')
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
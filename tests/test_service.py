@@ -0,0 +1,176 @@
+# Tests for service.py.
+
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+import big
+import intarithmetic
+
+if sys.version_info >= (3, 7):
+    import asyncio
+    from concurrent import futures
+
+    import service
+else:
+    service = None
+
+
+@unittest.skipIf(service is None, 'the service needs Python 3.7 or later')
+class TestService(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.executor = futures.ThreadPoolExecutor(max_workers=1)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+        self.executor.shutdown()
+
+    def wait(self, awaitable):
+        return self.loop.run_until_complete(awaitable)
+
+    def start(self, **kwargs):
+        return self.wait(service.ArithmeticService(self.executor, **kwargs).start())
+
+    def jobs(self):
+        rng = random.Random(23)
+        jobs = []
+        for operation in ('moduloExp', 'divide', 'modulo', 'divmod'):
+            for width in (4, 40):
+                jobs += [(operation, job) for job in service.random_jobs(rng, operation, 12, width, moduli=2)]
+        rng.shuffle(jobs)
+        return jobs
+
+    def expected(self, operation, job):
+        return {
+            'moduloExp': intarithmetic.moduloExp,
+            'divide': intarithmetic.divide,
+            'modulo': intarithmetic.modulo,
+            'divmod': intarithmetic.divideWithRemainder,
+        }[operation](*job)
+
+    def testResultsMatchAndBatch(self):
+        arithmetic = self.start()
+        jobs = self.jobs()
+        results = self.wait(asyncio.gather(*[arithmetic.call(operation, *job) for operation, job in jobs]))
+        self.wait(arithmetic.close())
+        self.assertEqual(results, [self.expected(operation, job) for operation, job in jobs])
+        stats = arithmetic.stats()
+        self.assertEqual(stats['requests'], len(jobs))
+        self.assertTrue(stats['groups'] < len(jobs))
+
+    def testErrorsFailOnlyTheirRequest(self):
+        arithmetic = self.start()
+        one = big.int2bytearray(1, 1)
+        zero = bytearray(1)
+        calls = [arithmetic.divide(one, zero), arithmetic.divide(one, one),
+                 arithmetic.modulo_exp(one, big.int2bytearray(-1, 1), big.int2bytearray(7, 1))]
+        results = self.wait(asyncio.gather(*calls, return_exceptions=True))
+        self.assertRaises(ValueError, self.wait, arithmetic.submit('power', one, one))
+        self.wait(arithmetic.close())
+        self.assertTrue(isinstance(results[0], ZeroDivisionError))
+        self.assertEqual(results[1], one)
+        self.assertTrue(isinstance(results[2], ValueError))
+        self.assertEqual(arithmetic.stats()['failures'], 2)
+        self.assertRaises(RuntimeError, self.wait, arithmetic.divide(one, one))
+
+    def settle(self, predicate=None):
+        # Runs the loop until predicate() holds, or for a few rounds if
+        # there is none. The executor is blocked on a threading.Event in
+        # these tests, so nothing else can make progress meanwhile.
+        for i in range(100):
+            if predicate is not None and predicate():
+                return
+            self.wait(asyncio.sleep(0))
+        self.assertTrue(predicate is None, 'the service did not settle')
+
+    def blocked(self, **kwargs):
+        # A service whose executor cannot run anything until the returned
+        # event is set.
+        arithmetic = self.start(**kwargs)
+        release = threading.Event()
+        self.executor.submit(release.wait)
+        return arithmetic, release
+
+    def testBackpressure(self):
+        arithmetic, release = self.blocked(max_pending=1, max_running=1, max_batch=1, max_delay=0)
+        one = big.int2bytearray(1, 1)
+        pending = [self.wait(arithmetic.submit('divide', one, one))]
+        # The first group holds the only slot, waiting for the executor.
+        self.settle(lambda: arithmetic.queue.empty() and len(arithmetic.running) == 1)
+        pending.append(self.wait(arithmetic.submit('divide', one, one)))
+        # The dispatcher has taken the second one and waits for a slot.
+        self.settle(lambda: arithmetic.queue.empty() and arithmetic.slots.locked())
+        pending.append(self.wait(arithmetic.submit('divide', one, one)))
+        self.assertTrue(arithmetic.queue.full())
+        # So the next request has to wait for room in the queue.
+        late = self.loop.create_task(arithmetic.submit('divide', one, one))
+        self.settle()
+        self.assertFalse(late.done())
+        release.set()
+        pending.append(self.wait(late))
+        self.assertEqual(self.wait(asyncio.gather(*pending)), [one] * 4)
+        self.wait(arithmetic.close())
+
+    def testSubmitDuringClose(self):
+        arithmetic, release = self.blocked(max_pending=1, max_running=1, max_batch=1, max_delay=0)
+        one = big.int2bytearray(1, 1)
+        pending = [self.wait(arithmetic.submit('divide', one, one))]
+        self.settle(lambda: arithmetic.queue.empty() and len(arithmetic.running) == 1)
+        pending.append(self.wait(arithmetic.submit('divide', one, one)))
+        self.settle(lambda: arithmetic.slots.locked() and arithmetic.queue.empty())
+        pending.append(self.wait(arithmetic.submit('divide', one, one)))
+        waiting = self.loop.create_task(arithmetic.submit('divide', one, one))
+        self.settle()
+        closing = self.loop.create_task(arithmetic.close())
+        self.settle(lambda: arithmetic.closing)
+        # A request that was already waiting for the queue gets in; a new
+        # one is refused.
+        self.assertRaises(RuntimeError, self.wait, arithmetic.submit('divide', one, one))
+        release.set()
+        self.wait(closing)
+        pending.append(self.wait(waiting))
+        self.assertEqual([future.result() for future in pending], [one] * 4)
+        self.assertEqual(arithmetic.stats()['requests'], 4)
+
+    def checkServer(self, path=None):
+        arithmetic = self.start()
+        server = self.wait(service.serve(arithmetic, path=path))
+        client = self.wait(service.Client().connect(port=None if path else server.address()[1], path=path))
+        try:
+            jobs = self.jobs()
+            results = self.wait(asyncio.gather(*[client.call(operation, *job) for operation, job in jobs]))
+            self.assertEqual(results, [self.expected(operation, job) for operation, job in jobs])
+            self.assertRaises(service.RemoteError, self.wait, client.call('modulo', bytearray(1), bytearray(1)))
+            results, report = self.wait(service.generate_load(client.call, 'modulo', [job for operation, job in jobs
+                                                                                      if operation == 'modulo'], 4))
+            self.assertEqual(report['requests'], 24)
+            self.assertTrue(report['latency_p99'] >= report['latency_p50'])
+        finally:
+            self.wait(client.close())
+            self.wait(server.close())
+            self.wait(arithmetic.close())
+
+    def testTcpServer(self):
+        self.checkServer()
+
+    @unittest.skipIf(not hasattr(socket, 'AF_UNIX'), 'no Unix sockets')
+    def testUnixServer(self):
+        directory = tempfile.mkdtemp()
+        try:
+            self.checkServer(os.path.join(directory, 'service.sock'))
+        finally:
+            shutil.rmtree(directory)
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
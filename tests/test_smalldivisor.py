@@ -0,0 +1,57 @@
+# Tests for smalldivisor.py.
+
+import random
+import unittest
+
+import big
+import intarithmetic
+import smalldivisor
+
+
+class TestSmallDivisor(unittest.TestCase):
+    def check(self, divider, a):
+        b = big.int2bytearray(divider.value, divider.nbytes)
+        self.assertEqual(divider.divide_with_remainder(a), intarithmetic.divideWithRemainder(a, b))
+        self.assertEqual(divider.divide(a), intarithmetic.divide(a, b))
+        self.assertEqual(divider.modulo(a), intarithmetic.modulo(a, b))
+
+    def testMatchesDivideWithRemainder(self):
+        rng = random.Random(25)
+        for y in (1, -1, 2, 10, -10, 97, 256, -256, 1000, 65521, 2 ** 40, 2 ** 63 - 1, -2 ** 63):
+            divider = smalldivisor.SmallDivisor(big.int2bytearray(y))
+            for i in range(40):
+                xbytes = rng.randint(1, 40)
+                x = rng.randint(-2 ** (8 * xbytes - 1), 2 ** (8 * xbytes - 1) - 1)
+                self.check(divider, big.int2bytearray(x, xbytes))
+            self.check(divider, big.int2bytearray(-2 ** 127, 16))
+
+    def testAllLimbSizes(self):
+        saved = big.LIMB_BYTES
+        rng = random.Random(7)
+        try:
+            for limbBytes in (1, 2, 4, 8):
+                big.LIMB_BYTES = limbBytes
+                for y in (3, -7, 128, 255):
+                    divider = smalldivisor.SmallDivisor(big.int2bytearray(y, 2))
+                    for i in range(30):
+                        x = rng.randint(-2 ** 159, 2 ** 159 - 1)
+                        self.check(divider, big.int2bytearray(x, 20))
+        finally:
+            big.LIMB_BYTES = saved
+
+    def testResultWidthModes(self):
+        divider = smalldivisor.SmallDivisor(big.int2bytearray(7, 1))
+        a = big.int2bytearray(-1000, 32)
+        with big.result_width('minimal'):
+            self.assertEqual(divider.divide(a), big.int2bytearray(-143))
+            self.assertEqual(divider.modulo(a), big.int2bytearray(1))
+
+    def testErrors(self):
+        self.assertRaises(ZeroDivisionError, smalldivisor.SmallDivisor, bytearray(2))
+        self.assertRaises(ValueError, smalldivisor.SmallDivisor, big.int2bytearray(2 ** 64))
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()
@@ -0,0 +1,79 @@
+# Tests for stream.py.
+
+import io
+import mmap
+import random
+import unittest
+
+import big
+import intarithmetic
+import stream
+
+
+class TestStreamDivider(unittest.TestCase):
+    def setUp(self):
+        self.limbBytes = big.LIMB_BYTES
+
+    def tearDown(self):
+        big.LIMB_BYTES = self.limbBytes
+
+    def array(self, x):
+        return big.int2bytearray(x, (x.bit_length() + 8) // 8)
+
+    def chunks(self, data, rng):
+        # data cut at random points, including empty chunks.
+        start = 0
+        while start < len(data):
+            end = start + rng.randint(0, 40)
+            yield bytes(data[start:end])
+            start = end
+
+    def testMatchesDivideWithRemainder(self):
+        rng = random.Random(19)
+        for limbBytes in (1, 4, 8):
+            big.LIMB_BYTES = limbBytes
+            for dividendBytes, divisorBits in ((1, 3), (100, 8), (100, 64), (300, 65), (300, 700), (10, 200)):
+                data = bytearray(rng.getrandbits(8) for i in range(dividendBytes))
+                n = rng.getrandbits(divisorBits) | (1 << (divisorBits - 1))
+                x = big.bytearray2int(bytearray(1) + data)
+                divider = stream.StreamDivider(self.array(n))
+                quotient = bytearray().join(divider.divide(self.chunks(data, rng), block_bytes=16))
+                self.assertEqual(len(quotient), len(data))
+                self.assertEqual(big.bytearray2int(bytearray(1) + quotient), x // n)
+                self.assertEqual(big.bytearray2int(divider.remainder()), x % n)
+                self.assertEqual(len(divider.remainder()), len(self.array(n)))
+                self.assertEqual(divider.length, len(data))
+
+    def testSources(self):
+        data = bytearray(range(256)) * 40
+        n = self.array(2 ** 127 - 1)
+        expected = self.array(big.bytearray2int(bytearray(1) + data) % (2 ** 127 - 1))
+        self.assertEqual(stream.stream_modulo(data, n), expected)
+        self.assertEqual(stream.stream_modulo(io.BytesIO(bytes(data)), n, block_bytes=1000), expected)
+        self.assertEqual(stream.stream_modulo([bytes(data)], n, block_bytes=7), expected)
+        mapped = mmap.mmap(-1, len(data))
+        try:
+            mapped.write(bytes(data))
+            self.assertEqual(stream.stream_modulo(mapped, n, block_bytes=333), expected)
+        finally:
+            mapped.close()
+
+    def testQuotientMatchesDivide(self):
+        data = bytearray(b'\x7f' + b'\x12\x34' * 50)
+        n = self.array(1000003)
+        quotient = bytearray().join(stream.stream_divide(data, n, block_bytes=9))
+        self.assertEqual(big.bytearray2int(quotient), big.bytearray2int(intarithmetic.divide(data, n)))
+
+    def testEmptyAndZeroDividend(self):
+        self.assertEqual(stream.stream_modulo([], self.array(7)), self.array(0))
+        self.assertEqual(bytearray().join(stream.stream_divide(bytearray(20), self.array(300))), bytearray(20))
+
+    def testErrors(self):
+        self.assertRaises(ZeroDivisionError, stream.StreamDivider, bytearray(3))
+        self.assertRaises(ValueError, stream.StreamDivider, big.int2bytearray(-7, 1))
+
+
+##############################################
+if __name__ == '__main__':
+    # run the unit tests
+    unittest.main()